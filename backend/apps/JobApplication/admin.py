@@ -1,14 +1,30 @@
+from datetime import timedelta
+
+from django.conf import settings
 from django.contrib import admin
-from .models import JobApplication
+from django.core.exceptions import PermissionDenied
+from django.template.response import TemplateResponse
+from django.urls import path
+from django.utils import timezone
+from apps.core.admin import LargeTableAdminMixin
+from apps.core.budgets import query_budget
+from .analytics import WATERMARK_NAME, funnel_report
+from .archive import archive_job_applications, restore_job_applications
+from .models import ArchivedJobApplication, JobApplication, RollupWatermark
+from .transitions import transition_job_applications
 from django.utils.html import format_html
 
 @admin.register(JobApplication)
-class JobApplicationAdmin(admin.ModelAdmin):
+@query_budget(12, time_ms=500)
+class JobApplicationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
     list_display = ('user_email', 'job_post', 'applied_status', 'date_applied', 
                     'feedback_status', 'secured_status', 'created_at')
     list_filter = ('applied', 'received_feedback', 'secured_job', 'date_applied')
     search_fields = ('user__email', 'job_post', 'job_description', 'feedback_description')
+    list_select_related = ('user',)
     readonly_fields = ('created_at', 'updated_at')
+    actions = ['mark_applied', 'mark_feedback_received', 'mark_secured', 'archive_selected']
+    change_list_template = 'admin/JobApplication/jobapplication/change_list.html'
     fieldsets = (
         ('User Information', {
             'fields': ('user',)
@@ -59,4 +75,90 @@ class JobApplicationAdmin(admin.ModelAdmin):
             obj.user = request.user
         super().save_model(request, obj, form, change)
 
-        
\ No newline at end of file
+    def get_urls(self):
+        return [
+            path('analytics/', self.admin_site.admin_view(self.analytics_view),
+                 name='JobApplication_jobapplication_analytics'),
+        ] + super().get_urls()
+
+    def analytics_view(self, request):
+        """Funnel charts across all users, read from the daily stats rollup."""
+        if not self.has_view_permission(request):
+            raise PermissionDenied
+        try:
+            weeks = min(max(int(request.GET.get('weeks', settings.JOB_APPLICATION_STATS_WEEKS)), 1), 520)
+        except ValueError:
+            weeks = settings.JOB_APPLICATION_STATS_WEEKS
+        today = timezone.localdate()
+        since = today - timedelta(days=today.weekday(), weeks=weeks - 1)
+        return TemplateResponse(request, 'admin/JobApplication/jobapplication/analytics.html', {
+            **self.admin_site.each_context(request),
+            **funnel_report(since),
+            'title': 'Job application analytics',
+            'opts': self.model._meta,
+            'period_weeks': weeks,
+            'since': since,
+            'watermark': RollupWatermark.objects.filter(name=WATERMARK_NAME).first(),
+        })
+
+    def transition_selected(self, request, queryset, transition):
+        ids = list(queryset.values_list('pk', flat=True))
+        updated = transition_job_applications(transition, ids)
+        self.message_user(request, f"Updated {len(updated)} job applications.")
+
+    @admin.action(description='Mark selected job applications as applied', permissions=['change'])
+    def mark_applied(self, request, queryset):
+        self.transition_selected(request, queryset, JobApplication.APPLIED)
+
+    @admin.action(description='Mark feedback received for selected job applications', permissions=['change'])
+    def mark_feedback_received(self, request, queryset):
+        self.transition_selected(request, queryset, JobApplication.FEEDBACK_RECEIVED)
+
+    @admin.action(description='Mark selected job applications as secured', permissions=['change'])
+    def mark_secured(self, request, queryset):
+        self.transition_selected(request, queryset, JobApplication.SECURED)
+
+    @admin.action(description='Archive selected job applications', permissions=['delete'])
+    def archive_selected(self, request, queryset):
+        archived = archive_job_applications(queryset)
+        self.message_user(request, f"Archived {archived} job applications.")
+
+
+@admin.register(ArchivedJobApplication)
+@query_budget(12, time_ms=500)
+class ArchivedJobApplicationAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('user_email', 'job_post', 'applied', 'date_applied',
+                    'received_feedback', 'secured_job', 'archived_at')
+    list_filter = ('applied', 'received_feedback', 'secured_job', 'archived_at')
+    search_fields = ('user__email', 'job_post')
+    list_select_related = ('user',)
+    actions = ['restore_selected']
+
+    def user_email(self, obj):
+        return obj.user.email
+    user_email.short_description = 'User Email'
+    user_email.admin_order_field = 'user__email'
+
+    def get_queryset(self, request):
+        qs = super().get_queryset(request)
+        if request.user.is_superuser:
+            return qs
+        return qs.filter(user=request.user)
+
+    # Archived applications are read-only; restore them to edit.
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def has_restore_permission(self, request):
+        # Restoring inserts live applications and deletes the archived rows.
+        return request.user.has_perms([
+            'JobApplication.add_jobapplication', 'JobApplication.delete_archivedjobapplication',
+        ])
+
+    @admin.action(description='Restore selected job applications', permissions=['restore'])
+    def restore_selected(self, request, queryset):
+        restored = restore_job_applications(queryset)
+        self.message_user(request, f"Restored {restored} job applications.")
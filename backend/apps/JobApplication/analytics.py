@@ -0,0 +1,151 @@
+"""
+Daily rollups of job application funnel counts, for staff reports.
+
+JobApplicationDailyStats holds one row per day: counts for the
+applications created that day, live or archived. A refresh only
+re-aggregates the days of applications updated since the last one. The
+watermark is the latest updated_at processed, less
+JOB_APPLICATION_STATS_OVERLAP seconds for writes that commit late.
+Deleted applications only leave the rollups on a full refresh.
+"""
+import operator
+from datetime import datetime, time, timedelta
+from functools import reduce
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Count, F, Max, Q, Sum
+from django.db.models.functions import TruncDate
+from django.utils import timezone
+
+from .models import ArchivedJobApplication, JobApplication, JobApplicationDailyStats, RollupWatermark
+
+WATERMARK_NAME = 'job_application_daily_stats'
+
+STAT_FIELDS = ['created', 'applied', 'received_feedback', 'secured_job', 'feedback_timed', 'time_to_feedback']
+
+
+def day_range(day):
+    start = datetime.combine(day, time.min, tzinfo=timezone.get_current_timezone())
+    return Q(created_at__gte=start, created_at__lt=start + timedelta(days=1))
+
+
+def stats_for_days(days):
+    """{day: JobApplicationDailyStats} for the applications created on `days`, live and archived."""
+    stats = {day: JobApplicationDailyStats(day=day) for day in days}
+    created_on_days = reduce(operator.or_, (day_range(day) for day in days))
+    timed = Q(feedback_received_at__isnull=False)
+    for model in (JobApplication, ArchivedJobApplication):
+        rows = model.objects.filter(created_on_days).annotate(day=TruncDate('created_at')).values('day').annotate(
+            created=Count('pk'),
+            applied=Count('pk', filter=Q(applied=True)),
+            received_feedback=Count('pk', filter=Q(received_feedback=True)),
+            secured_job=Count('pk', filter=Q(secured_job=True)),
+            feedback_timed=Count('pk', filter=timed),
+            time_to_feedback=Sum(F('feedback_received_at') - F('created_at'), filter=timed),
+        ).order_by()
+        for row in rows:
+            day_stats = stats[row['day']]
+            for field in STAT_FIELDS:
+                if row[field]:
+                    setattr(day_stats, field, getattr(day_stats, field) + row[field])
+    return stats
+
+
+def refresh_daily_stats(full=False):
+    """
+    Re-aggregate the days with applications updated since the last refresh,
+    or every day with `full`. Returns the number of days refreshed.
+    """
+    started = timezone.now()
+    watermark = RollupWatermark.objects.filter(name=WATERMARK_NAME).first()
+    changed = JobApplication.objects.all()
+    if watermark is not None and not full:
+        changed = changed.filter(
+            updated_at__gt=watermark.updated_at - timedelta(seconds=settings.JOB_APPLICATION_STATS_OVERLAP)
+        )
+    # Take the next watermark before reading the days; anything updated in
+    # between is refreshed again next time.
+    latest = changed.aggregate(latest=Max('updated_at'))['latest']
+    days = set(changed.dates('created_at', 'day'))
+    if full:
+        days.update(ArchivedJobApplication.objects.dates('created_at', 'day'))
+
+    days = sorted(days)
+    batch_size = settings.JOB_APPLICATION_STATS_BATCH_DAYS
+    for start in range(0, len(days), batch_size):
+        stats = stats_for_days(days[start:start + batch_size])
+        JobApplicationDailyStats.objects.bulk_create(
+            stats.values(),
+            update_conflicts=True,
+            unique_fields=['day'],
+            update_fields=STAT_FIELDS + ['refreshed_at'],
+        )
+
+    with transaction.atomic():
+        if full:
+            # Days left with no applications at all.
+            JobApplicationDailyStats.objects.filter(refreshed_at__lt=started).delete()
+        if latest is not None and (watermark is None or latest > watermark.updated_at):
+            RollupWatermark.objects.update_or_create(name=WATERMARK_NAME, defaults={'updated_at': latest})
+    return len(days)
+
+
+def empty_totals():
+    return {field: 0 for field in STAT_FIELDS} | {'time_to_feedback': timedelta()}
+
+
+def weekly_stats(since):
+    """
+    The daily stats from `since` summed by week (starting on Monday), as
+    {week start: {field: total}} in date order.
+    """
+    weeks = {}
+    for day_stats in JobApplicationDailyStats.objects.filter(day__gte=since).order_by('day'):
+        week = day_stats.day - timedelta(days=day_stats.day.weekday())
+        totals = weeks.setdefault(week, empty_totals())
+        for field in STAT_FIELDS:
+            totals[field] += getattr(day_stats, field)
+    return weeks
+
+
+def days_to_feedback(totals):
+    if not totals['feedback_timed']:
+        return None
+    return totals['time_to_feedback'].total_seconds() / 86400 / totals['feedback_timed']
+
+
+def funnel_report(since):
+    """
+    Chart data from the rollups since `since`: per week ('weeks') the counts,
+    average days to feedback and bar widths in percent; and for the whole
+    period the funnel 'stages' with their conversion from the stage before.
+    """
+    weeks = weekly_stats(since)
+    period = empty_totals()
+    for totals in weeks.values():
+        for field in STAT_FIELDS:
+            period[field] += totals[field]
+    rows = [
+        {'week': week, **totals, 'days_to_feedback': days_to_feedback(totals)}
+        for week, totals in weeks.items()
+    ]
+    most_created = max((row['created'] for row in rows), default=0) or 1
+    most_days = max((row['days_to_feedback'] or 0 for row in rows), default=0) or 1
+    for row in rows:
+        row['created_width'] = row['created'] * 100 / most_created
+        row['days_width'] = (row['days_to_feedback'] or 0) * 100 / most_days
+
+    stages = []
+    previous = None
+    for label, field in (('Created', 'created'), ('Applied', 'applied'),
+                         ('Feedback received', 'received_feedback'), ('Secured', 'secured_job')):
+        count = period[field]
+        stages.append({
+            'label': label,
+            'count': count,
+            'width': count * 100 / (period['created'] or 1),
+            'conversion': count * 100 / previous if previous else None,
+        })
+        previous = count
+    return {'weeks': rows, 'stages': stages, 'days_to_feedback': days_to_feedback(period)}
@@ -0,0 +1,84 @@
+"""
+Moving job applications between the hot JobApplication table and the
+ArchivedJobApplication table, in batches.
+"""
+from datetime import timedelta
+
+from django.conf import settings
+from django.db import transaction
+from django.db.models import Q
+from django.utils import timezone
+
+from .models import ArchivedJobApplication, JobApplication, JobApplicationChange
+from .sync import changes_recorded_manually, record_changes
+
+# Columns copied between the two tables; both models share them.
+FIELDS = [field.attname for field in JobApplication._meta.concrete_fields]
+
+
+def archivable_job_applications(now=None):
+    """
+    Applications untouched for JOB_APPLICATION_ARCHIVE_AFTER_DAYS, or closed
+    (secured or with feedback) and untouched for
+    JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS.
+    """
+    now = now or timezone.now()
+    stale = Q(updated_at__lt=now - timedelta(days=settings.JOB_APPLICATION_ARCHIVE_AFTER_DAYS))
+    closed = Q(secured_job=True) | Q(received_feedback=True)
+    closed_stale = closed & Q(updated_at__lt=now - timedelta(days=settings.JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS))
+    return JobApplication.objects.filter(stale | closed_stale)
+
+
+def _move_in_batches(queryset, move, batch_size):
+    moved = 0
+    while True:
+        ids = list(queryset.order_by('pk').values_list('pk', flat=True)[:batch_size])
+        if not ids:
+            return moved
+        with transaction.atomic():
+            moved += move(ids)
+
+
+def archive_job_applications(queryset=None, batch_size=500):
+    """
+    Move the applications in `queryset` (by default every archivable one)
+    to the archive, `batch_size` rows per transaction. Returns the number
+    of applications archived.
+    """
+    if queryset is None:
+        queryset = archivable_job_applications()
+    archived_at = timezone.now()
+
+    def move(ids):
+        rows = JobApplication.objects.filter(pk__in=ids).select_for_update().values(*FIELDS)
+        archived = ArchivedJobApplication.objects.bulk_create(
+            ArchivedJobApplication(archived_at=archived_at, **row) for row in rows
+        )
+        with changes_recorded_manually():
+            JobApplication.objects.filter(pk__in=ids).delete()
+        record_changes([(row.user_id, row.pk) for row in archived], JobApplicationChange.ARCHIVE)
+        return len(archived)
+
+    return _move_in_batches(queryset, move, batch_size)
+
+
+def restore_job_applications(queryset, batch_size=500):
+    """
+    Move the archived applications in `queryset` back to the JobApplication
+    table with their original ids. updated_at is set to the restore time, so
+    they are not archived again straight away. Returns the number restored.
+    """
+    def move(ids):
+        rows = list(ArchivedJobApplication.objects.filter(pk__in=ids).select_for_update().values(*FIELDS))
+        # bulk_create() applies auto_now_add, so created_at is put back after.
+        applications = JobApplication.objects.bulk_create(JobApplication(**row) for row in rows)
+        for application, row in zip(applications, rows):
+            application.created_at = row['created_at']
+        JobApplication.objects.bulk_update(applications, ['created_at'])
+        ArchivedJobApplication.objects.filter(pk__in=ids).delete()
+        record_changes(
+            [(row['user_id'], row['id']) for row in rows], JobApplicationChange.RESTORE, applications
+        )
+        return len(applications)
+
+    return _move_in_batches(queryset, move, batch_size)
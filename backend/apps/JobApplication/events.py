@@ -0,0 +1,89 @@
+"""
+Server-sent events for job application changes.
+
+Every logged JobApplicationChange is published to its user's channel once
+the transaction commits. The change's sequence number is the event id, so
+a reconnecting client's Last-Event-ID is replayed from the change log.
+"""
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.db import transaction
+
+from apps.core.events import Event, get_broker
+from apps.core.renderers import JSONRenderer
+
+from .models import JobApplication, JobApplicationChange
+from .serializers import JobApplicationSerializer
+
+
+def user_channel(user_id):
+    return f'job-applications:{user_id}'
+
+
+def change_event(change, application=None):
+    """The Event for `change`, with the application's current data unless it was removed."""
+    data = {
+        'id': change.application_id,
+        'application': JobApplicationSerializer(application).data if application is not None else None,
+    }
+    return Event(change.id, change.action, JSONRenderer().render(data).decode())
+
+
+def publish_changes(changes, applications=()):
+    """Publish events for logged `changes` once the current transaction commits."""
+    applications = {application.pk: application for application in applications}
+    events = [
+        (user_channel(change.user_id), change_event(change, applications.get(change.application_id)))
+        for change in changes
+    ]
+
+    def publish():
+        broker = get_broker()
+        for channel, event in events:
+            broker.publish(channel, event)
+
+    # robust: a broker outage must not turn a committed write into an error.
+    transaction.on_commit(publish, robust=True)
+
+
+def replay_events(user, last_event_id, limit):
+    """Events after `last_event_id`, or None if there are more than `limit`."""
+    changes = list(
+        JobApplicationChange.objects.filter(user=user, id__gt=last_event_id).order_by('id')[:limit + 1]
+    )
+    if len(changes) > limit:
+        return None
+    applications = JobApplication.objects.filter(
+        user=user, pk__in={change.application_id for change in changes}
+    ).in_bulk()
+    return [change_event(change, applications.get(change.application_id)) for change in changes]
+
+
+async def event_stream(user, last_event_id=None):
+    """
+    text/event-stream chunks of `user`'s job application changes: those
+    after `last_event_id`, then live ones, with a comment line every
+    EVENT_STREAM_HEARTBEAT seconds to keep proxies from closing the
+    connection. A 'reset' event asks the client to sync from scratch.
+    """
+    # Subscribe before replaying, so nothing committed in between is lost.
+    with get_broker().subscribe(user_channel(user.pk)) as subscription:
+        yield f'retry: {settings.EVENT_STREAM_RETRY * 1000}\n\n'.encode()
+        if last_event_id is not None:
+            events = await sync_to_async(replay_events)(user, last_event_id, settings.EVENT_STREAM_REPLAY_LIMIT)
+            if events is None:
+                yield Event(None, 'reset', '{}').encode()
+            else:
+                for event in events:
+                    yield event.encode()
+                    last_event_id = event.id
+
+        while True:
+            event = await subscription.get(settings.EVENT_STREAM_HEARTBEAT)
+            if event is None:
+                if subscription.overflowed:
+                    # The client reconnects after `retry` and resumes.
+                    return
+                yield b': heartbeat\n\n'
+            elif last_event_id is None or event.id > last_event_id:
+                yield event.encode()
@@ -0,0 +1,213 @@
+"""
+Importing job applications from CSV and XLSX spreadsheets.
+
+The file is read as a stream (csv, or openpyxl in read-only mode). Its
+header row is mapped to JobApplication fields (see COLUMNS), and each row
+is validated with JobApplicationSerializer. Valid rows are inserted with
+bulk_create, in batches of JOB_APPLICATION_IMPORT_BATCH_SIZE. Progress and
+the first JOB_APPLICATION_IMPORT_MAX_ERRORS row errors are saved on the
+JobApplicationImport after each batch. Memory stays bounded whatever the
+size of the file.
+"""
+import csv
+import io
+import logging
+import re
+import zipfile
+from datetime import date, datetime
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.db import transaction
+from django.utils import timezone
+
+from apps.core.tasks import run_in_background
+from .models import JobApplication, JobApplicationChange, JobApplicationImport, JobApplicationImportError
+from .serializers import JobApplicationSerializer
+from .suggestions import refresh_title_suggestions
+from .sync import record_changes
+
+try:
+    import openpyxl
+except ImportError:
+    # openpyxl is in requirements.txt; this only keeps CSV imports working
+    # on a server installed without it.
+    openpyxl = None
+
+logger = logging.getLogger(__name__)
+
+# Accepted column headers per field, compared after normalize_header().
+COLUMNS = {
+    'job_post': ['job_post', 'job', 'job_title', 'title', 'position', 'role'],
+    'job_description': ['job_description', 'description'],
+    'applied': ['applied'],
+    'date_applied': ['date_applied', 'applied_on', 'application_date', 'date'],
+    'received_feedback': ['received_feedback', 'feedback'],
+    'feedback_description': ['feedback_description', 'feedback_notes', 'notes'],
+    'secured_job': ['secured_job', 'secured', 'offer'],
+}
+HEADER_FIELDS = {header: field for field, headers in COLUMNS.items() for header in headers}
+
+
+class ImportFailed(Exception):
+    """The file as a whole cannot be imported; the message is shown to the user."""
+
+
+def normalize_header(header):
+    return re.sub(r'[^a-z0-9]+', '_', str(header or '').lower()).strip('_')
+
+
+def map_columns(header):
+    """The JobApplication field for each column of `header`, or None for columns to ignore."""
+    fields = []
+    for column in header:
+        field = HEADER_FIELDS.get(normalize_header(column))
+        fields.append(field if field not in fields else None)
+    if 'job_post' not in fields:
+        raise ImportFailed(f"No job post column; name one of: {', '.join(COLUMNS['job_post'])}.")
+    return fields
+
+
+def cell_value(value):
+    if value is None:
+        return ''
+    if isinstance(value, datetime):
+        value = value.date()
+    if isinstance(value, date):
+        return value.isoformat()
+    if isinstance(value, bool):
+        return 'true' if value else 'false'
+    if isinstance(value, float) and value.is_integer():
+        value = int(value)
+    return str(value).strip()
+
+
+def read_csv(file):
+    """(estimated row count, rows) for a binary CSV file."""
+    lines = sum(chunk.count(b'\n') for chunk in iter(lambda: file.read(1 << 16), b''))
+    file.seek(0)
+
+    def rows():
+        text = io.TextIOWrapper(file, encoding='utf-8-sig', newline='')
+        try:
+            yield from csv.reader(text)
+        except UnicodeDecodeError:
+            raise ImportFailed("The CSV file is not UTF-8 encoded.")
+        except csv.Error as e:
+            raise ImportFailed(f"The CSV file is malformed: {e}.")
+        finally:
+            text.detach()
+    return max(lines - 1, 0), rows()
+
+
+def read_xlsx(file):
+    """(estimated row count, rows) for the first sheet of an XLSX file."""
+    if openpyxl is None:
+        raise ImportFailed("XLSX files cannot be imported on this server; upload a CSV file.")
+    try:
+        workbook = openpyxl.load_workbook(file, read_only=True, data_only=True)
+    except (zipfile.BadZipFile, KeyError, ValueError, OSError):
+        raise ImportFailed("The file is not a valid XLSX workbook.")
+    sheet = workbook.worksheets[0]
+
+    def rows():
+        try:
+            yield from sheet.iter_rows(values_only=True)
+        finally:
+            workbook.close()
+    return (sheet.max_row - 1 if sheet.max_row else None), rows()
+
+
+READERS = {
+    JobApplicationImport.CSV: read_csv,
+    JobApplicationImport.XLSX: read_xlsx,
+}
+
+
+def can_import(file_format):
+    return file_format != JobApplicationImport.XLSX or openpyxl is not None
+
+
+def save_batch(job_import, applications, errors):
+    with transaction.atomic():
+        created = JobApplication.objects.bulk_create(applications)
+        record_changes(
+            [(application.user_id, application.pk) for application in created], JobApplicationChange.CREATE, created
+        )
+        run_in_background(
+            refresh_title_suggestions, job_import.user_id, {application.job_post for application in created}
+        )
+        JobApplicationImportError.objects.bulk_create(errors)
+        job_import.imported_rows += len(created)
+        job_import.save(update_fields=['processed_rows', 'imported_rows', 'error_count'])
+    applications.clear()
+    errors.clear()
+
+
+def import_rows(job_import, rows):
+    """Validate and insert `rows` (the header first) for job_import's user."""
+    rows = iter(rows)
+    header = next(rows, None)
+    if header is None:
+        raise ImportFailed("The file is empty.")
+    fields = map_columns(header)
+
+    context = {'request': SimpleNamespace(user=job_import.user)}
+    batch_size = settings.JOB_APPLICATION_IMPORT_BATCH_SIZE
+    applications = []
+    errors = []
+    for number, row in enumerate(rows, start=2):
+        data = {}
+        for field, value in zip(fields, row):
+            value = cell_value(value)
+            if field and value:
+                data[field] = value
+        if not data:
+            continue
+
+        job_import.processed_rows += 1
+        serializer = JobApplicationSerializer(data=data, context=context)
+        if serializer.is_valid():
+            application = JobApplication(**serializer.validated_data)
+            application.set_status_dates()
+            applications.append(application)
+        else:
+            job_import.error_count += 1
+            if job_import.error_count <= settings.JOB_APPLICATION_IMPORT_MAX_ERRORS:
+                errors.append(JobApplicationImportError(
+                    job_import=job_import, row=number, errors=serializer.errors, data=data
+                ))
+        if len(applications) + len(errors) >= batch_size:
+            save_batch(job_import, applications, errors)
+    save_batch(job_import, applications, errors)
+
+
+def run_import(import_id):
+    """Import a pending JobApplicationImport. Meant for apps.core.tasks.run_in_background()."""
+    # Claim it, so a job is never run twice.
+    if not JobApplicationImport.objects.filter(pk=import_id, status=JobApplicationImport.PENDING).update(
+        status=JobApplicationImport.RUNNING, started_at=timezone.now()
+    ):
+        return
+    job_import = JobApplicationImport.objects.select_related('user').get(pk=import_id)
+    try:
+        with job_import.file.open('rb') as file:
+            job_import.total_rows, rows = READERS[job_import.format](file)
+            job_import.save(update_fields=['total_rows'])
+            try:
+                import_rows(job_import, rows)
+            finally:
+                # Release the reader while the file is still open.
+                rows.close()
+    except ImportFailed as e:
+        job_import.status = JobApplicationImport.FAILED
+        job_import.message = str(e)
+    except Exception:
+        logger.exception("Job application import %s failed", import_id)
+        job_import.status = JobApplicationImport.FAILED
+        job_import.message = "The import failed unexpectedly."
+    else:
+        job_import.status = JobApplicationImport.DONE
+    job_import.finished_at = timezone.now()
+    job_import.file.delete(save=False)
+    job_import.save()
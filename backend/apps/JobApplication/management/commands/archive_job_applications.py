@@ -0,0 +1,36 @@
+from django.core.management.base import BaseCommand
+
+from apps.JobApplication.archive import (
+    archivable_job_applications,
+    archive_job_applications,
+    restore_job_applications,
+)
+from apps.JobApplication.models import ArchivedJobApplication
+
+
+class Command(BaseCommand):
+    help = (
+        "Move old and closed job applications to the archive table "
+        "(see JOB_APPLICATION_ARCHIVE_AFTER_DAYS), or restore archived ones with --restore"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--batch-size', type=int, default=500)
+        parser.add_argument('--dry-run', action='store_true', help="Only report how many would be archived")
+        parser.add_argument('--restore', type=int, nargs='+', metavar='ID', help="Restore these archived applications")
+
+    def handle(self, *args, **options):
+        batch_size = options['batch_size']
+        if options['restore']:
+            restored = restore_job_applications(
+                ArchivedJobApplication.objects.filter(pk__in=options['restore']), batch_size=batch_size
+            )
+            self.stdout.write(self.style.SUCCESS(f"Restored {restored} job applications"))
+            return
+
+        if options['dry_run']:
+            self.stdout.write(f"{archivable_job_applications().count()} job applications would be archived")
+            return
+
+        archived = archive_job_applications(batch_size=batch_size)
+        self.stdout.write(self.style.SUCCESS(f"Archived {archived} job applications"))
@@ -0,0 +1,19 @@
+from datetime import timedelta
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+
+from apps.JobApplication.models import JobApplicationChange
+
+
+class Command(BaseCommand):
+    help = (
+        "Delete job application change log entries older than JOB_APPLICATION_CHANGE_RETENTION_DAYS; "
+        "sync tokens that old already get a full sync"
+    )
+
+    def handle(self, *args, **options):
+        cutoff = timezone.now() - timedelta(days=settings.JOB_APPLICATION_CHANGE_RETENTION_DAYS)
+        deleted, _ = JobApplicationChange.objects.filter(created_at__lt=cutoff).delete()
+        self.stdout.write(self.style.SUCCESS(f"Deleted {deleted} change log entries"))
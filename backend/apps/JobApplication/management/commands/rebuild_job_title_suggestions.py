@@ -0,0 +1,14 @@
+from django.core.management.base import BaseCommand
+
+from apps.JobApplication.suggestions import rebuild_title_suggestions
+
+
+class Command(BaseCommand):
+    help = "Rebuild the job title autocomplete index from the job applications, live and archived"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--user', type=int, action='append', dest='users', help="Only this user id (repeatable)")
+
+    def handle(self, *args, **options):
+        rebuilt = rebuild_title_suggestions(options['users'])
+        self.stdout.write(self.style.SUCCESS(f"Rebuilt job title suggestions for {rebuilt} users"))
@@ -0,0 +1,17 @@
+from django.core.management.base import BaseCommand
+
+from apps.JobApplication.analytics import refresh_daily_stats
+
+
+class Command(BaseCommand):
+    help = (
+        "Refresh the daily job application stats for applications updated since the last run, "
+        "or for every day with --full"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--full', action='store_true', help="Rebuild every day, dropping deleted applications")
+
+    def handle(self, *args, **options):
+        refreshed = refresh_daily_stats(full=options['full'])
+        self.stdout.write(self.style.SUCCESS(f"Refreshed stats for {refreshed} days"))
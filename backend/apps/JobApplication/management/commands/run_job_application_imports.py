@@ -0,0 +1,21 @@
+from django.core.management.base import BaseCommand
+
+from apps.JobApplication.imports import run_import
+from apps.JobApplication.models import JobApplicationImport
+
+
+class Command(BaseCommand):
+    help = (
+        "Run pending job application imports now, e.g. those queued by a web process "
+        "that exited before getting to them"
+    )
+
+    def handle(self, *args, **options):
+        pending = JobApplicationImport.objects.filter(status=JobApplicationImport.PENDING).order_by('created_at')
+        for import_id in pending.values_list('pk', flat=True):
+            run_import(import_id)
+            job_import = JobApplicationImport.objects.get(pk=import_id)
+            self.stdout.write(
+                f"Import {import_id}: {job_import.status}, {job_import.imported_rows} imported, "
+                f"{job_import.error_count} errors"
+            )
@@ -0,0 +1,37 @@
+# Generated by Django 5.1.8 on 2026-10-19 17:20
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JobApplication', '0001_initial'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='ArchivedJobApplication',
+            fields=[
+                ('id', models.BigIntegerField(primary_key=True, serialize=False)),
+                ('job_post', models.CharField(max_length=255)),
+                ('job_description', models.TextField(blank=True)),
+                ('applied', models.BooleanField(default=False)),
+                ('date_applied', models.DateField(blank=True, null=True)),
+                ('received_feedback', models.BooleanField(default=False)),
+                ('feedback_description', models.TextField(blank=True)),
+                ('secured_job', models.BooleanField(default=False)),
+                ('created_at', models.DateTimeField()),
+                ('updated_at', models.DateTimeField()),
+                ('archived_at', models.DateTimeField(default=django.utils.timezone.now)),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='archived_job_applications', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'ordering': ['-date_applied'],
+            },
+        ),
+    ]
@@ -0,0 +1,18 @@
+# Generated by Django 5.1.8 on 2026-10-19 17:25
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JobApplication', '0003_jobapplicationchange'),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name='jobapplicationchange',
+            name='action',
+            field=models.CharField(choices=[('create', 'Created'), ('update', 'Updated'), ('delete', 'Deleted'), ('archive', 'Archived'), ('restore', 'Restored'), ('secured', 'Marked as secured')], max_length=10),
+        ),
+    ]
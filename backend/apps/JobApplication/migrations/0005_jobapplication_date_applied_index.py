@@ -0,0 +1,19 @@
+# Generated by Django 5.1.8 on 2026-10-19 17:28
+
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JobApplication', '0004_jobapplicationchange_secured'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['date_applied', 'id'], name='jobapp_date_applied_id_idx'),
+        ),
+    ]
@@ -0,0 +1,75 @@
+# Generated by Django 5.1.8 on 2026-10-19 17:39
+
+import datetime
+from django.conf import settings
+from django.db import migrations, models
+
+
+def backfill_feedback_received_at(apps, schema_editor):
+    # When feedback arrived was not recorded; the last update is the best guess.
+    for model_name in ('JobApplication', 'ArchivedJobApplication'):
+        model = apps.get_model('JobApplication', model_name)
+        model.objects.filter(received_feedback=True, feedback_received_at__isnull=True).update(
+            feedback_received_at=models.F('updated_at')
+        )
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JobApplication', '0005_jobapplication_date_applied_index'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobApplicationDailyStats',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('day', models.DateField(unique=True)),
+                ('created', models.PositiveIntegerField(default=0)),
+                ('applied', models.PositiveIntegerField(default=0)),
+                ('received_feedback', models.PositiveIntegerField(default=0)),
+                ('secured_job', models.PositiveIntegerField(default=0)),
+                ('feedback_timed', models.PositiveIntegerField(default=0)),
+                ('time_to_feedback', models.DurationField(default=datetime.timedelta)),
+                ('refreshed_at', models.DateTimeField(auto_now=True)),
+            ],
+            options={
+                'verbose_name_plural': 'job application daily stats',
+                'ordering': ['day'],
+            },
+        ),
+        migrations.CreateModel(
+            name='RollupWatermark',
+            fields=[
+                ('name', models.CharField(max_length=100, primary_key=True, serialize=False)),
+                ('updated_at', models.DateTimeField()),
+            ],
+        ),
+        migrations.AddField(
+            model_name='archivedjobapplication',
+            name='feedback_received_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AddField(
+            model_name='jobapplication',
+            name='feedback_received_at',
+            field=models.DateTimeField(blank=True, null=True),
+        ),
+        migrations.AlterField(
+            model_name='archivedjobapplication',
+            name='created_at',
+            field=models.DateTimeField(db_index=True),
+        ),
+        migrations.AlterField(
+            model_name='jobapplication',
+            name='created_at',
+            field=models.DateTimeField(auto_now_add=True, db_index=True),
+        ),
+        migrations.AddIndex(
+            model_name='jobapplication',
+            index=models.Index(fields=['updated_at'], name='jobapp_updated_at_idx'),
+        ),
+        migrations.RunPython(backfill_feedback_received_at, migrations.RunPython.noop),
+    ]
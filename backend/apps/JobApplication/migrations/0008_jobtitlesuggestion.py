@@ -0,0 +1,31 @@
+# Generated by Django 5.1.8 on 2026-10-19 18:23
+
+import django.db.models.deletion
+from django.conf import settings
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+
+    dependencies = [
+        ('JobApplication', '0007_jobapplicationimport'),
+        migrations.swappable_dependency(settings.AUTH_USER_MODEL),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name='JobTitleSuggestion',
+            fields=[
+                ('id', models.BigAutoField(auto_created=True, primary_key=True, serialize=False, verbose_name='ID')),
+                ('prefix', models.CharField(max_length=255)),
+                ('key', models.CharField(max_length=255)),
+                ('title', models.CharField(max_length=255)),
+                ('last_used_at', models.DateTimeField()),
+                ('user', models.ForeignKey(on_delete=django.db.models.deletion.CASCADE, related_name='+', to=settings.AUTH_USER_MODEL)),
+            ],
+            options={
+                'indexes': [models.Index(fields=['user', 'prefix', '-last_used_at'], name='jobtitle_prefix_recent_idx')],
+                'constraints': [models.UniqueConstraint(fields=('user', 'prefix', 'key'), name='jobtitle_user_prefix_key_uniq')],
+            },
+        ),
+    ]
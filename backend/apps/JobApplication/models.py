@@ -1,8 +1,20 @@
+from datetime import timedelta
+
 from django.db import models
 from django.conf import settings
 from django.utils import timezone
 
 class JobApplication(models.Model):
+    # Status transitions (apps.JobApplication.transitions)
+    APPLIED = 'applied'
+    FEEDBACK_RECEIVED = 'feedback_received'
+    SECURED = 'secured'
+    TRANSITION_CHOICES = [
+        (APPLIED, 'Mark as applied'),
+        (FEEDBACK_RECEIVED, 'Mark feedback as received'),
+        (SECURED, 'Mark as secured'),
+    ]
+
     user = models.ForeignKey(
         settings.AUTH_USER_MODEL,
         on_delete=models.CASCADE,
@@ -14,12 +26,19 @@ class JobApplication(models.Model):
     date_applied = models.DateField(null=True, blank=True)
     received_feedback = models.BooleanField(default=False)
     feedback_description = models.TextField(blank=True)
+    feedback_received_at = models.DateTimeField(null=True, blank=True)
     secured_job = models.BooleanField(default=False)
-    created_at = models.DateTimeField(auto_now_add=True)
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
     updated_at = models.DateTimeField(auto_now=True)
 
     class Meta:
         ordering = ['-date_applied']
+        indexes = [
+            # The admin changelist orders by -date_applied, -pk.
+            models.Index(fields=['date_applied', 'id'], name='jobapp_date_applied_id_idx'),
+            # Incremental stats refreshes (apps.JobApplication.analytics).
+            models.Index(fields=['updated_at'], name='jobapp_updated_at_idx'),
+        ]
 
     def __str__(self):
         return f"{self.user.email} - {self.job_post}"
@@ -33,8 +52,227 @@ class JobApplication(models.Model):
         return JobApplication.objects.filter(user=self.request.user)
 
 
-    def save(self, *args, **kwargs):
+    def set_status_dates(self):
+        """Default date_applied and feedback_received_at; save() does, bulk_create() callers must."""
         # Set date_applied to today if applied is True and date_applied is not set
         if self.applied and not self.date_applied:
             self.date_applied = timezone.now().date()
+        if self.received_feedback and not self.feedback_received_at:
+            self.feedback_received_at = timezone.now()
+
+    @classmethod
+    def from_db(cls, db, field_names, values):
+        instance = super().from_db(db, field_names, values)
+        # The title as loaded, so a save can tell the suggestions what it replaced.
+        instance._loaded_job_post = instance.__dict__.get('job_post')
+        return instance
+
+    def save(self, *args, **kwargs):
+        self.set_status_dates()
         super().save(*args, **kwargs)
+
+
+class ArchivedJobApplication(models.Model):
+    """
+    Cold storage for old or closed job applications, moved here by
+    apps.JobApplication.archive. Rows keep their JobApplication id and
+    timestamps so they serialize exactly like the originals.
+    """
+    id = models.BigIntegerField(primary_key=True)
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='archived_job_applications'
+    )
+    job_post = models.CharField(max_length=255)
+    job_description = models.TextField(blank=True)
+    applied = models.BooleanField(default=False)
+    date_applied = models.DateField(null=True, blank=True)
+    received_feedback = models.BooleanField(default=False)
+    feedback_description = models.TextField(blank=True)
+    feedback_received_at = models.DateTimeField(null=True, blank=True)
+    secured_job = models.BooleanField(default=False)
+    created_at = models.DateTimeField(db_index=True)
+    updated_at = models.DateTimeField()
+    archived_at = models.DateTimeField(default=timezone.now)
+
+    class Meta:
+        ordering = ['-date_applied']
+
+    def __str__(self):
+        return f"{self.user.email} - {self.job_post} (archived)"
+
+
+class JobApplicationChange(models.Model):
+    """
+    Append-only log of job application writes, read by the sync endpoint.
+    The auto-incrementing id is the sync sequence number.
+    """
+    CREATE = 'create'
+    UPDATE = 'update'
+    DELETE = 'delete'
+    ARCHIVE = 'archive'
+    RESTORE = 'restore'
+    SECURED = 'secured'
+    ACTION_CHOICES = [
+        (CREATE, 'Created'),
+        (UPDATE, 'Updated'),
+        (DELETE, 'Deleted'),
+        (ARCHIVE, 'Archived'),
+        (RESTORE, 'Restored'),
+        (SECURED, 'Marked as secured'),
+    ]
+
+    # No database constraint: deleting a user cascades to their
+    # applications, which logs changes for a user about to disappear.
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.DO_NOTHING,
+        db_constraint=False,
+        related_name='+'
+    )
+    application_id = models.BigIntegerField()
+    action = models.CharField(max_length=10, choices=ACTION_CHOICES)
+    created_at = models.DateTimeField(default=timezone.now, db_index=True)
+
+    class Meta:
+        indexes = [
+            models.Index(fields=['user', 'id']),
+            models.Index(fields=['user', 'created_at']),
+        ]
+
+    def __str__(self):
+        return f"{self.action} job application {self.application_id}"
+
+
+class JobApplicationDailyStats(models.Model):
+    """
+    Funnel counts for the job applications (live and archived, of all users)
+    created on `day`. A rollup kept by apps.JobApplication.analytics, so
+    reports never aggregate the live table.
+    """
+    day = models.DateField(unique=True)
+    created = models.PositiveIntegerField(default=0)
+    applied = models.PositiveIntegerField(default=0)
+    received_feedback = models.PositiveIntegerField(default=0)
+    secured_job = models.PositiveIntegerField(default=0)
+    # Applications with feedback_received_at, and their total time from
+    # being created to feedback.
+    feedback_timed = models.PositiveIntegerField(default=0)
+    time_to_feedback = models.DurationField(default=timedelta)
+    refreshed_at = models.DateTimeField(auto_now=True)
+
+    class Meta:
+        ordering = ['day']
+        verbose_name_plural = 'job application daily stats'
+
+    def __str__(self):
+        return f"Job applications created on {self.day}"
+
+
+class RollupWatermark(models.Model):
+    """The latest updated_at a rollup has processed, by rollup name."""
+    name = models.CharField(max_length=100, primary_key=True)
+    updated_at = models.DateTimeField()
+
+    def __str__(self):
+        return f"{self.name} up to {self.updated_at}"
+
+
+class JobApplicationImport(models.Model):
+    """
+    A CSV or XLSX file of job applications, imported in the background by
+    apps.JobApplication.imports. The counts are updated as it runs.
+    """
+    PENDING = 'pending'
+    RUNNING = 'running'
+    DONE = 'done'
+    FAILED = 'failed'
+    STATUS_CHOICES = [
+        (PENDING, 'Pending'),
+        (RUNNING, 'Running'),
+        (DONE, 'Done'),
+        (FAILED, 'Failed'),
+    ]
+    CSV = 'csv'
+    XLSX = 'xlsx'
+    FORMAT_CHOICES = [
+        (CSV, 'CSV'),
+        (XLSX, 'XLSX'),
+    ]
+
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='job_application_imports'
+    )
+    # Deleted once imported.
+    file = models.FileField(upload_to='imports/', blank=True)
+    format = models.CharField(max_length=4, choices=FORMAT_CHOICES)
+    status = models.CharField(max_length=10, choices=STATUS_CHOICES, default=PENDING)
+    # Estimated before the rows are read; None if unknown.
+    total_rows = models.PositiveIntegerField(null=True, blank=True)
+    processed_rows = models.PositiveIntegerField(default=0)
+    imported_rows = models.PositiveIntegerField(default=0)
+    error_count = models.PositiveIntegerField(default=0)
+    # Why the whole import failed, if it did.
+    message = models.TextField(blank=True)
+    created_at = models.DateTimeField(auto_now_add=True)
+    started_at = models.DateTimeField(null=True, blank=True)
+    finished_at = models.DateTimeField(null=True, blank=True)
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"Import {self.pk} by {self.user.email} ({self.status})"
+
+
+class JobApplicationImportError(models.Model):
+    """A spreadsheet row that failed validation, with its errors by field."""
+    job_import = models.ForeignKey(JobApplicationImport, on_delete=models.CASCADE, related_name='errors')
+    # The spreadsheet row number; the header is row 1.
+    row = models.PositiveIntegerField()
+    errors = models.JSONField()
+    data = models.JSONField()
+
+    class Meta:
+        ordering = ['row']
+        indexes = [
+            models.Index(fields=['job_import', 'row']),
+        ]
+
+    def __str__(self):
+        return f"Import {self.job_import_id} row {self.row}"
+
+
+class JobTitleSuggestion(models.Model):
+    """
+    Per-user prefix index of job_post titles, kept by
+    apps.JobApplication.suggestions: a row for each prefix of each distinct
+    title (up to JOB_TITLE_SUGGEST_PREFIX_LENGTH characters), so a suggest
+    query is one index range read in recency order.
+    """
+    user = models.ForeignKey(
+        settings.AUTH_USER_MODEL,
+        on_delete=models.CASCADE,
+        related_name='+'
+    )
+    prefix = models.CharField(max_length=255)
+    # The title lowercased; titles differing only in case are suggested once.
+    key = models.CharField(max_length=255)
+    # The title as the user last typed it.
+    title = models.CharField(max_length=255)
+    # When the user last created an application with the title.
+    last_used_at = models.DateTimeField()
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(fields=['user', 'prefix', 'key'], name='jobtitle_user_prefix_key_uniq'),
+        ]
+        indexes = [
+            models.Index(fields=['user', 'prefix', '-last_used_at'], name='jobtitle_prefix_recent_idx'),
+        ]
+
+    def __str__(self):
+        return f"{self.title} for '{self.prefix}'"
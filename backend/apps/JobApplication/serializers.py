@@ -1,5 +1,8 @@
+import os
+
 from rest_framework import serializers
-from .models import JobApplication
+from .models import JobApplication, JobApplicationImport, JobApplicationImportError
+from django.conf import settings
 from django.utils import timezone
 
 class JobApplicationSerializer(serializers.ModelSerializer):
@@ -27,5 +30,63 @@ class JobApplicationSerializer(serializers.ModelSerializer):
         if data.get('applied', False) and not data.get('date_applied'):
             data['date_applied'] = timezone.now().date()
         return data
-    
-    
\ No newline at end of file
+
+
+class JobApplicationTransitionSerializer(serializers.Serializer):
+    ids = serializers.ListField(
+        child=serializers.IntegerField(min_value=1),
+        allow_empty=False,
+        max_length=settings.JOB_APPLICATION_BULK_MAX_IDS
+    )
+    transition = serializers.ChoiceField(choices=JobApplication.TRANSITION_CHOICES)
+    feedback_description = serializers.CharField(required=False, allow_blank=True)
+
+    def validate(self, data):
+        if 'feedback_description' in data and data['transition'] != JobApplication.FEEDBACK_RECEIVED:
+            raise serializers.ValidationError(
+                {"feedback_description": "Only allowed with the feedback_received transition."}
+            )
+        return data
+
+
+
+class JobApplicationImportSerializer(serializers.ModelSerializer):
+    file = serializers.FileField(write_only=True, help_text="CSV or XLSX file with a header row")
+
+    class Meta:
+        model = JobApplicationImport
+        fields = [
+            'id',
+            'file',
+            'format',
+            'status',
+            'total_rows',
+            'processed_rows',
+            'imported_rows',
+            'error_count',
+            'message',
+            'created_at',
+            'started_at',
+            'finished_at',
+        ]
+        read_only_fields = [field for field in fields if field != 'file']
+
+    def validate_file(self, value):
+        if value.size > settings.JOB_APPLICATION_IMPORT_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"The file is larger than {settings.JOB_APPLICATION_IMPORT_MAX_SIZE // (1 << 20)} MB."
+            )
+        extension = os.path.splitext(value.name)[1].lower().lstrip('.')
+        if extension not in dict(JobApplicationImport.FORMAT_CHOICES):
+            raise serializers.ValidationError("Upload a .csv or .xlsx file.")
+        return value
+
+    def validate(self, data):
+        data['format'] = os.path.splitext(data['file'].name)[1].lower().lstrip('.')
+        return data
+
+
+class JobApplicationImportErrorSerializer(serializers.ModelSerializer):
+    class Meta:
+        model = JobApplicationImportError
+        fields = ['row', 'errors', 'data']
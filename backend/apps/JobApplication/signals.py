@@ -0,0 +1,40 @@
+from django.db.models.signals import post_delete, post_save
+from django.dispatch import receiver
+
+from apps.core.tasks import run_in_background
+from .models import JobApplication, JobApplicationChange
+from .suggestions import refresh_title_suggestions
+from .sync import record_changes, signals_record_changes
+
+
+@receiver(post_save, sender=JobApplication, dispatch_uid='job_application_saved')
+def log_job_application_save(sender, instance, created, raw=False, **kwargs):
+    if raw or not signals_record_changes():
+        return
+    action = JobApplicationChange.CREATE if created else JobApplicationChange.UPDATE
+    record_changes([(instance.user_id, instance.pk)], action, [instance])
+
+
+@receiver(post_delete, sender=JobApplication, dispatch_uid='job_application_deleted')
+def log_job_application_delete(sender, instance, **kwargs):
+    if not signals_record_changes():
+        return
+    record_changes([(instance.user_id, instance.pk)], JobApplicationChange.DELETE)
+
+
+@receiver(post_save, sender=JobApplication, dispatch_uid='job_application_title_saved')
+def refresh_saved_title_suggestions(sender, instance, created, raw=False, **kwargs):
+    title = instance.__dict__.get('job_post')
+    previous = getattr(instance, '_loaded_job_post', None)
+    if raw or title is None or (not created and title == previous):
+        return
+    instance._loaded_job_post = title
+    run_in_background(refresh_title_suggestions, instance.user_id, {title, previous} - {None})
+
+
+@receiver(post_delete, sender=JobApplication, dispatch_uid='job_application_title_deleted')
+def refresh_deleted_title_suggestions(sender, instance, **kwargs):
+    # Archiving moves applications, titles and all, to ArchivedJobApplication.
+    if not signals_record_changes():
+        return
+    run_in_background(refresh_title_suggestions, instance.user_id, {instance.job_post})
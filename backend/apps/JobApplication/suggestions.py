@@ -0,0 +1,143 @@
+"""
+Job title autocomplete.
+
+JobTitleSuggestion is a per-user prefix index of the job_post titles of a
+user's applications, live and archived. Titles are compared lowercased.
+Each distinct title has a row for each of its first
+JOB_TITLE_SUGGEST_PREFIX_LENGTH prefixes. The row carries the title as it
+was last typed and when it was last used (its latest created_at). So
+suggest_job_titles() reads the top N rows for one prefix straight off the
+(user, prefix, -last_used_at) index, however long the user's history.
+
+The signal handlers refresh the titles an application gains or loses, in
+the background once the write commits. Archiving leaves a user's titles
+as they are, and bulk code (imports) refreshes them itself.
+`manage.py rebuild_job_title_suggestions` rebuilds the index from the
+applications, e.g. after changing JOB_TITLE_SUGGEST_PREFIX_LENGTH.
+Deleting a user cascades to their suggestions; a refresh that runs after
+it writes nothing.
+"""
+import operator
+from contextlib import contextmanager
+from functools import reduce
+
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.db import IntegrityError, transaction
+from django.db.models import Q
+
+from .models import ArchivedJobApplication, JobApplication, JobTitleSuggestion
+
+
+def title_key(title):
+    return title.lower()
+
+
+def title_prefixes(key):
+    return [key[:length] for length in range(1, min(len(key), settings.JOB_TITLE_SUGGEST_PREFIX_LENGTH) + 1)]
+
+
+def suggest_job_titles(user, query, limit):
+    """Up to `limit` of the `user`'s titles starting with `query`, ignoring case, most recently used first."""
+    key = title_key(query.lstrip())
+    if not key:
+        return []
+    suggestions = JobTitleSuggestion.objects.filter(user=user, prefix=key[:settings.JOB_TITLE_SUGGEST_PREFIX_LENGTH])
+    if len(key) > settings.JOB_TITLE_SUGGEST_PREFIX_LENGTH:
+        # Longer than the indexed prefixes: narrow down the titles sharing the longest one.
+        suggestions = suggestions.filter(key__startswith=key)
+    return list(suggestions.order_by('-last_used_at').values_list('title', flat=True)[:limit])
+
+
+def latest_uses(condition, keys=None):
+    """
+    {key: (title, last used)} for the applications, live and archived,
+    matching `condition`; only for `keys`, if given.
+    """
+    uses = {}
+    for model in (JobApplication, ArchivedJobApplication):
+        rows = model.objects.filter(condition).values_list('job_post', 'created_at').order_by()
+        for title, created_at in rows.iterator():
+            key = title_key(title)
+            if (keys is None or key in keys) and (key not in uses or created_at > uses[key][1]):
+                uses[key] = (title, created_at)
+    return uses
+
+
+def suggestion_rows(user_id, uses):
+    return [
+        JobTitleSuggestion(user_id=user_id, prefix=prefix, key=key, title=title, last_used_at=last_used_at)
+        for key, (title, last_used_at) in uses.items()
+        for prefix in title_prefixes(key)
+    ]
+
+
+class UserDeleted(Exception):
+    pass
+
+
+@contextmanager
+def writing_suggestions(user_id):
+    """
+    A transaction for writing the suggestions of the user with `user_id`.
+    The user's row is locked, so deleting the user waits for it and then
+    cascades to what it wrote. Raises UserDeleted if the user is gone.
+    """
+    try:
+        with transaction.atomic():
+            if not get_user_model().objects.select_for_update().filter(pk=user_id).exists():
+                raise UserDeleted(user_id)
+            yield
+    except IntegrityError:
+        # Without row locks (SQLite), the user can still go in between.
+        if get_user_model().objects.filter(pk=user_id).exists():
+            raise
+        raise UserDeleted(user_id)
+
+
+def refresh_title_suggestions(user_id, titles):
+    """Bring the suggestions for `titles` in line with the applications of the user with `user_id`."""
+    titles = {title for title in titles if title}
+    if not titles:
+        return
+    keys = {title_key(title) for title in titles}
+    # iexact narrows the user's applications down in the database; the keys decide.
+    same_titles = reduce(operator.or_, (Q(job_post__iexact=title) for title in titles))
+    uses = latest_uses(Q(user_id=user_id) & same_titles, keys)
+    unused = keys - set(uses)
+    try:
+        with writing_suggestions(user_id):
+            if unused:
+                JobTitleSuggestion.objects.filter(
+                    reduce(operator.or_, (Q(prefix__in=title_prefixes(key), key=key) for key in unused)),
+                    user_id=user_id,
+                ).delete()
+            JobTitleSuggestion.objects.bulk_create(
+                suggestion_rows(user_id, uses),
+                update_conflicts=True,
+                unique_fields=['user', 'prefix', 'key'],
+                update_fields=['title', 'last_used_at'],
+            )
+    except UserDeleted:
+        pass
+
+
+def rebuild_title_suggestions(user_ids=None, batch_size=1000):
+    """
+    Rebuild the suggestions of the users with `user_ids`, or of every user,
+    one transaction per user. Returns the number of users rebuilt.
+    """
+    users = get_user_model().objects.order_by('pk')
+    if user_ids is not None:
+        users = users.filter(pk__in=user_ids)
+    rebuilt = 0
+    for user_id in list(users.values_list('pk', flat=True)):
+        uses = latest_uses(Q(user_id=user_id))
+        try:
+            with writing_suggestions(user_id):
+                JobTitleSuggestion.objects.filter(user_id=user_id).delete()
+                JobTitleSuggestion.objects.bulk_create(suggestion_rows(user_id, uses), batch_size=batch_size)
+        except UserDeleted:
+            continue
+        rebuilt += 1
+    return rebuilt
@@ -0,0 +1,127 @@
+"""
+Change log recording and incremental (delta) sync for job applications.
+
+Every write is logged to JobApplicationChange, whose id is a monotonic
+sequence number. A sync token is a signed (sequence, issued at) pair. The
+next sync returns the applications with changes after that sequence, plus
+any logged in the JOB_APPLICATION_SYNC_OVERLAP seconds before the token was
+issued. Those may have committed after the token's sequence was read,
+despite their lower ids.
+
+Ids are handed out when a change is logged, not when it commits, so the
+overlap bounds how long a transaction may stay open after logging one. A
+change committed more than JOB_APPLICATION_SYNC_OVERLAP seconds after it
+was logged, with a sync in between, is never sent to that client. Writers
+therefore log changes last: request writes autocommit, and bulk
+transitions, import batches and archive/restore batches (a few hundred
+rows each) call record_changes() with at most a couple of small writes
+left before COMMIT. So the window only has to cover the commit itself and
+clock skew between app servers. Code that logs changes inside a longer
+transaction must stay under the overlap, or raise it.
+"""
+from contextlib import contextmanager
+from contextvars import ContextVar
+from datetime import datetime, timedelta, timezone as dt_timezone
+
+from django.conf import settings
+from django.core import signing
+from django.db.models import Max
+from django.utils import timezone
+
+from .events import publish_changes
+from .models import JobApplication, JobApplicationChange
+
+SYNC_TOKEN_SALT = 'apps.JobApplication.sync'
+
+_signals_record_changes = ContextVar('job_application_signals_record_changes', default=True)
+
+
+def record_changes(changes, action, applications=()):
+    """
+    Log `action` for (user_id, application_id) pairs with one INSERT, and
+    publish them as events including the data of any of `applications`.
+    """
+    logged = JobApplicationChange.objects.bulk_create(
+        JobApplicationChange(user_id=user_id, application_id=application_id, action=action)
+        for user_id, application_id in changes
+    )
+    publish_changes(logged, applications)
+    return logged
+
+
+def signals_record_changes():
+    return _signals_record_changes.get()
+
+
+@contextmanager
+def changes_recorded_manually():
+    """Stop the save/delete signal handlers logging changes, for bulk code that calls record_changes() itself."""
+    token = _signals_record_changes.set(False)
+    try:
+        yield
+    finally:
+        _signals_record_changes.reset(token)
+
+
+def make_sync_token(sequence, issued_at):
+    return signing.dumps([sequence, issued_at.timestamp()], salt=SYNC_TOKEN_SALT, compress=True)
+
+
+def read_sync_token(token):
+    """
+    Return the (sequence, issued at) in `token`. Raises signing.BadSignature
+    for forged tokens and signing.SignatureExpired for tokens older than the
+    change log retention.
+    """
+    sequence, issued_at = signing.loads(
+        token, salt=SYNC_TOKEN_SALT, max_age=timedelta(days=settings.JOB_APPLICATION_CHANGE_RETENTION_DAYS)
+    )
+    return sequence, datetime.fromtimestamp(issued_at, tz=dt_timezone.utc)
+
+
+def sync_job_applications(user, token=None, limit=None):
+    """
+    Return a dict with the `user`'s applications changed since `token`
+    ('changed'), the ids of those removed ('deleted'), the next token, and
+    whether more changes are waiting ('has_more'). Without a token, or with
+    an expired one, every application is returned and 'full' is True.
+    """
+    limit = limit or settings.JOB_APPLICATION_SYNC_PAGE_SIZE
+    issued_at = timezone.now()
+    try:
+        sequence, previous_issued_at = read_sync_token(token) if token else (None, None)
+    except signing.SignatureExpired:
+        sequence = None
+
+    if sequence is None:
+        # Read the sequence first, so writes made while the snapshot is read
+        # are returned again by the next sync.
+        sequence = JobApplicationChange.objects.aggregate(sequence=Max('id'))['sequence'] or 0
+        return {
+            'full': True,
+            'changed': list(JobApplication.objects.filter(user=user)),
+            'deleted': [],
+            'has_more': False,
+            'token': make_sync_token(sequence, issued_at),
+        }
+
+    changes = JobApplicationChange.objects.filter(user=user)
+    new_changes = list(changes.filter(id__gt=sequence).order_by('id').values_list('id', 'application_id')[:limit + 1])
+    has_more = len(new_changes) > limit
+    new_changes = new_changes[:limit]
+    application_ids = {application_id for _, application_id in new_changes}
+    application_ids.update(changes.filter(
+        id__lte=sequence,
+        created_at__gte=previous_issued_at - timedelta(seconds=settings.JOB_APPLICATION_SYNC_OVERLAP),
+    ).values_list('application_id', flat=True))
+    if new_changes:
+        sequence = new_changes[-1][0]
+
+    changed = list(JobApplication.objects.filter(user=user, pk__in=application_ids))
+    return {
+        'full': False,
+        'changed': changed,
+        'deleted': sorted(application_ids - {application.pk for application in changed}),
+        'has_more': has_more,
+        'token': make_sync_token(sequence, issued_at),
+    }
@@ -1,3 +1,522 @@
-from django.test import TestCase
+import datetime
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+import openpyxl
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.db import connection
+from django.test import RequestFactory, TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils import timezone
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.core.events import Event, get_broker
+
+from .analytics import refresh_daily_stats
+from .archive import archivable_job_applications, archive_job_applications, restore_job_applications
+from .events import user_channel
+from .models import (
+    ArchivedJobApplication,
+    JobApplication,
+    JobApplicationChange,
+    JobApplicationDailyStats,
+    JobApplicationImport,
+    JobTitleSuggestion,
+)
+from .suggestions import rebuild_title_suggestions, refresh_title_suggestions
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class AnalystTestCase(TestCase):
+    """Tests with `client` authenticated as `user`, an analyst without staff access."""
+
+    def setUp(self):
+        self.user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        self.client = APIClient()
+        self.client.force_authenticate(self.user)
+
+    def create_other_user(self):
+        return get_user_model().objects.create_user(username='other', email='other@example.com', email_verified=True)
+
+
+@override_settings(JOB_APPLICATION_ARCHIVE_AFTER_DAYS=365, JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS=90)
+class ArchiveTests(AnalystTestCase):
+    def create(self, job_post, days_old, **fields):
+        application = JobApplication.objects.create(user=self.user, job_post=job_post, **fields)
+        # Backdate past auto_now.
+        JobApplication.objects.filter(pk=application.pk).update(
+            updated_at=timezone.now() - datetime.timedelta(days=days_old),
+            created_at=timezone.now() - datetime.timedelta(days=days_old + 10),
+        )
+        application.refresh_from_db()
+        return application
+
+    def test_archivable(self):
+        stale = self.create("Stale", 400)
+        closed = self.create("Closed", 100, received_feedback=True)
+        self.create("Recently closed", 10, secured_job=True)
+        self.create("Open", 100)
+        self.assertCountEqual(archivable_job_applications(), [stale, closed])
+
+    def test_archive_and_restore_round_trip(self):
+        application = self.create("SOC Analyst", 400, applied=True, date_applied=datetime.date(2024, 1, 2))
+        before = self.client.get(reverse('job-application-detail', args=[application.pk])).json()['data']
+
+        self.assertEqual(archive_job_applications(batch_size=1), 1)
+        self.assertFalse(JobApplication.objects.exists())
+        self.assertEqual(self.client.get(reverse('job-application-detail', args=[application.pk])).status_code, 404)
+        archived = self.client.get(reverse('job-application-detail', args=[application.pk]) + '?include_archived=true')
+        self.assertEqual(archived.json()['data'], before)
+
+        self.assertEqual(restore_job_applications(ArchivedJobApplication.objects.all()), 1)
+        restored = JobApplication.objects.get(pk=application.pk)
+        self.assertEqual(restored.created_at, application.created_at)
+        self.assertGreater(restored.updated_at, application.updated_at)
+        self.assertFalse(ArchivedJobApplication.objects.exists())
+
+    def test_list_only_includes_archived_when_asked(self):
+        self.create("Stale", 400, date_applied=datetime.date(2024, 1, 1))
+        self.create("Open", 0, date_applied=datetime.date(2025, 1, 1))
+        archive_job_applications()
+
+        response = self.client.get(reverse('job-application-list'))
+        self.assertEqual([row['job_post'] for row in response.json()['data']], ["Open"])
+        response = self.client.get(reverse('job-application-list'), {'include_archived': 'true'})
+        self.assertEqual([row['job_post'] for row in response.json()['data']], ["Open", "Stale"])
+        response = self.client.get(
+            reverse('job-application-list'), {'include_archived': 'true', 'ordering': 'date_applied', 'search': 'Stale'}
+        )
+        self.assertEqual([row['job_post'] for row in response.json()['data']], ["Stale"])
+
+    def test_restore_endpoint(self):
+        application = self.create("Stale", 400)
+        archive_job_applications()
+        response = self.client.post(reverse('job-application-restore', args=[application.pk]))
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.json()['data']['id'], application.pk)
+        self.assertTrue(JobApplication.objects.filter(pk=application.pk).exists())
+        self.assertEqual(self.client.post(reverse('job-application-restore', args=[application.pk])).status_code, 404)
+
+    def test_admin_actions_need_write_permissions(self):
+        staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', is_staff=True, email_verified=True
+        )
+        request = RequestFactory().get('/admin/')
+
+        def actions(model):
+            # Fresh user each time: permissions are cached on the instance.
+            request.user = get_user_model().objects.get(pk=staff.pk)
+            return set(admin.site._registry[model].get_actions(request))
+
+        staff.user_permissions.set(Permission.objects.filter(
+            codename__in=['view_jobapplication', 'view_archivedjobapplication']
+        ))
+        self.assertNotIn('archive_selected', actions(JobApplication))
+        self.assertNotIn('restore_selected', actions(ArchivedJobApplication))
+
+        staff.user_permissions.add(*Permission.objects.filter(
+            codename__in=['delete_jobapplication', 'add_jobapplication', 'delete_archivedjobapplication']
+        ))
+        self.assertIn('archive_selected', actions(JobApplication))
+        self.assertIn('restore_selected', actions(ArchivedJobApplication))
+
+
+@override_settings(JOB_APPLICATION_SYNC_PAGE_SIZE=2, JOB_APPLICATION_SYNC_OVERLAP=0)
+class SyncTests(AnalystTestCase):
+    def sync(self, token=None):
+        params = {'token': token} if token else {}
+        response = self.client.get(reverse('job-application-sync'), params)
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']
+
+    def test_full_then_incremental_sync(self):
+        kept = JobApplication.objects.create(user=self.user, job_post="Kept")
+        data = self.sync()
+        self.assertTrue(data['full'])
+        self.assertEqual([row['job_post'] for row in data['changed']], ["Kept"])
+
+        data = self.sync(data['sync_token'])
+        self.assertEqual((data['changed'], data['deleted']), ([], []))
+
+        deleted = JobApplication.objects.create(user=self.user, job_post="Deleted")
+        self.client.delete(reverse('job-application-detail', args=[deleted.pk]))
+        self.client.put(reverse('job-application-detail', args=[kept.pk]), {'job_post': "Renamed"}, format='json')
+        self.client.post(reverse('job-application-list'), {'job_post': "New"}, format='json')
+        other = self.create_other_user()
+        JobApplication.objects.create(user=other, job_post="Not mine")
+
+        # Four changes at two per page.
+        first = self.sync(data['sync_token'])
+        self.assertTrue(first['has_more'])
+        self.assertEqual(first['changed'], [])
+        self.assertEqual(first['deleted'], [deleted.pk])
+        second = self.sync(first['sync_token'])
+        self.assertFalse(second['has_more'])
+        self.assertEqual(sorted(row['job_post'] for row in second['changed']), ["New", "Renamed"])
+
+    def test_overlap_resends_recent_changes(self):
+        token = self.sync()['sync_token']
+        application = JobApplication.objects.create(user=self.user, job_post="Recent")
+        with override_settings(JOB_APPLICATION_SYNC_OVERLAP=60):
+            data = self.sync(token)
+            self.assertEqual([row['id'] for row in data['changed']], [application.pk])
+            # Sent again by the next sync, as it may have been committed late.
+            data = self.sync(data['sync_token'])
+            self.assertEqual([row['id'] for row in data['changed']], [application.pk])
+
+    def test_archived_applications_are_tombstoned(self):
+        application = JobApplication.objects.create(user=self.user, job_post="Old")
+        token = self.sync()['sync_token']
+        archive_job_applications(JobApplication.objects.all())
+        self.assertEqual(self.sync(token)['deleted'], [application.pk])
+
+    def test_invalid_token(self):
+        response = self.client.get(reverse('job-application-sync'), {'token': 'forged'})
+        self.assertEqual(response.status_code, 400)
+
+
+@override_settings(EVENT_STREAM_HEARTBEAT=0.05)
+class EventStreamTests(AnalystTestCase):
+    def setUp(self):
+        super().setUp()
+        self.token = str(AccessToken.for_user(self.user))
+
+    async def test_requires_authentication(self):
+        response = await self.async_client.get(reverse('job-application-events'))
+        self.assertEqual(response.status_code, 401)
+        response = await self.async_client.get(reverse('job-application-events'), {'access_token': 'forged'})
+        self.assertEqual(response.status_code, 401)
+
+    async def test_replay_heartbeat_and_live_events(self):
+        application = await JobApplication.objects.acreate(user=self.user, job_post="Replayed")
+        response = await self.async_client.get(
+            reverse('job-application-events'), headers={'Authorization': f'Bearer {self.token}', 'Last-Event-ID': '0'}
+        )
+        self.assertEqual(response['Content-Type'], 'text/event-stream')
+        stream = aiter(response.streaming_content)
+        try:
+            self.assertTrue((await anext(stream)).startswith(b'retry: '))
+            replayed = await anext(stream)
+            self.assertIn(b'event: create\n', replayed)
+            self.assertIn(f'"id":{application.pk}'.encode(), replayed)
+            self.assertEqual(await anext(stream), b': heartbeat\n\n')
+
+            replayed_id = int(replayed.split(b'\n')[0][len(b'id: '):])
+            broker = get_broker()
+            # Already replayed, so not sent twice.
+            broker.publish(user_channel(self.user.pk), Event(replayed_id, 'create', '{}'))
+            broker.publish(user_channel(self.user.pk + 1), Event(replayed_id + 1, 'create', '{}'))
+            broker.publish(user_channel(self.user.pk), Event(replayed_id + 2, 'update', '{}'))
+            self.assertEqual(await anext(stream), f'id: {replayed_id + 2}\nevent: update\ndata: {{}}\n\n'.encode())
+        finally:
+            await stream.aclose()
+
+    def test_mark_as_secured_publishes_once_committed(self):
+        application = JobApplication.objects.create(user=self.user, job_post="SOC Analyst")
+        with mock.patch.object(get_broker(), 'publish') as publish:
+            with self.captureOnCommitCallbacks(execute=True):
+                response = self.client.post(reverse('job-application-mark-as-secured', args=[application.pk]))
+                publish.assert_not_called()
+        self.assertEqual(response.status_code, 200)
+        (channel, event), _ = publish.call_args
+        self.assertEqual(channel, user_channel(self.user.pk))
+        self.assertEqual(event.type, 'secured')
+        self.assertIn('"secured_job":true', event.data)
+
+
+class TransitionTests(AnalystTestCase):
+    def transition(self, **data):
+        return self.client.post(reverse('job-application-bulk-transition'), data, format='json')
+
+    def test_bulk_transition_in_one_update(self):
+        dated = JobApplication.objects.create(user=self.user, job_post="Dated", date_applied=datetime.date(2024, 5, 1))
+        undated = JobApplication.objects.create(user=self.user, job_post="Undated")
+        other = self.create_other_user()
+        not_mine = JobApplication.objects.create(user=other, job_post="Not mine")
+
+        with CaptureQueriesContext(connection) as queries:
+            response = self.transition(ids=[dated.pk, undated.pk, not_mine.pk, 999], transition='applied')
+        self.assertEqual(response.status_code, 200)
+        updates = [query['sql'] for query in queries if query['sql'].startswith('UPDATE "JobApplication_jobapplication"')]
+        self.assertEqual(len(updates), 1)
+
+        data = response.json()['data']
+        self.assertEqual([row['id'] for row in data['updated']], [dated.pk, undated.pk])
+        self.assertEqual(data['not_found'], [not_mine.pk, 999])
+        self.assertEqual(data['updated'][0]['date_applied'], '2024-05-01')
+        self.assertEqual(data['updated'][1]['date_applied'], timezone.now().date().isoformat())
+        self.assertFalse(JobApplication.objects.get(pk=not_mine.pk).applied)
+        self.assertEqual(
+            JobApplicationChange.objects.filter(application_id__in=[dated.pk, undated.pk], action='update').count(), 2
+        )
+
+    def test_feedback_description(self):
+        application = JobApplication.objects.create(user=self.user, job_post="SOC Analyst")
+        response = self.transition(ids=[application.pk], transition='feedback_received', feedback_description="Rejected")
+        self.assertEqual(response.json()['data']['updated'][0]['feedback_description'], "Rejected")
+        response = self.transition(ids=[application.pk], transition='secured', feedback_description="Hired")
+        self.assertEqual(response.status_code, 400)
+
+    def test_mark_as_secured(self):
+        application = JobApplication.objects.create(user=self.user, job_post="SOC Analyst")
+        response = self.client.post(reverse('job-application-mark-as-secured', args=[application.pk]))
+        self.assertTrue(response.json()['data']['secured_job'])
+        self.assertEqual(JobApplicationChange.objects.filter(application_id=application.pk).last().action, 'secured')
+        self.assertEqual(self.client.post(reverse('job-application-mark-as-secured', args=[999])).status_code, 404)
+
+
+@override_settings(
+    JOB_APPLICATION_STATS_OVERLAP=0,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class AnalyticsTests(AnalystTestCase):
+    def setUp(self):
+        super().setUp()
+        self.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='x', email_verified=True
+        )
+        self.monday = timezone.localdate() - datetime.timedelta(days=timezone.localdate().weekday() + 7)
+        self.tuesday = self.monday + datetime.timedelta(days=1)
+
+    def create(self, day, **fields):
+        application = JobApplication.objects.create(user=self.user, job_post="Analyst", **fields)
+        created_at = timezone.make_aware(datetime.datetime.combine(day, datetime.time(9)))
+        # Backdated, so later saves are newer than the refresh watermark.
+        JobApplication.objects.filter(pk=application.pk).update(
+            created_at=created_at, updated_at=timezone.now() - datetime.timedelta(minutes=5)
+        )
+        return JobApplication.objects.get(pk=application.pk)
+
+    def test_incremental_refresh(self):
+        self.create(self.monday, applied=True)
+        feedback = self.create(self.monday, applied=True, received_feedback=True)
+        JobApplication.objects.filter(pk=feedback.pk).update(
+            feedback_received_at=feedback.created_at + datetime.timedelta(days=3)
+        )
+        tuesday = self.create(self.tuesday)
+        self.assertEqual(refresh_daily_stats(), 2)
+
+        stats = JobApplicationDailyStats.objects.get(day=self.monday)
+        self.assertEqual((stats.created, stats.applied, stats.received_feedback, stats.secured_job), (2, 2, 1, 0))
+        self.assertEqual(stats.time_to_feedback, datetime.timedelta(days=3))
+
+        # Nothing changed: nothing to do.
+        self.assertEqual(refresh_daily_stats(), 0)
+        tuesday.secured_job = True
+        tuesday.save()
+        self.assertEqual(refresh_daily_stats(), 1)
+        self.assertEqual(JobApplicationDailyStats.objects.get(day=self.tuesday).secured_job, 1)
+
+        # Archived applications still count; deleted ones go on a full refresh.
+        archive_job_applications(JobApplication.objects.filter(pk=feedback.pk))
+        tuesday.delete()
+        self.assertEqual(refresh_daily_stats(full=True), 1)
+        self.assertEqual(JobApplicationDailyStats.objects.get(day=self.monday).received_feedback, 1)
+        self.assertFalse(JobApplicationDailyStats.objects.filter(day=self.tuesday).exists())
+
+    def test_feedback_received_at_is_set_once(self):
+        application = JobApplication.objects.create(user=self.user, job_post="Analyst", received_feedback=True)
+        received_at = application.feedback_received_at
+        self.assertIsNotNone(received_at)
+        application.save()
+        self.assertEqual(application.feedback_received_at, received_at)
+
+    def test_admin_charts(self):
+        self.create(self.monday, applied=True)
+        self.create(self.tuesday, applied=True, secured_job=True)
+        refresh_daily_stats()
+        self.client.force_login(self.admin)
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.get(reverse('admin:JobApplication_jobapplication_analytics'), {'weeks': 4})
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.context['stages'][3]['count'], 1)
+        self.assertEqual(response.context['stages'][3]['conversion'], None)
+        self.assertEqual(response.context['weeks'][0]['created'], 2)
+        self.assertFalse([query for query in queries if 'JobApplication_jobapplication"' in query['sql']])
+
+        self.client.force_login(self.user)
+        response = self.client.get(reverse('admin:JobApplication_jobapplication_analytics'))
+        self.assertEqual(response.status_code, 302)
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True, JOB_APPLICATION_IMPORT_BATCH_SIZE=2, JOB_APPLICATION_IMPORT_MAX_ERRORS=2)
+class ImportTests(AnalystTestCase):
+    def setUp(self):
+        super().setUp()
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def upload(self, name, content):
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.post(
+                reverse('job-application-import-list'), {'file': SimpleUploadedFile(name, content)}, format='multipart'
+            )
+        return response
+
+    def test_csv_import(self):
+        content = (
+            "\ufeffJob Title,Description,Applied,Date Applied,Feedback,Notes,Salary\n"
+            "SOC Analyst,Tier 1,yes,2024-05-01,no,,100\n"
+            "Pentester,,maybe,,,,\n"
+            ",,,,,,\n"
+            "GRC Analyst,,true,,yes,Rejected,\n"
+            "Threat Hunter,,,not a date,,,\n"
+            "Red Teamer,,,,,,\n"
+            ",Missing title,,,,,\n"
+        ).encode()
+        response = self.upload('tracker.csv', content)
+        self.assertEqual(response.status_code, 202)
+        job_import = JobApplicationImport.objects.get(pk=response.json()['data']['id'])
+        self.assertEqual(job_import.status, 'done')
+        self.assertEqual(
+            (job_import.total_rows, job_import.processed_rows, job_import.imported_rows, job_import.error_count),
+            (7, 6, 3, 3)
+        )
+        self.assertFalse(job_import.file)
+
+        applications = {application.job_post: application for application in JobApplication.objects.filter(user=self.user)}
+        self.assertEqual(sorted(applications), ["GRC Analyst", "Red Teamer", "SOC Analyst"])
+        self.assertEqual(applications["SOC Analyst"].date_applied, datetime.date(2024, 5, 1))
+        self.assertEqual(applications["GRC Analyst"].date_applied, timezone.now().date())
+        self.assertIsNotNone(applications["GRC Analyst"].feedback_received_at)
+        self.assertEqual(JobApplicationChange.objects.filter(user=self.user, action='create').count(), 3)
+        self.assertEqual(
+            list(JobTitleSuggestion.objects.filter(user=self.user, prefix='r').values_list('title', flat=True)),
+            ["Red Teamer"]
+        )
+
+        response = self.client.get(reverse('job-application-import-detail', args=[job_import.pk]))
+        self.assertEqual(response.json()['data']['imported_rows'], 3)
+
+        # Only JOB_APPLICATION_IMPORT_MAX_ERRORS errors are kept, a page at a time.
+        with override_settings(JOB_APPLICATION_IMPORT_ERRORS_PAGE_SIZE=1):
+            data = self.client.get(reverse('job-application-import-errors', args=[job_import.pk])).json()['data']
+            self.assertEqual(data['error_count'], 3)
+            self.assertEqual([(error['row'], list(error['errors'])) for error in data['errors']], [(3, ['applied'])])
+            data = self.client.get(
+                reverse('job-application-import-errors', args=[job_import.pk]), {'after': data['next_after']}
+            ).json()['data']
+            self.assertEqual([(error['row'], list(error['errors'])) for error in data['errors']], [(6, ['date_applied'])])
+            self.assertIsNone(data['next_after'])
+
+    def test_xlsx_import(self):
+        workbook = openpyxl.Workbook()
+        workbook.active.append(["Position", "Applied", "Date Applied"])
+        workbook.active.append(["SOC Analyst", True, datetime.datetime(2024, 5, 1)])
+        workbook.active.append([None, None, None])
+        workbook.active.append(["Pentester", "maybe", None])
+        content = io.BytesIO()
+        workbook.save(content)
+
+        response = self.upload('tracker.xlsx', content.getvalue())
+        job_import = JobApplicationImport.objects.get(pk=response.json()['data']['id'])
+        self.assertEqual(job_import.status, 'done')
+        self.assertEqual((job_import.imported_rows, job_import.error_count), (1, 1))
+        application = JobApplication.objects.get(user=self.user)
+        self.assertEqual((application.job_post, application.date_applied), ("SOC Analyst", datetime.date(2024, 5, 1)))
+
+    def test_file_without_a_job_post_column_fails(self):
+        response = self.upload('tracker.csv', b"Company,Applied\nACME,yes\n")
+        job_import = JobApplicationImport.objects.get(pk=response.json()['data']['id'])
+        self.assertEqual(job_import.status, 'failed')
+        self.assertIn("No job post column", job_import.message)
+        self.assertFalse(JobApplication.objects.exists())
+
+    def test_rejected_uploads(self):
+        self.assertEqual(self.upload('tracker.txt', b"Job\nAnalyst\n").status_code, 400)
+        with mock.patch('apps.JobApplication.imports.openpyxl', None):
+            self.assertEqual(self.upload('tracker.xlsx', b"PK").status_code, 400)
+        self.assertFalse(JobApplicationImport.objects.exists())
+
+    def test_imports_are_private(self):
+        other = self.create_other_user()
+        job_import = JobApplicationImport.objects.create(user=other, format='csv')
+        response = self.client.get(reverse('job-application-import-detail', args=[job_import.pk]))
+        self.assertEqual(response.status_code, 404)
+        self.assertFalse(self.client.get(reverse('job-application-import-list')).json()['data'])
+
+
+@override_settings(BACKGROUND_TASKS_EAGER=True)
+class SuggestionTests(AnalystTestCase):
+    def suggest(self, query, **params):
+        response = self.client.get(reverse('job-application-suggest'), {'q': query, **params})
+        self.assertEqual(response.status_code, 200)
+        return response.json()['data']['suggestions']
+
+    def create(self, job_post, user=None):
+        with self.captureOnCommitCallbacks(execute=True):
+            return JobApplication.objects.create(user=user or self.user, job_post=job_post)
+
+    def test_suggestions_follow_saves_and_deletes(self):
+        self.create("Security Analyst")
+        self.create("SOC Analyst")
+        engineer = self.create("security engineer")
+        other = self.create_other_user()
+        self.create("Security Architect", user=other)
+
+        self.assertEqual(self.suggest("Sec"), ["security engineer", "Security Analyst"])
+        self.assertEqual(self.suggest("  s", limit=2), ["security engineer", "SOC Analyst"])
+        self.assertEqual(self.suggest("x"), [])
+        self.assertEqual(self.suggest(""), [])
+
+        # Titles are suggested once, as last typed, ranked by their latest use.
+        analyst = self.create("SECURITY ANALYST")
+        self.assertEqual(self.suggest("security"), ["SECURITY ANALYST", "security engineer"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.put(reverse('job-application-detail', args=[engineer.pk]), {'job_post': "Pentester"}, format='json')
+        self.assertEqual(self.suggest("security"), ["SECURITY ANALYST"])
+        self.assertEqual(self.suggest("pen"), ["Pentester"])
+
+        with self.captureOnCommitCallbacks(execute=True):
+            self.client.delete(reverse('job-application-detail', args=[analyst.pk]))
+        self.assertEqual(self.suggest("security"), ["Security Analyst"])
+
+    def test_archived_titles_are_suggested(self):
+        self.create("Threat Hunter")
+        with self.captureOnCommitCallbacks(execute=True):
+            archive_job_applications(JobApplication.objects.all())
+        self.assertEqual(self.suggest("threat"), ["Threat Hunter"])
+
+    @override_settings(JOB_TITLE_SUGGEST_PREFIX_LENGTH=3)
+    def test_queries_longer_than_the_indexed_prefixes(self):
+        self.create("Red Teamer")
+        self.create("Red Team Lead")
+        self.assertEqual(JobTitleSuggestion.objects.filter(user=self.user).count(), 6)
+        self.assertEqual(self.suggest("red team"), ["Red Team Lead", "Red Teamer"])
+        self.assertEqual(self.suggest("red teame"), ["Red Teamer"])
+
+    def test_rebuild(self):
+        JobApplication.objects.bulk_create([
+            JobApplication(user=self.user, job_post="Incident Responder"),
+            JobApplication(user=self.user, job_post="incident responder"),
+        ])
+        self.assertEqual(self.suggest("inc"), [])
+        self.assertEqual(rebuild_title_suggestions([self.user.pk]), 1)
+        self.assertEqual(len(self.suggest("inc")), 1)
+        self.assertEqual(JobTitleSuggestion.objects.filter(user=self.user).count(), len("incident responder"))
+
+    def test_refresh_after_the_user_is_deleted(self):
+        user_id = self.user.pk
+
+        def latest_uses(condition, keys=None):
+            # The user is deleted while the refresh reads their titles.
+            get_user_model().objects.filter(pk=user_id).delete()
+            return {'forensic analyst': ("Forensic Analyst", timezone.now())}
+
+        with mock.patch('apps.JobApplication.suggestions.latest_uses', latest_uses):
+            refresh_title_suggestions(user_id, {"Forensic Analyst"})
+        self.assertFalse(JobTitleSuggestion.objects.exists())
+        self.assertEqual(rebuild_title_suggestions([user_id]), 0)
@@ -0,0 +1,48 @@
+"""
+Status transitions applied to many job applications with one UPDATE.
+"""
+from django.db import transaction
+from django.db.models import F, Value
+from django.db.models.functions import Coalesce
+from django.utils import timezone
+
+from .models import JobApplication, JobApplicationChange
+from .sync import record_changes
+
+
+def transition_values(transition, feedback_description=None):
+    now = timezone.now()
+    if transition == JobApplication.APPLIED:
+        # Same defaulting as JobApplication.save().
+        values = {'applied': True, 'date_applied': Coalesce(F('date_applied'), Value(now.date()))}
+    elif transition == JobApplication.FEEDBACK_RECEIVED:
+        values = {'received_feedback': True, 'feedback_received_at': Coalesce(F('feedback_received_at'), Value(now))}
+        if feedback_description is not None:
+            values['feedback_description'] = feedback_description
+    elif transition == JobApplication.SECURED:
+        values = {'secured_job': True}
+    else:
+        raise ValueError(f'Unknown job application transition {transition!r}')
+    # update() does not apply auto_now.
+    values['updated_at'] = now
+    return values
+
+
+def transition_job_applications(transition, ids, user=None, feedback_description=None):
+    """
+    Apply `transition` to the applications with these `ids` (only the
+    `user`'s, if given) in a single UPDATE, log the changes, and return the
+    updated applications.
+    """
+    queryset = JobApplication.objects.filter(pk__in=ids)
+    if user is not None:
+        queryset = queryset.filter(user=user)
+    action = JobApplicationChange.SECURED if transition == JobApplication.SECURED else JobApplicationChange.UPDATE
+
+    with transaction.atomic():
+        queryset.update(**transition_values(transition, feedback_description))
+        applications = list(queryset.order_by('pk'))
+        record_changes(
+            [(application.user_id, application.pk) for application in applications], action, applications
+        )
+    return applications
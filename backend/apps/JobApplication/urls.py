@@ -1,8 +1,17 @@
 from django.urls import path
-from .views import *
+from .views import JobApplicationImportViewSet, JobApplicationViewSet, job_application_events
 
 
 urlpatterns = [
     path('job-applications/', JobApplicationViewSet.as_view({'get': 'list', 'post': 'create'}), name='job-application-list'),
+    path('job-applications/events/', job_application_events, name='job-application-events'),
+    path('job-applications/bulk-transition/', JobApplicationViewSet.as_view({'post': 'bulk_transition'}), name='job-application-bulk-transition'),
+    path('job-applications/sync/', JobApplicationViewSet.as_view({'get': 'sync'}), name='job-application-sync'),
+    path('job-applications/suggest/', JobApplicationViewSet.as_view({'get': 'suggest'}), name='job-application-suggest'),
+    path('job-applications/imports/', JobApplicationImportViewSet.as_view({'get': 'list', 'post': 'create'}), name='job-application-import-list'),
+    path('job-applications/imports/<int:pk>/', JobApplicationImportViewSet.as_view({'get': 'retrieve'}), name='job-application-import-detail'),
+    path('job-applications/imports/<int:pk>/errors/', JobApplicationImportViewSet.as_view({'get': 'errors'}), name='job-application-import-errors'),
     path('job-applications/<int:pk>/', JobApplicationViewSet.as_view({'get': 'retrieve', 'put': 'update', 'delete': 'destroy'}), name='job-application-detail'),
+    path('job-applications/<int:pk>/mark_as_secured/', JobApplicationViewSet.as_view({'post': 'mark_as_secured'}), name='job-application-mark-as-secured'),
+    path('job-applications/<int:pk>/restore/', JobApplicationViewSet.as_view({'post': 'restore'}), name='job-application-restore'),
 ]
@@ -1,10 +1,31 @@
-from rest_framework import viewsets, permissions, filters
+from rest_framework import mixins, viewsets, permissions, filters
 from rest_framework.response import Response
-from .models import JobApplication
-from .serializers import JobApplicationSerializer
+from apps.core.budgets import query_budget
+from apps.core.idempotency import idempotent
+from apps.core.tasks import run_in_background
+from .archive import FIELDS, restore_job_applications
+from .events import event_stream
+from .imports import can_import, run_import
+from .models import ArchivedJobApplication, JobApplication, JobApplicationImport
+from .serializers import (
+    JobApplicationImportErrorSerializer,
+    JobApplicationImportSerializer,
+    JobApplicationSerializer,
+    JobApplicationTransitionSerializer,
+)
+from .suggestions import suggest_job_titles
+from .sync import sync_job_applications
+from .transitions import transition_job_applications
 from django_filters.rest_framework import DjangoFilterBackend
 from rest_framework import status
 from rest_framework.decorators import action
+from asgiref.sync import sync_to_async
+from django.conf import settings
+from django.core import signing
+from django.http import Http404, JsonResponse, StreamingHttpResponse
+from rest_framework_simplejwt.authentication import JWTAuthentication
+from rest_framework_simplejwt.exceptions import AuthenticationFailed, InvalidToken
+from django.shortcuts import get_object_or_404
 
 def standard_response(status=True, message="", data=None, status_code=status.HTTP_200_OK):
     """Standardized API response format"""
@@ -28,11 +49,26 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             return JobApplication.objects.none()
         return JobApplication.objects.filter(user=self.request.user)
 
+    def get_archived_queryset(self):
+        return ArchivedJobApplication.objects.filter(user=self.request.user)
+
+    def include_archived(self):
+        """Archived applications are only read when ?include_archived=true."""
+        return self.request.query_params.get('include_archived', '').lower() in ('1', 'true', 'yes')
+
     def perform_create(self, serializer):
         serializer.save(user=self.request.user)
 
+    @query_budget(4, time_ms=200)
     def list(self, request, *args, **kwargs):
         queryset = self.filter_queryset(self.get_queryset())
+        if self.include_archived():
+            # One UNION query over both tables, filtered and ordered alike.
+            archived = self.filter_queryset(self.get_archived_queryset())
+            ordering = queryset.query.order_by
+            queryset = queryset.order_by().values(*FIELDS).union(
+                archived.order_by().values(*FIELDS), all=True
+            ).order_by(*ordering)
         page = self.paginate_queryset(queryset)
         
         if page is not None:
@@ -46,8 +82,14 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             data=serializer.data
         )
 
+    @query_budget(4, time_ms=100)
     def retrieve(self, request, *args, **kwargs):
-        instance = self.get_object()
+        try:
+            instance = self.get_object()
+        except Http404:
+            if not self.include_archived():
+                raise
+            instance = get_object_or_404(self.get_archived_queryset(), pk=kwargs['pk'])
         serializer = self.get_serializer(instance)
         return standard_response(
             status=True,
@@ -55,6 +97,8 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             data=serializer.data
         )
 
+    @idempotent
+    @query_budget(6, time_ms=100)
     def create(self, request, *args, **kwargs):
         serializer = self.get_serializer(data=request.data)
         serializer.is_valid(raise_exception=True)
@@ -67,6 +111,8 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             status_code=status.HTTP_201_CREATED
         )
 
+    @idempotent
+    @query_budget(7, time_ms=100)
     def update(self, request, *args, **kwargs):
         partial = kwargs.pop('partial', False)
         instance = self.get_object()
@@ -79,6 +125,7 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             data=serializer.data
         )
 
+    @query_budget(6, time_ms=100)
     def destroy(self, request, *args, **kwargs):
         instance = self.get_object()
         self.perform_destroy(instance)
@@ -88,14 +135,223 @@ class JobApplicationViewSet(viewsets.ModelViewSet):
             data={}
         )
 
+    @query_budget(7, time_ms=100)
     @action(detail=True, methods=['post'])
     def mark_as_secured(self, request, pk=None):
-        application = self.get_object()
-        application.secured_job = True
-        application.save()
+        updated = transition_job_applications(JobApplication.SECURED, [pk], user=request.user)
+        if not updated:
+            raise Http404
         return standard_response(
             status=True,
             message="Job application marked as secured",
+            data=self.get_serializer(updated[0]).data
+        )
+
+    @query_budget(7, time_ms=500)
+    @action(detail=False, methods=['post'])
+    def bulk_transition(self, request):
+        """
+        Apply a transition (applied, feedback_received or secured) to many of
+        the user's applications at once. Unknown ids are returned in not_found.
+        """
+        serializer = JobApplicationTransitionSerializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        ids = serializer.validated_data['ids']
+        updated = transition_job_applications(
+            serializer.validated_data['transition'],
+            ids,
+            user=request.user,
+            feedback_description=serializer.validated_data.get('feedback_description')
+        )
+        updated_ids = {application.pk for application in updated}
+        return standard_response(
+            status=True,
+            message=f"{len(updated)} job applications updated",
+            data={
+                "updated": self.get_serializer(updated, many=True).data,
+                "not_found": sorted(set(ids) - updated_ids),
+            }
+        )
+
+    @query_budget(14, time_ms=200)
+    @action(detail=True, methods=['post'])
+    def restore(self, request, pk=None):
+        archived = get_object_or_404(self.get_archived_queryset(), pk=pk)
+        restore_job_applications(ArchivedJobApplication.objects.filter(pk=archived.pk))
+        application = JobApplication.objects.get(pk=archived.pk)
+        return standard_response(
+            status=True,
+            message="Job application restored from the archive",
             data=self.get_serializer(application).data
         )
-    
\ No newline at end of file
+
+    @query_budget(5, time_ms=500)
+    @action(detail=False, methods=['get'])
+    def sync(self, request):
+        """
+        Applications changed since ?token=, ids of those deleted, and the
+        token for the next sync. Without a token, every application.
+        """
+        try:
+            result = sync_job_applications(request.user, request.query_params.get('token'))
+        except signing.BadSignature:
+            return standard_response(
+                status=False,
+                message="Invalid sync token",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        return standard_response(
+            status=True,
+            message="Job applications synced successfully",
+            data={
+                "full": result['full'],
+                "changed": self.get_serializer(result['changed'], many=True).data,
+                "deleted": result['deleted'],
+                "has_more": result['has_more'],
+                "sync_token": result['token'],
+            }
+        )
+
+    @query_budget(2, time_ms=50)
+    @action(detail=False, methods=['get'])
+    def suggest(self, request):
+        """
+        Autocomplete: up to ?limit= (at most JOB_TITLE_SUGGEST_LIMIT) of the
+        user's distinct job titles starting with ?q=, most recently used first.
+        """
+        query = request.query_params.get('q', '')
+        try:
+            limit = int(request.query_params.get('limit', settings.JOB_TITLE_SUGGEST_LIMIT))
+        except ValueError:
+            limit = settings.JOB_TITLE_SUGGEST_LIMIT
+        limit = min(max(limit, 1), settings.JOB_TITLE_SUGGEST_LIMIT)
+        return standard_response(
+            status=True,
+            message="Job title suggestions retrieved successfully",
+            data={
+                "query": query,
+                "suggestions": suggest_job_titles(request.user, query, limit),
+            }
+        )
+
+
+class JobApplicationImportViewSet(mixins.CreateModelMixin, mixins.ListModelMixin,
+                                  mixins.RetrieveModelMixin, viewsets.GenericViewSet):
+    """
+    Upload a CSV or XLSX spreadsheet of job applications to import in the
+    background, then poll the import for progress and its row errors.
+    """
+    serializer_class = JobApplicationImportSerializer
+    permission_classes = [permissions.IsAuthenticated]
+
+    def get_queryset(self):
+        if getattr(self, 'swagger_fake_view', False):
+            return JobApplicationImport.objects.none()
+        return JobApplicationImport.objects.filter(user=self.request.user)
+
+    @query_budget(4, time_ms=100)
+    def list(self, request, *args, **kwargs):
+        serializer = self.get_serializer(self.get_queryset()[:settings.JOB_APPLICATION_IMPORT_LIST_LIMIT], many=True)
+        return standard_response(
+            status=True,
+            message="Imports retrieved successfully",
+            data=serializer.data
+        )
+
+    @query_budget(3, time_ms=100)
+    def retrieve(self, request, *args, **kwargs):
+        return standard_response(
+            status=True,
+            message="Import retrieved successfully",
+            data=self.get_serializer(self.get_object()).data
+        )
+
+    @query_budget(4, time_ms=200)
+    def create(self, request, *args, **kwargs):
+        serializer = self.get_serializer(data=request.data)
+        serializer.is_valid(raise_exception=True)
+        if not can_import(serializer.validated_data['format']):
+            return standard_response(
+                status=False,
+                message="XLSX files cannot be imported on this server; upload a CSV file",
+                status_code=status.HTTP_400_BAD_REQUEST
+            )
+        job_import = serializer.save(user=request.user)
+        run_in_background(run_import, job_import.pk)
+        return standard_response(
+            status=True,
+            message="Import started",
+            data=serializer.data,
+            status_code=status.HTTP_202_ACCEPTED
+        )
+
+    @query_budget(4, time_ms=100)
+    @action(detail=True, methods=['get'])
+    def errors(self, request, pk=None):
+        """
+        The import's row errors after row ?after= (0 by default), a page at a
+        time; next_after is the value for the next page, or null at the end.
+        """
+        job_import = self.get_object()
+        try:
+            after = int(request.query_params.get('after', 0))
+        except ValueError:
+            after = 0
+        limit = settings.JOB_APPLICATION_IMPORT_ERRORS_PAGE_SIZE
+        errors = list(job_import.errors.filter(row__gt=after)[:limit + 1])
+        has_more = len(errors) > limit
+        errors = errors[:limit]
+        return standard_response(
+            status=True,
+            message="Import errors retrieved successfully",
+            data={
+                "error_count": job_import.error_count,
+                "errors": JobApplicationImportErrorSerializer(errors, many=True).data,
+                "next_after": errors[-1].row if has_more else None,
+            }
+        )
+
+
+def authenticate_event_stream(request):
+    """
+    The user for the JWT in the Authorization header, or in the access_token
+    query parameter since browsers' EventSource cannot send headers.
+    """
+    authentication = JWTAuthentication()
+    header = authentication.get_header(request)
+    raw_token = authentication.get_raw_token(header) if header else request.GET.get('access_token')
+    if not raw_token:
+        return None
+    try:
+        return authentication.get_user(authentication.get_validated_token(raw_token))
+    except (InvalidToken, AuthenticationFailed):
+        return None
+
+
+@query_budget(2)
+async def job_application_events(request):
+    """
+    Server-sent events for the user's job application changes: create,
+    update, delete, archive, restore and secured, each with the
+    application's data. Reconnecting clients send Last-Event-ID (or
+    ?last_event_id=) to receive the events they missed. Needs an ASGI server.
+    """
+    user = await sync_to_async(authenticate_event_stream)(request)
+    if user is None:
+        return JsonResponse({
+            "status": False,
+            "message": "Authentication credentials were not provided or are invalid",
+            "data": {}
+        }, status=status.HTTP_401_UNAUTHORIZED)
+
+    last_event_id = request.headers.get('Last-Event-ID') or request.GET.get('last_event_id')
+    try:
+        last_event_id = int(last_event_id) if last_event_id else None
+    except ValueError:
+        last_event_id = None
+
+    response = StreamingHttpResponse(event_stream(user, last_event_id), content_type='text/event-stream')
+    response['Cache-Control'] = 'no-cache'
+    # Stop nginx buffering the stream.
+    response['X-Accel-Buffering'] = 'no'
+    return response
@@ -0,0 +1,162 @@
+import hashlib
+import json
+
+from django.conf import settings
+from django.contrib import admin
+from django.contrib.admin.filters import FacetsMixin
+from django.contrib.admin.views.main import ChangeList
+from django.contrib.auth import get_permission_codename
+from django.core.cache import cache
+from django.core.exceptions import EmptyResultSet, FullResultSet, PermissionDenied
+from django.core.paginator import Paginator
+from django.db import connections
+from django.http import FileResponse
+from django.shortcuts import get_object_or_404
+from django.template.response import TemplateResponse
+from django.urls import path, reverse
+from django.utils.functional import cached_property
+from django.utils.html import format_html, format_html_join
+
+from .budgets import query_budget
+from .middleware import compression_exempt
+from .models import ProfileRecord
+from .profiling import make_profiling_token
+
+
+def estimate_count(queryset):
+    """
+    The query planner's row estimate for `queryset`, or None if the
+    database cannot give one (only PostgreSQL is supported).
+    """
+    if connections[queryset.db].vendor != 'postgresql':
+        return None
+    plan = json.loads(queryset.order_by().explain(format='json'))
+    return int(plan[0]['Plan']['Plan Rows'])
+
+
+class EstimatedCountPaginator(Paginator):
+    """
+    Paginator that counts at most ADMIN_EXACT_COUNT_LIMIT rows exactly and
+    uses the planner's estimate beyond that. The count then costs about the
+    same however large the table is. Without an estimate, it falls back to
+    an exact count.
+    """
+
+    @cached_property
+    def count(self):
+        limit = settings.ADMIN_EXACT_COUNT_LIMIT
+        count = self.object_list[:limit + 1].count()
+        if count <= limit:
+            return count
+        estimate = estimate_count(self.object_list)
+        if estimate is None:
+            return self.object_list.count()
+        return max(estimate, count)
+
+
+def cached_facet_queryset(list_filter, changelist):
+    """
+    FacetsMixin.get_facet_queryset(), cached for ADMIN_FACET_CACHE_TIMEOUT
+    seconds by the filtered query and the facet aggregates.
+    """
+    filtered_qs = changelist.get_queryset(list_filter.request, exclude_parameters=list_filter.expected_parameters())
+    facet_counts = list_filter.get_facet_counts(changelist.pk_attname, filtered_qs)
+    try:
+        sql, params = filtered_qs.query.sql_with_params()
+    except (EmptyResultSet, FullResultSet):
+        return filtered_qs.aggregate(**facet_counts)
+    key = 'admin-facets:' + hashlib.md5(f'{sql}{params!r}{facet_counts!r}'.encode()).hexdigest()
+    counts = cache.get(key)
+    if counts is None:
+        counts = filtered_qs.aggregate(**facet_counts)
+        cache.set(key, counts, settings.ADMIN_FACET_CACHE_TIMEOUT)
+    return counts
+
+
+class CachedFacetsChangeList(ChangeList):
+    def get_filters(self, request):
+        filter_specs, *rest = super().get_filters(request)
+        for list_filter in filter_specs:
+            if isinstance(list_filter, FacetsMixin):
+                list_filter.get_facet_queryset = (
+                    lambda changelist, list_filter=list_filter: cached_facet_queryset(list_filter, changelist)
+                )
+        return (filter_specs, *rest)
+
+
+class LargeTableAdminMixin:
+    """
+    ModelAdmin mixin for large tables: the changelist doesn't count the whole
+    table, counts the filtered rows with EstimatedCountPaginator, and caches
+    filter facet counts.
+    """
+    paginator = EstimatedCountPaginator
+    show_full_result_count = False
+
+    def get_changelist(self, request, **kwargs):
+        return CachedFacetsChangeList
+
+
+@admin.register(ProfileRecord)
+@query_budget(10, time_ms=500)
+class ProfileRecordAdmin(LargeTableAdminMixin, admin.ModelAdmin):
+    list_display = ('created_at', 'method', 'path', 'status_code', 'duration_ms', 'query_count', 'user')
+    list_filter = ('method', 'status_code')
+    search_fields = ('path',)
+    list_select_related = ('user',)
+    fields = ('created_at', 'user', 'method', 'path', 'status_code', 'duration_ms', 'sample_count',
+              'query_count', 'query_time_ms', 'flamegraph_image', 'query_table')
+    readonly_fields = fields
+    change_list_template = 'admin/core/profilerecord/change_list.html'
+
+    def has_add_permission(self, request):
+        return False
+
+    def has_change_permission(self, request, obj=None):
+        return False
+
+    def get_urls(self):
+        return [
+            path('token/', compression_exempt(self.admin_site.admin_view(self.token_view)),
+                 name='core_profilerecord_token'),
+            path('<int:pk>/flamegraph/', self.admin_site.admin_view(self.flamegraph_view),
+                 name='core_profilerecord_flamegraph'),
+        ] + super().get_urls()
+
+    def has_token_permission(self, request):
+        # has_change_permission() is False for everyone: records are read-only.
+        opts = self.opts
+        return request.user.has_perm(f"{opts.app_label}.{get_permission_codename('change', opts)}")
+
+    def token_view(self, request):
+        """Issue a profiling token to the current user, if they may change profile records."""
+        if not self.has_token_permission(request):
+            raise PermissionDenied
+        return TemplateResponse(request, 'admin/core/profilerecord/token.html', {
+            **self.admin_site.each_context(request),
+            'title': 'Profiling token',
+            'opts': self.model._meta,
+            'token': make_profiling_token(request.user),
+            'max_age_minutes': settings.PROFILING_TOKEN_MAX_AGE // 60,
+        })
+
+    def flamegraph_view(self, request, pk):
+        record = get_object_or_404(self.get_queryset(request), pk=pk)
+        response = FileResponse(record.flamegraph.open('rb'), content_type='image/svg+xml')
+        response['Content-Security-Policy'] = "default-src 'none'; style-src 'unsafe-inline'"
+        return response
+
+    def flamegraph_image(self, obj):
+        url = reverse('admin:core_profilerecord_flamegraph', args=[obj.pk])
+        return format_html('<a href="{}" target="_blank"><img src="{}" style="max-width: 100%"></a>', url, url)
+    flamegraph_image.short_description = 'Flame graph'
+
+    def query_table(self, obj):
+        with obj.queries.open('rb') as file:
+            queries = json.load(file)
+        rows = format_html_join(
+            '', '<tr><td>{}</td><td>{}</td><td><code>{}</code></td></tr>',
+            ((f"{query['duration_ms']:.2f}", query['alias'], query['sql']) for query in queries)
+        )
+        return format_html('<table><tr><th>ms</th><th>Database</th><th>SQL</th></tr>{}</table>', rows)
+    query_table.short_description = 'SQL'
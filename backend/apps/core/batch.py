@@ -0,0 +1,226 @@
+"""
+Batched API requests.
+
+POST /api/batch/ takes {"requests": [{"method", "path", "body", "idempotency_key"}, ...]}
+and returns each sub-request's status and response body, in order. The
+sub-requests are resolved against the URLconf and their views are called
+in-process. The batch's JWT is authenticated once and the user is handed
+on to each view, so none of them pays for middleware, authentication or a
+new connection again.
+
+Sub-requests skip the middleware, so the parts that matter are applied
+here instead:
+- Views marked @compression_exempt are rejected, because their secrets
+  would end up in the batch's compressed body (BREACH).
+- @idempotent views honour the sub-request's own idempotency_key.
+- Queries run on the pool are counted against the batch's query budget.
+
+Runs of consecutive GETs are independent. When the batch is not inside a
+transaction, and BATCH_READ_WORKERS allows it, they run concurrently on a
+small thread pool. Other sub-requests run one at a time, in order, on the
+request's own thread and connection, so reads after a write see it.
+"""
+import io
+import json
+from concurrent.futures import ThreadPoolExecutor
+from contextlib import nullcontext
+from contextvars import copy_context
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction
+from django.conf import settings
+from django.core.handlers.exception import response_for_exception
+from django.core.handlers.wsgi import WSGIRequest
+from django.db import close_old_connections, connection
+from django.urls import Resolver404, resolve
+from rest_framework import permissions, serializers, status
+from rest_framework.response import Response
+from rest_framework.views import APIView
+
+from .budgets import QueryBudget, count_queries, get_query_budget, query_budget
+from .idempotency import IdempotencyMiddleware
+from .middleware import get_view_attribute
+
+CONCURRENT_METHODS = ('GET',)
+
+# For sub-requests answered without calling a view.
+NO_QUERIES = QueryBudget(0, 0)
+
+# Only its process_view() and process_response() are used.
+idempotency = IdempotencyMiddleware(lambda request: None)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(max_workers=settings.BATCH_READ_WORKERS, thread_name_prefix='batch')
+
+
+class SubRequestSerializer(serializers.Serializer):
+    method = serializers.ChoiceField(choices=['GET', 'POST', 'PUT', 'PATCH', 'DELETE'])
+    path = serializers.CharField()
+    body = serializers.JSONField(required=False)
+    # Sent as the sub-request's Idempotency-Key; the batch's own is not passed on.
+    idempotency_key = serializers.CharField(required=False, max_length=255)
+
+    def validate_path(self, value):
+        if not value.startswith('/api/') or value.split('?', 1)[0].rstrip('/') == '/api/batch':
+            raise serializers.ValidationError("Only API endpoints other than the batch endpoint can be batched.")
+        return value
+
+
+class BatchSerializer(serializers.Serializer):
+    requests = SubRequestSerializer(many=True, allow_empty=False)
+
+    def validate_requests(self, value):
+        if len(value) > settings.BATCH_MAX_REQUESTS:
+            raise serializers.ValidationError(f"At most {settings.BATCH_MAX_REQUESTS} requests can be batched.")
+        return value
+
+
+def error_body(message):
+    # Same shape as the API's standard_response().
+    return {'status': False, 'message': message, 'data': {}}
+
+
+def make_subrequest(request, sub_request):
+    """A WSGIRequest for `sub_request`, carrying `request`'s headers and authenticated user."""
+    path, _, query_string = sub_request['path'].partition('?')
+    body = json.dumps(sub_request['body']).encode() if 'body' in sub_request else b''
+    environ = {
+        **request.META,
+        'REQUEST_METHOD': sub_request['method'],
+        'SCRIPT_NAME': '',
+        # WSGI carries paths as latin-1 decoded bytes.
+        'PATH_INFO': path.encode().decode('iso-8859-1'),
+        'QUERY_STRING': query_string,
+        'CONTENT_TYPE': 'application/json',
+        'CONTENT_LENGTH': str(len(body)),
+        'wsgi.input': io.BytesIO(body),
+        'wsgi.url_scheme': request.scheme,
+    }
+    environ.pop(IdempotencyMiddleware.header, None)
+    if 'idempotency_key' in sub_request:
+        environ[IdempotencyMiddleware.header] = sub_request['idempotency_key']
+    subrequest = WSGIRequest(environ)
+    subrequest.user = request.user
+    # DRF's Request uses these instead of running the authenticators again.
+    subrequest._force_auth_user = request.user
+    subrequest._force_auth_token = request.auth
+    return subrequest
+
+
+def response_body(response):
+    if isinstance(response, Response):
+        # Not rendered: the batch response renders it once, with the rest.
+        return response.data
+    if response.get('Content-Type', '').startswith('application/json'):
+        return json.loads(response.content)
+    return response.content.decode(errors='replace')
+
+
+def run_subrequest(request, sub_request):
+    """(status code, body, query budget) for one sub-request."""
+    subrequest = make_subrequest(request, sub_request)
+    try:
+        match = resolve(subrequest.path_info)
+    except Resolver404:
+        return status.HTTP_404_NOT_FOUND, error_body("Not found."), NO_QUERIES
+    if iscoroutinefunction(match.func):
+        return status.HTTP_400_BAD_REQUEST, error_body("Streaming endpoints cannot be batched."), NO_QUERIES
+
+    if get_view_attribute(match.func, subrequest.method, 'compression_exempt'):
+        return status.HTTP_400_BAD_REQUEST, error_body("Endpoints that return credentials cannot be batched."), NO_QUERIES
+
+    subrequest.resolver_match = match
+    budget = get_query_budget(match.func, subrequest.method)
+    response = idempotency.process_view(subrequest, match.func, match.args, match.kwargs)
+    if response is None:
+        try:
+            response = match.func(subrequest, *match.args, **match.kwargs)
+        except Exception as e:
+            response = response_for_exception(subrequest, e)
+        if getattr(subrequest, '_idempotency', None) is not None:
+            # The stored response is replayed as bytes.
+            if hasattr(response, 'render'):
+                response.render()
+            response = idempotency.process_response(subrequest, response)
+    if response.streaming:
+        return status.HTTP_400_BAD_REQUEST, error_body("Streaming endpoints cannot be batched."), budget
+    return response.status_code, response_body(response), budget
+
+
+def run_subrequest_in_thread(request, sub_request):
+    # As around any request: drop connections that are broken or past CONN_MAX_AGE.
+    close_old_connections()
+    counter = getattr(request, 'query_counter', None)
+    try:
+        with count_queries(counter) if counter is not None else nullcontext():
+            return run_subrequest(request, sub_request)
+    finally:
+        close_old_connections()
+
+
+def run_concurrently(request, sub_requests):
+    if len(sub_requests) < 2 or settings.BATCH_READ_WORKERS < 2 or connection.in_atomic_block:
+        # Other threads' connections can't see this transaction's writes.
+        return [run_subrequest(request, sub_request) for sub_request in sub_requests]
+    # Each sub-request gets its own copy of the context, so the replica
+    # router's state and the active language and timezone carry over.
+    futures = [
+        get_executor().submit(copy_context().run, run_subrequest_in_thread, request, sub_request)
+        for sub_request in sub_requests
+    ]
+    return [future.result() for future in futures]
+
+
+def run_batch(request, sub_requests):
+    results = []
+    reads = []
+    for sub_request in sub_requests:
+        if sub_request['method'] in CONCURRENT_METHODS:
+            reads.append(sub_request)
+            continue
+        results += run_concurrently(request, reads)
+        reads = []
+        results.append(run_subrequest(request, sub_request))
+    results += run_concurrently(request, reads)
+    return results
+
+
+def batch_budget(base, budgets):
+    """The batch's own budget plus its sub-requests', or None if any has none."""
+    if any(budget is None for budget in budgets):
+        return None
+    timed = all(budget.time_ms is not None for budget in (base, *budgets))
+    return QueryBudget(
+        base.queries + sum(budget.queries for budget in budgets),
+        base.time_ms + sum(budget.time_ms for budget in budgets) if timed else None,
+    )
+
+
+@query_budget(1, time_ms=100)
+class BatchView(APIView):
+    """
+    Run several API requests in one round trip. The batch's query budget
+    covers authentication; each sub-request adds its own endpoint's.
+    """
+    permission_classes = [permissions.IsAuthenticated]
+
+    def post(self, request):
+        serializer = BatchSerializer(data=request.data)
+        if not serializer.is_valid():
+            return Response({
+                "status": False,
+                "message": "Invalid batch request",
+                "data": serializer.errors
+            }, status=status.HTTP_400_BAD_REQUEST)
+
+        results = run_batch(request, serializer.validated_data['requests'])
+        request._request.query_budget = batch_budget(
+            self.query_budget, [budget for _, _, budget in results]
+        )
+        return Response({
+            "status": True,
+            "message": "Batch completed",
+            "data": [{"status": status_code, "body": body} for status_code, body, _ in results]
+        })
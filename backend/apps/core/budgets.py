@@ -0,0 +1,253 @@
+"""
+Per-view query budgets.
+
+@query_budget declares the most SQL queries, and optionally the most total
+SQL time, a request to a view may take. It can decorate a function view, a
+view class, one handler or viewset action, or a ModelAdmin (all of its
+views). QueryBudgetMiddleware counts every query the request runs,
+middleware included, and acts on QUERY_BUDGET_MODE:
+
+    'raise'  raise QueryBudgetExceeded (set by QueryBudgetTestRunner)
+    'warn'   log a warning (DEBUG and staging)
+    'off'    count nothing
+
+The counts are also collected in `budget_report`, which the test runner
+prints after the suite. For each endpoint it shows the request that came
+closest to its budget (batches get a budget per request), with that budget.
+"""
+import json
+import logging
+import threading
+import time
+from collections import namedtuple
+from contextlib import ExitStack, contextmanager
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.db import connections
+from django.test.runner import DiscoverRunner
+
+from .middleware import get_view_attribute
+
+logger = logging.getLogger(__name__)
+
+QueryBudget = namedtuple('QueryBudget', ['queries', 'time_ms'])
+
+
+class QueryBudgetExceeded(AssertionError):
+    pass
+
+
+def query_budget(queries, time_ms=None):
+    """
+    Declare that a request to the decorated view runs at most `queries` SQL
+    queries taking at most `time_ms` milliseconds in all.
+    """
+    budget = QueryBudget(queries, time_ms)
+
+    def decorator(view):
+        view.query_budget = budget
+        return view
+    return decorator
+
+
+def get_query_budget(view_func, method):
+    """The QueryBudget declared for `method` requests to `view_func`, or None."""
+    return get_view_attribute(view_func, method, 'query_budget')
+
+
+class QueryCounter:
+    """
+    execute_wrapper that counts queries and their total duration. One
+    counter may be installed in several threads (see count_queries()).
+    """
+
+    def __init__(self):
+        self.count = 0
+        self.time_ms = 0.0
+        self._lock = threading.Lock()
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            with self._lock:
+                self.count += 1
+                self.time_ms += (time.perf_counter() - start) * 1000
+
+
+@contextmanager
+def count_queries(counter):
+    """
+    Count the queries this thread runs, on every connection, with `counter`.
+    Code that runs part of a request on other threads enters it there with
+    the request's query_counter.
+    """
+    with ExitStack() as stack:
+        for connection in connections.all():
+            stack.enter_context(connection.execute_wrapper(counter))
+        yield counter
+
+
+def headroom(used, budget, field):
+    """Sort key putting the request with the least room under `budget.field` first; no budget leaves none."""
+    limit = budget and getattr(budget, field)
+    return (float('-inf') if limit is None else limit - used, -used)
+
+
+class BudgetReport:
+    """
+    Per endpoint, the request with the least room left under its query
+    budget, and the one with the least under its time budget, with the
+    budgets that applied to them.
+    """
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self.endpoints = {}
+
+    def record(self, endpoint, budget, queries, time_ms):
+        with self._lock:
+            entry = self.endpoints.setdefault(endpoint, {
+                'requests': 0, 'queries': queries, 'budget': budget, 'time_ms': time_ms, 'time_budget': budget,
+            })
+            entry['requests'] += 1
+            if headroom(queries, budget, 'queries') < headroom(entry['queries'], entry['budget'], 'queries'):
+                entry.update(queries=queries, budget=budget)
+            if headroom(time_ms, budget, 'time_ms') < headroom(entry['time_ms'], entry['time_budget'], 'time_ms'):
+                entry.update(time_ms=time_ms, time_budget=budget)
+
+    def clear(self):
+        with self._lock:
+            self.endpoints.clear()
+
+    def __bool__(self):
+        return bool(self.endpoints)
+
+    def as_json(self):
+        return json.dumps({
+            endpoint: {
+                **entry,
+                'budget': entry['budget'] and entry['budget']._asdict(),
+                'time_budget': entry['time_budget'] and entry['time_budget']._asdict(),
+            }
+            for endpoint, entry in sorted(self.endpoints.items())
+        }, indent=2)
+
+    def format(self):
+        rows = [('Endpoint', 'Requests', 'Queries', 'Budget', 'SQL ms', 'Budget ms')]
+        for endpoint, entry in sorted(self.endpoints.items()):
+            budget, time_budget = entry['budget'], entry['time_budget']
+            rows.append((
+                endpoint,
+                str(entry['requests']),
+                str(entry['queries']),
+                str(budget.queries) if budget else '-',
+                f"{entry['time_ms']:.1f}",
+                str(time_budget.time_ms) if time_budget and time_budget.time_ms is not None else '-',
+            ))
+        widths = [max(len(row[column]) for row in rows) for column in range(len(rows[0]))]
+        return '\n'.join(
+            '  '.join(cell.ljust(width) if column == 0 else cell.rjust(width)
+                      for column, (cell, width) in enumerate(zip(row, widths)))
+            for row in rows
+        )
+
+
+budget_report = BudgetReport()
+
+
+def check_query_budget(request, counter, mode):
+    match = request.resolver_match
+    if match is None:
+        return
+    endpoint = f'{request.method} {match.view_name}'
+    budget = getattr(request, 'query_budget', None)
+    budget_report.record(endpoint, budget, counter.count, counter.time_ms)
+    if budget is None:
+        return
+    if counter.count <= budget.queries and (budget.time_ms is None or counter.time_ms <= budget.time_ms):
+        return
+    message = (
+        f'{endpoint} ran {counter.count} queries in {counter.time_ms:.1f} ms, over its budget of '
+        f'{budget.queries} queries' + (f' in {budget.time_ms} ms' if budget.time_ms is not None else '')
+    )
+    if mode == 'raise':
+        raise QueryBudgetExceeded(message)
+    logger.warning(message)
+
+
+class QueryBudgetMiddleware:
+    """
+    Check each request's queries against its view's budget. Only queries run
+    before the response is returned are counted, and only under WSGI: under
+    ASGI, sync code runs in other threads, out of the wrappers' reach.
+    Should come right after ProfilingMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        mode = settings.QUERY_BUDGET_MODE
+        if mode == 'off':
+            return self.get_response(request)
+
+        request.query_counter = counter = QueryCounter()
+        with count_queries(counter):
+            response = self.get_response(request)
+        check_query_budget(request, counter, mode)
+        return response
+
+    async def __acall__(self, request):
+        return await self.get_response(request)
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        request.query_budget = get_query_budget(view_func, request.method)
+
+
+class QueryBudgetTestRunner(DiscoverRunner):
+    """
+    Test runner that fails any request over its view's query budget and
+    prints the budget report after the suite. Only errors are logged
+    while it runs; tests check other records with assertLogs().
+    """
+
+    def __init__(self, query_budget_report=None, **kwargs):
+        super().__init__(**kwargs)
+        self.query_budget_report = query_budget_report
+
+    @classmethod
+    def add_arguments(cls, parser):
+        super().add_arguments(parser)
+        parser.add_argument(
+            '--query-budget-report', metavar='PATH',
+            help='Also write the query budget report to PATH as JSON.',
+        )
+
+    def setup_test_environment(self, **kwargs):
+        super().setup_test_environment(**kwargs)
+        self._query_budget_mode = settings.QUERY_BUDGET_MODE
+        settings.QUERY_BUDGET_MODE = 'raise'
+        budget_report.clear()
+        self._log_levels = [(handler, handler.level) for handler in logging.getLogger().handlers]
+        for handler, _ in self._log_levels:
+            handler.setLevel(logging.ERROR)
+
+    def teardown_test_environment(self, **kwargs):
+        settings.QUERY_BUDGET_MODE = self._query_budget_mode
+        for handler, level in self._log_levels:
+            handler.setLevel(level)
+        super().teardown_test_environment(**kwargs)
+        if budget_report and self.verbosity >= 1:
+            self.log(f'\nQuery budgets:\n{budget_report.format()}')
+        if self.query_budget_report:
+            with open(self.query_budget_report, 'w') as file:
+                file.write(budget_report.as_json())
@@ -0,0 +1,161 @@
+"""
+Publish/subscribe for server-sent events.
+
+Code that changes data calls get_broker().publish(channel, event) from
+any thread. Async views subscribe to a channel and stream the events to
+clients. LocalBroker only reaches subscribers in the same process.
+RedisBroker relays events through Redis to every worker, which then fans
+them out locally in the same way.
+"""
+import asyncio
+import json
+import logging
+import threading
+from collections import defaultdict, namedtuple
+from functools import cache
+
+from django.conf import settings
+from django.core.exceptions import ImproperlyConfigured
+from django.utils.module_loading import import_string
+
+try:
+    import redis
+    import redis.asyncio
+except ImportError:
+    redis = None
+
+logger = logging.getLogger(__name__)
+
+
+class Event(namedtuple('Event', ['id', 'type', 'data'])):
+    """An event with a numeric id (or None), a type and a JSON-encoded data string."""
+
+    def encode(self):
+        """The event in text/event-stream format."""
+        lines = [] if self.id is None else [f'id: {self.id}']
+        lines += [f'event: {self.type}', f'data: {self.data}']
+        return ('\n'.join(lines) + '\n\n').encode()
+
+
+class Subscription:
+    """
+    Events published to a channel since subscribing, buffered up to
+    EVENT_STREAM_BUFFER_SIZE. If a subscriber falls further behind, the
+    subscription overflows and receives nothing more; the client should
+    reconnect and resume from its last event id.
+    """
+
+    def __init__(self, broker, channel):
+        self.broker = broker
+        self.channel = channel
+        self.loop = asyncio.get_running_loop()
+        self.queue = asyncio.Queue(settings.EVENT_STREAM_BUFFER_SIZE)
+        self.overflowed = False
+
+    def __enter__(self):
+        self.broker.add_subscription(self)
+        return self
+
+    def __exit__(self, *exc_info):
+        self.broker.remove_subscription(self)
+
+    def put(self, event):
+        # Runs in the subscriber's event loop.
+        try:
+            self.queue.put_nowait(event)
+        except asyncio.QueueFull:
+            self.overflowed = True
+            self.broker.remove_subscription(self)
+
+    async def get(self, timeout):
+        """
+        The next event, or None after `timeout` seconds without one, or at
+        once when an overflowed subscription has been drained.
+        """
+        if self.overflowed and self.queue.empty():
+            return None
+        try:
+            return await asyncio.wait_for(self.queue.get(), timeout)
+        except asyncio.TimeoutError:
+            return None
+
+
+class LocalBroker:
+    """Deliver events to subscribers in this process."""
+
+    def __init__(self):
+        self._lock = threading.Lock()
+        self._subscriptions = defaultdict(set)
+
+    def subscribe(self, channel):
+        """Return a Subscription to `channel`, to be used as a context manager from async code."""
+        return Subscription(self, channel)
+
+    def add_subscription(self, subscription):
+        with self._lock:
+            self._subscriptions[subscription.channel].add(subscription)
+
+    def remove_subscription(self, subscription):
+        with self._lock:
+            subscriptions = self._subscriptions.get(subscription.channel)
+            if subscriptions is not None:
+                subscriptions.discard(subscription)
+                if not subscriptions:
+                    del self._subscriptions[subscription.channel]
+
+    def publish(self, channel, event):
+        self.deliver(channel, event)
+
+    def deliver(self, channel, event):
+        with self._lock:
+            subscriptions = list(self._subscriptions.get(channel, ()))
+        for subscription in subscriptions:
+            try:
+                subscription.loop.call_soon_threadsafe(subscription.put, event)
+            except RuntimeError:
+                # The subscriber's event loop has been closed.
+                self.remove_subscription(subscription)
+
+
+class RedisBroker(LocalBroker):
+    """
+    Publish events to Redis (EVENT_BROKER_URL), and deliver those from every
+    worker to the subscribers in this one. Needs the redis package.
+    """
+    channel_prefix = 'events:'
+
+    def __init__(self):
+        if redis is None:
+            raise ImproperlyConfigured('RedisBroker requires the redis package.')
+        if not settings.EVENT_BROKER_URL:
+            raise ImproperlyConfigured('RedisBroker requires EVENT_BROKER_URL.')
+        super().__init__()
+        self._client = redis.Redis.from_url(settings.EVENT_BROKER_URL)
+        self._listener = None
+
+    def publish(self, channel, event):
+        self._client.publish(self.channel_prefix + channel, json.dumps(event))
+
+    def subscribe(self, channel):
+        if self._listener is None or self._listener.done():
+            self._listener = asyncio.get_running_loop().create_task(self.listen())
+        return super().subscribe(channel)
+
+    async def listen(self):
+        client = redis.asyncio.Redis.from_url(settings.EVENT_BROKER_URL)
+        async with client.pubsub() as pubsub:
+            await pubsub.psubscribe(self.channel_prefix + '*')
+            async for message in pubsub.listen():
+                if message['type'] != 'pmessage':
+                    continue
+                try:
+                    channel = message['channel'].decode()[len(self.channel_prefix):]
+                    self.deliver(channel, Event(*json.loads(message['data'])))
+                except (ValueError, TypeError):
+                    logger.warning('Ignoring malformed event %r', message['data'])
+
+
+@cache
+def get_broker():
+    """The process-wide broker, an instance of settings.EVENT_BROKER."""
+    return import_string(settings.EVENT_BROKER)()
@@ -0,0 +1,72 @@
+import django
+from django.conf import settings
+from django.core.handlers.asgi import ASGIHandler
+from django.core.handlers.base import BaseHandler
+from django.core.handlers.wsgi import WSGIHandler
+
+
+def is_stateless_path(path):
+    return path.startswith(tuple(settings.STATELESS_PATH_PREFIXES))
+
+
+class StatelessHandler(BaseHandler):
+    """
+    Handler whose middleware chain is settings.MIDDLEWARE minus
+    settings.STATELESS_EXCLUDED_MIDDLEWARE (sessions, CSRF, messages, ...).
+    """
+
+    def get_middleware_paths(self):
+        excluded = set(settings.STATELESS_EXCLUDED_MIDDLEWARE)
+        return [path for path in settings.MIDDLEWARE if path not in excluded]
+
+    def load_middleware(self, is_async=False):
+        # BaseHandler.load_middleware() reads settings.MIDDLEWARE; swap the
+        # filtered list in while it builds the chain. Handlers are loaded
+        # once, before serving any request.
+        middleware = settings.MIDDLEWARE
+        settings.MIDDLEWARE = self.get_middleware_paths()
+        try:
+            super().load_middleware(is_async)
+        finally:
+            settings.MIDDLEWARE = middleware
+
+
+class PathScopedHandlerMixin:
+    """
+    Send requests under settings.STATELESS_PATH_PREFIXES (the JWT-only API)
+    through a StatelessHandler, and everything else (admin, password reset,
+    docs) through the full settings.MIDDLEWARE chain.
+    """
+
+    def load_middleware(self, is_async=False):
+        self.stateless_handler = StatelessHandler()
+        self.stateless_handler.load_middleware(is_async)
+        super().load_middleware(is_async)
+
+    def get_response(self, request):
+        if is_stateless_path(request.path_info):
+            return self.stateless_handler.get_response(request)
+        return super().get_response(request)
+
+    async def get_response_async(self, request):
+        if is_stateless_path(request.path_info):
+            return await self.stateless_handler.get_response_async(request)
+        return await super().get_response_async(request)
+
+
+class PathScopedWSGIHandler(PathScopedHandlerMixin, WSGIHandler):
+    pass
+
+
+class PathScopedASGIHandler(PathScopedHandlerMixin, ASGIHandler):
+    pass
+
+
+def get_wsgi_application():
+    django.setup(set_prefix=False)
+    return PathScopedWSGIHandler()
+
+
+def get_asgi_application():
+    django.setup(set_prefix=False)
+    return PathScopedASGIHandler()
@@ -0,0 +1,128 @@
+"""
+Idempotency-Key support for create and update endpoints.
+
+A client that may retry a write sends a unique Idempotency-Key header
+with it. Views opt in with @idempotent. IdempotencyMiddleware then keeps
+the first response for the key in the default cache, per user, for
+IDEMPOTENCY_KEY_TTL seconds. A retry gets those exact bytes back, with an
+Idempotent-Replayed header, without running the view again.
+
+Requests with the same key that arrive while the first one is still
+running wait up to IDEMPOTENCY_WAIT seconds for its response. A cache.add()
+lock makes sure only one of them runs, and any still waiting after that
+get a 409. A key reused with a different method, path or body gets a 422.
+Server errors, and statuses a retry may change (401, 403, 409, 429), are
+not kept.
+
+Anonymous requests (registration) have no user to scope keys by, so their
+keys are scoped by client address and the request itself: only the same
+request from the same address is replayed.
+"""
+import hashlib
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import HttpResponse, JsonResponse
+from django.utils.deprecation import MiddlewareMixin
+
+from .middleware import get_view_attribute
+from .routers import get_request_user_id
+
+IDEMPOTENT_METHODS = ('POST', 'PUT', 'PATCH')
+UNSTORED_STATUSES = {401, 403, 409, 429}
+
+
+def idempotent(view):
+    """Honour Idempotency-Key headers on the decorated view, view class, handler or viewset action."""
+    view.idempotent = True
+    return view
+
+
+def request_fingerprint(request):
+    digest = hashlib.sha256(f'{request.method} {request.path}\n'.encode())
+    digest.update(request.body)
+    return digest.hexdigest()
+
+
+def idempotency_scope(request, fingerprint):
+    """The namespace of the request's key: its user's, or for anonymous requests, its client's and request's."""
+    user_id = get_request_user_id(request)
+    if user_id is not None:
+        return f'user:{user_id}'
+    return f'anonymous:{request.META.get("REMOTE_ADDR", "")}:{fingerprint}'
+
+
+def error_response(status, message):
+    # Same shape as the API's standard_response().
+    return JsonResponse({'status': False, 'message': message, 'data': {}}, status=status)
+
+
+class IdempotencyMiddleware(MiddlewareMixin):
+    header = 'HTTP_IDEMPOTENCY_KEY'
+    poll_interval = 0.05
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        key = request.META.get(self.header)
+        if not key or request.method not in IDEMPOTENT_METHODS:
+            return None
+        if not get_view_attribute(view_func, request.method, 'idempotent'):
+            return None
+        if len(key) > 255:
+            return error_response(400, "Idempotency-Key must be at most 255 characters")
+
+        fingerprint = request_fingerprint(request)
+        scope = idempotency_scope(request, fingerprint)
+        cache_key = 'idempotency:' + hashlib.sha256(f'{scope}:{key}'.encode()).hexdigest()
+
+        stored = cache.get(cache_key)
+        lock_key = f'{cache_key}:lock'
+        lock = uuid.uuid4().hex
+        deadline = time.monotonic() + settings.IDEMPOTENCY_WAIT
+        while stored is None and not cache.add(lock_key, lock, settings.IDEMPOTENCY_LOCK_TIMEOUT):
+            # Another request with this key is running; wait for its response.
+            if time.monotonic() >= deadline:
+                return error_response(409, "A request with this Idempotency-Key is still in progress")
+            time.sleep(self.poll_interval)
+            stored = cache.get(cache_key)
+        if stored is None:
+            # The request holding the lock may have finished between our
+            # read and our add; its response is stored by now if so.
+            stored = cache.get(cache_key)
+            if stored is not None:
+                self.release(lock_key, lock)
+
+        if stored is not None:
+            return self.replay(stored, fingerprint)
+        request._idempotency = (cache_key, lock_key, lock, fingerprint)
+        return None
+
+    def replay(self, stored, fingerprint):
+        if stored['fingerprint'] != fingerprint:
+            return error_response(422, "This Idempotency-Key was used for a different request")
+        response = HttpResponse(stored['content'], status=stored['status'])
+        for header, value in stored['headers']:
+            response[header] = value
+        response['Idempotent-Replayed'] = 'true'
+        return response
+
+    def process_response(self, request, response):
+        idempotency = getattr(request, '_idempotency', None)
+        if idempotency is None:
+            return response
+        cache_key, lock_key, lock, fingerprint = idempotency
+        if not response.streaming and response.status_code < 500 and response.status_code not in UNSTORED_STATUSES:
+            cache.set(cache_key, {
+                'fingerprint': fingerprint,
+                'status': response.status_code,
+                'headers': list(response.items()),
+                'content': response.content,
+            }, settings.IDEMPOTENCY_KEY_TTL)
+        self.release(lock_key, lock)
+        return response
+
+    def release(self, lock_key, lock):
+        # Only release our own lock, not one taken after ours expired.
+        if cache.get(lock_key) == lock:
+            cache.delete(lock_key)
@@ -0,0 +1,104 @@
+import ctypes
+import io
+import multiprocessing
+import shutil
+import tempfile
+import time
+from types import SimpleNamespace
+
+from django.conf import settings
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management.base import BaseCommand
+from PIL import Image, ImageOps
+
+from apps.core.storage import ContentAddressedStorage
+from apps.users.avatars import render_thumbnails
+from apps.users.models import User
+from apps.users.serializers import UserProfileSerializer
+
+
+def make_photo(width, height):
+    """A JPEG of light noise, about the file size of a photo of the same dimensions."""
+    bands = [Image.effect_noise((width, height), 8) for _ in range(3)]
+    buffer = io.BytesIO()
+    Image.merge('RGB', bands).save(buffer, 'JPEG', quality=85)
+    return buffer.getvalue()
+
+
+def render_full_size(file, sizes):
+    """Thumbnails from the fully decoded image, for comparison."""
+    with Image.open(file) as image:
+        image = image.convert('RGB')
+    return {size: ImageOps.fit(image, (size, size), Image.Resampling.LANCZOS) for size in sizes}
+
+
+def memory_status(field):
+    with open('/proc/self/status') as status:
+        for line in status:
+            if line.startswith(field + ':'):
+                return int(line.split()[1]) / 1024
+
+
+def peak_memory(queue, render, content, sizes):
+    """Put the peak memory growth, in MB, of render(content) on `queue`."""
+    # Linux only: return freed memory to the OS, then reset the peak (VmHWM)
+    # to the current resident size, so only this render's growth is counted.
+    ctypes.CDLL(None).malloc_trim(0)
+    with open('/proc/self/clear_refs', 'w') as clear_refs:
+        clear_refs.write('5')
+    before = memory_status('VmRSS')
+    render(io.BytesIO(content), sizes)
+    queue.put(memory_status('VmHWM') - before)
+
+
+class Command(BaseCommand):
+    help = "Benchmark avatar upload latency and peak memory while rendering thumbnails of large images"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--widths', default='1024,4096,8192', help="Comma-separated image widths (4:3)")
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def upload(self, storage, content, render):
+        """Validate and store an avatar as UserProfileView does, rendering thumbnails inline with `render`."""
+        upload = SimpleUploadedFile('avatar.jpg', content)
+        serializer = UserProfileSerializer(
+            User(), data={'avatar': upload}, partial=True, context={'request': SimpleNamespace()}
+        )
+        serializer.is_valid(raise_exception=True)
+        name = storage.save(upload.name, upload)
+        if render:
+            with storage.open(name) as file:
+                render_thumbnails(file, settings.AVATAR_THUMBNAIL_SIZES)
+
+    def handle(self, *args, **options):
+        sizes = settings.AVATAR_THUMBNAIL_SIZES
+        context = multiprocessing.get_context('fork')
+        root = tempfile.mkdtemp()
+        try:
+            storage = ContentAddressedStorage(location=root)
+            for width in map(int, options['widths'].split(',')):
+                height = width * 3 // 4
+                content = make_photo(width, height)
+                self.stdout.write(self.style.MIGRATE_HEADING(
+                    f"\n{width}x{height} JPEG, {len(content) / 1e6:.1f} MB, thumbnails {sizes}"
+                ))
+
+                for label, render in (('thumbnails in background', False), ('thumbnails in request', True)):
+                    timings = []
+                    for _ in range(options['repeat']):
+                        shutil.rmtree(root, ignore_errors=True)
+                        start = time.perf_counter()
+                        self.upload(storage, content, render)
+                        timings.append(time.perf_counter() - start)
+                    self.stdout.write(f"  upload, {label:>24}: {min(timings) * 1000:9.1f} ms")
+
+                # Each render runs in a child process, so earlier ones can't skew its peak.
+                for label, render in (('full-size decode', render_full_size), ('render_thumbnails', render_thumbnails)):
+                    queue = context.Queue()
+                    process = context.Process(target=peak_memory, args=(queue, render, content, sizes))
+                    process.start()
+                    peak = queue.get()
+                    process.join()
+                    self.stdout.write(f"  resize, {label:>24}: {peak:9.1f} MB peak memory")
+        finally:
+            shutil.rmtree(root, ignore_errors=True)
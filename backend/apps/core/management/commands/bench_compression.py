@@ -0,0 +1,80 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.test import Client
+from django.utils import timezone
+
+from apps.core.middleware import COMPRESSORS
+from apps.core.renderers import JSONRenderer
+
+LEVELS = {
+    'gzip': (1, 6, 9),
+    'br': (1, 4, 6, 11),
+    'zstd': (1, 3, 9, 19),
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark bytes saved against CPU cost for each compression encoding and level"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=500)
+        parser.add_argument('--repeat', type=int, default=5)
+
+    def get_payloads(self, rows):
+        from apps.JobApplication.models import JobApplication
+        from apps.JobApplication.serializers import JobApplicationSerializer
+
+        now = timezone.now()
+        applications = [
+            JobApplication(
+                id=i,
+                job_post=f"Information Security Analyst {i}",
+                job_description=(
+                    "Investigate alerts from the SIEM and EDR tooling, run phishing triage, "
+                    "maintain detection rules and write incident reports for stakeholders. "
+                ) * 6,
+                applied=True,
+                date_applied=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+                feedback_description="Recruiter call scheduled" if i % 4 == 0 else "",
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(rows)
+        ]
+        payloads = {
+            'job-applications list': JSONRenderer().render({
+                "status": True,
+                "message": "Job applications retrieved successfully",
+                "data": JobApplicationSerializer(applications, many=True).data,
+            }),
+        }
+        client = Client(HTTP_HOST='localhost')
+        for name, path in (
+            ('swagger ui', '/swagger/'),
+            ('openapi schema', '/swagger/?format=openapi'),
+            ('redoc', '/redoc/'),
+        ):
+            response = client.get(path, secure=True, HTTP_ACCEPT_ENCODING='identity')
+            payloads[name] = response.content
+        return payloads
+
+    def handle(self, *args, **options):
+        repeat = options['repeat']
+        for name, payload in self.get_payloads(options['rows']).items():
+            self.stdout.write(f"\n{name}: {len(payload):,} bytes")
+            for encoding, compressor_class in COMPRESSORS.items():
+                for level in LEVELS[encoding]:
+                    compressor_class(level).compress(payload)  # warm up
+                    start = time.perf_counter()
+                    for _ in range(repeat):
+                        compressor = compressor_class(level)
+                        compressed = compressor.compress(payload) + compressor.finish()
+                    elapsed = (time.perf_counter() - start) / repeat
+                    saved = 1 - len(compressed) / len(payload)
+                    self.stdout.write(
+                        f"  {encoding:>4} level {level:>2}: {len(compressed):>10,} bytes "
+                        f"({saved:6.1%} saved) {elapsed * 1000:8.2f} ms "
+                        f"{len(payload) / elapsed / 1e6:8.1f} MB/s"
+                    )
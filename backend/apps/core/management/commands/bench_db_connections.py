@@ -0,0 +1,64 @@
+import statistics
+import time
+
+from django.core.management.base import BaseCommand
+from django.core.signals import request_finished, request_started
+from django.db import connection
+
+
+class Command(BaseCommand):
+    help = (
+        "Benchmark per-request database latency with and without connection reuse. "
+        "Run with DB_ENGINE=postgresql against a local Postgres instance."
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--queries', type=int, default=3, help="Queries per simulated request")
+
+    def simulate_requests(self, count, queries):
+        """Time `count` request lifecycles that each run `queries` small queries."""
+        timings = []
+        for _ in range(count):
+            start = time.perf_counter()
+            request_started.send(sender=self.__class__)
+            with connection.cursor() as cursor:
+                for _ in range(queries):
+                    cursor.execute('SELECT 1')
+                    cursor.fetchone()
+            # Closes the connection unless CONN_MAX_AGE allows reuse, or hands
+            # it back to the pool, exactly as at the end of a real request.
+            request_finished.send(sender=self.__class__)
+            timings.append(time.perf_counter() - start)
+        return timings
+
+    def report(self, label, timings):
+        timings = sorted(timings)
+        self.stdout.write(
+            f"  {label:>32}: p50 {statistics.median(timings) * 1000:7.2f} ms "
+            f"p99 {timings[int(len(timings) * 0.99) - 1] * 1000:7.2f} ms"
+        )
+
+    def handle(self, *args, **options):
+        settings_dict = connection.settings_dict
+        self.stdout.write(f"{connection.vendor} database {settings_dict['NAME']}")
+        if connection.vendor != 'postgresql':
+            self.stderr.write(self.style.WARNING(
+                "Not running against PostgreSQL; connection setup cost will not be representative."
+            ))
+
+        count, queries = options['requests'], options['queries']
+        if settings_dict['OPTIONS'].get('pool'):
+            self.report('pooled', self.simulate_requests(count, queries))
+            return
+
+        configured_max_age = settings_dict['CONN_MAX_AGE']
+        try:
+            for label, max_age in (('new connection per request', 0), ('persistent (CONN_MAX_AGE=600)', 600)):
+                connection.close()
+                settings_dict['CONN_MAX_AGE'] = max_age
+                self.report(label, self.simulate_requests(count, queries))
+        finally:
+            connection.close()
+            settings_dict['CONN_MAX_AGE'] = configured_max_age
+        self.stdout.write("  Re-run with DB_POOL_SIZE set to measure the pooled mode.")
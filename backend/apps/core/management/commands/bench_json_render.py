@@ -0,0 +1,62 @@
+import datetime
+import time
+
+from django.core.management.base import BaseCommand
+from django.utils import timezone
+from rest_framework.renderers import JSONRenderer as StdlibJSONRenderer
+
+from apps.core.renderers import JSONRenderer, orjson
+from apps.JobApplication.models import JobApplication
+from apps.JobApplication.serializers import JobApplicationSerializer
+
+
+class Command(BaseCommand):
+    help = "Benchmark JSON render throughput for large job application list responses"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--rows', type=int, default=10000)
+        parser.add_argument('--repeat', type=int, default=20)
+
+    def handle(self, *args, **options):
+        rows, repeat = options['rows'], options['repeat']
+        now = timezone.now()
+        applications = [
+            JobApplication(
+                id=i,
+                job_post=f"Security Analyst {i}",
+                job_description="Monitor SIEM alerts, triage incidents and tune detections. " * 4,
+                applied=i % 2 == 0,
+                date_applied=datetime.date(2025, 1, 1) + datetime.timedelta(days=i % 365),
+                received_feedback=i % 3 == 0,
+                feedback_description="Moved to technical interview" if i % 3 == 0 else "",
+                secured_job=i % 7 == 0,
+                created_at=now - datetime.timedelta(minutes=i),
+                updated_at=now,
+            )
+            for i in range(rows)
+        ]
+        # Same shape as standard_response() in JobApplicationViewSet.list
+        payload = {
+            "status": True,
+            "message": "Job applications retrieved successfully",
+            "data": JobApplicationSerializer(applications, many=True).data,
+        }
+
+        baseline = StdlibJSONRenderer().render(payload)
+        if JSONRenderer().render(payload) != baseline:
+            self.stderr.write(self.style.ERROR("Renderer output differs from DRF's JSONRenderer"))
+            return
+
+        self.stdout.write(
+            f"{rows} rows, {len(baseline) / 1e6:.1f} MB per response, "
+            f"orjson {'installed' if orjson is not None else 'not installed'}"
+        )
+        for name, renderer in (('rest_framework', StdlibJSONRenderer()), ('apps.core', JSONRenderer())):
+            start = time.perf_counter()
+            for _ in range(repeat):
+                renderer.render(payload)
+            elapsed = (time.perf_counter() - start) / repeat
+            self.stdout.write(
+                f"{name:>15}: {elapsed * 1000:8.2f} ms/response "
+                f"{rows / elapsed:12,.0f} rows/s"
+            )
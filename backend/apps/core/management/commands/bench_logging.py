@@ -0,0 +1,96 @@
+import logging
+import os
+import time
+
+from django.core.management.base import BaseCommand
+from django.http import HttpResponse
+from django.test import RequestFactory
+
+from apps.core.log import (
+    BoundedQueueHandler,
+    JSONFormatter,
+    RequestContextFilter,
+    RequestContextMiddleware,
+    request_logger,
+)
+
+logger = logging.getLogger('apps.core.bench')
+SINK = 'apps.core.bench.sink'
+
+
+class SlowHandler(logging.Handler):
+    """Stands in for a remote or SMTP handler: each record takes `delay` seconds to send."""
+
+    def __init__(self, delay):
+        super().__init__()
+        self.delay = delay
+
+    def emit(self, record):
+        self.format(record)
+        time.sleep(self.delay)
+
+
+class Command(BaseCommand):
+    help = "Benchmark logging overhead per request, with handlers called inline and through the queue"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--requests', type=int, default=5000)
+        parser.add_argument('--records', type=int, default=3, help="Records logged by the view per request")
+        parser.add_argument('--slow-ms', type=float, default=1.0, help="Time the slow handler takes per record")
+        parser.add_argument('--queue-size', type=int, default=10000)
+
+    def handle(self, *args, **options):
+        count, records = options['requests'], options['records']
+
+        def view(request):
+            for number in range(records):
+                logger.info('Handled step %d', number, extra={'step': number})
+            return HttpResponse()
+        middleware = RequestContextMiddleware(view)
+        request = RequestFactory().get('/api/users/profile/')
+
+        devnull = open(os.devnull, 'w')
+        scenarios = {
+            'no logging': lambda: None,
+            'inline, stream': lambda: logging.StreamHandler(devnull),
+            'inline, slow': lambda: SlowHandler(options['slow_ms'] / 1000),
+            'queued, stream': lambda: logging.StreamHandler(devnull),
+            'queued, slow': lambda: SlowHandler(options['slow_ms'] / 1000),
+        }
+
+        root = logging.getLogger()
+        sink = logging.getLogger(SINK)
+        saved = root.handlers, root.level, sink.propagate, request_logger.level
+        sink.propagate = False
+        request_logger.setLevel(logging.NOTSET)
+        try:
+            self.stdout.write(f"{count} requests, {records + 1} records each (including the request log)")
+            for label, make_handler in scenarios.items():
+                handler = make_handler()
+                if handler is not None:
+                    handler.setFormatter(JSONFormatter())
+                if label.startswith('queued'):
+                    sink.handlers = [handler]
+                    handler = BoundedQueueHandler(options['queue_size'], sink=SINK)
+                if handler is not None:
+                    handler.addFilter(RequestContextFilter())
+                root.handlers = [handler] if handler is not None else []
+                root.setLevel(logging.INFO if handler is not None else logging.WARNING)
+
+                start = time.perf_counter()
+                for _ in range(count):
+                    middleware(request)
+                elapsed = time.perf_counter() - start
+                dropped = ''
+                if isinstance(handler, BoundedQueueHandler):
+                    handler.stop()
+                    dropped = f" {handler.dropped:8,} records dropped"
+                self.stdout.write(
+                    f"  {label:>16}: {elapsed / count * 1e6:9.1f} us/request on the request thread{dropped}"
+                )
+        finally:
+            root.handlers, level, sink.propagate, request_level = saved
+            root.setLevel(level)
+            request_logger.setLevel(request_level)
+            sink.handlers = []
+            devnull.close()
@@ -0,0 +1,71 @@
+import os
+import statistics
+import subprocess
+import sys
+import time
+from collections import defaultdict
+
+from django.conf import settings
+from django.core.management.base import BaseCommand
+
+# Runs in a fresh interpreter: load settings and apps, import the URLconf and
+# serve a single API request, which is everything a worker does before it can
+# answer its first request.
+FIRST_REQUEST_SCRIPT = """
+import io, sys
+from backend.wsgi import application
+environ = {
+    'REQUEST_METHOD': 'GET', 'PATH_INFO': '/api/users/profile/',
+    'SERVER_NAME': 'localhost', 'SERVER_PORT': '443', 'HTTP_HOST': 'localhost',
+    'wsgi.url_scheme': 'https', 'wsgi.input': io.BytesIO(), 'wsgi.errors': sys.stderr,
+}
+b''.join(application(environ, lambda status, headers: None))
+"""
+
+
+def parse_importtime(output):
+    """Return {top-level package: self time in microseconds} from -X importtime output."""
+    totals = defaultdict(int)
+    for line in output.splitlines():
+        if not line.startswith('import time:') or 'self [us]' in line:
+            continue
+        self_us, _, name = line[len('import time:'):].split('|')
+        totals[name.strip().split('.')[0]] += int(self_us)
+    return totals
+
+
+class Command(BaseCommand):
+    help = "Report per-app import costs and time to the first served request for a settings module"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            '--profile', action='append', dest='profiles',
+            help="Settings module to measure (repeatable). Defaults to the active settings.",
+        )
+        parser.add_argument('--repeat', type=int, default=5)
+        parser.add_argument('--top', type=int, default=15)
+
+    def run(self, settings_module, *args):
+        env = {**os.environ, 'DJANGO_SETTINGS_MODULE': settings_module}
+        start = time.perf_counter()
+        result = subprocess.run(
+            [sys.executable, *args, '-c', FIRST_REQUEST_SCRIPT],
+            cwd=settings.BASE_DIR, env=env, capture_output=True, text=True, check=True,
+        )
+        return time.perf_counter() - start, result.stderr
+
+    def handle(self, *args, **options):
+        profiles = options['profiles'] or [os.environ['DJANGO_SETTINGS_MODULE']]
+        for settings_module in profiles:
+            _, output = self.run(settings_module, '-X', 'importtime')
+            totals = parse_importtime(output)
+            timings = [self.run(settings_module)[0] for _ in range(options['repeat'])]
+
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{settings_module}"))
+            self.stdout.write(
+                f"  time to first request: median {statistics.median(timings) * 1000:.0f} ms, "
+                f"min {min(timings) * 1000:.0f} ms over {len(timings)} runs"
+            )
+            self.stdout.write(f"  total import time: {sum(totals.values()) / 1000:.0f} ms")
+            for name, self_us in sorted(totals.items(), key=lambda item: -item[1])[:options['top']]:
+                self.stdout.write(f"  {self_us / 1000:8.1f} ms  {name}")
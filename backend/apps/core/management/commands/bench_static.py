@@ -0,0 +1,81 @@
+import os
+import time
+
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.management.base import BaseCommand, CommandError
+from django.http import HttpResponseNotFound
+from django.test import RequestFactory
+from django.views.static import serve
+
+from apps.core.middleware import StaticFilesMiddleware
+
+# Assets loaded by the admin login/changelist pages and the Swagger UI page.
+PAGES = {
+    'admin': [
+        'admin/css/base.css',
+        'admin/css/dark_mode.css',
+        'admin/css/login.css',
+        'admin/css/nav_sidebar.css',
+        'admin/css/responsive.css',
+        'admin/js/nav_sidebar.js',
+        'admin/js/theme.js',
+    ],
+    'swagger ui': [
+        'drf-yasg/style.css',
+        'drf-yasg/swagger-ui-dist/swagger-ui.css',
+        'drf-yasg/swagger-ui-dist/swagger-ui-bundle.js',
+        'drf-yasg/swagger-ui-dist/swagger-ui-standalone-preset.js',
+        'drf-yasg/swagger-ui-init.js',
+        'drf-yasg/insQ.min.js',
+    ],
+}
+
+
+class Command(BaseCommand):
+    help = "Benchmark static asset request throughput for the admin and Swagger UI pages (run collectstatic first)"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--repeat', type=int, default=200)
+
+    def handle(self, *args, **options):
+        if not os.path.isdir(settings.STATIC_ROOT):
+            raise CommandError(f"{settings.STATIC_ROOT} does not exist; run collectstatic first.")
+
+        factory = RequestFactory()
+        middleware = StaticFilesMiddleware(lambda request: HttpResponseNotFound())
+        prefix = middleware.prefix
+
+        def django_serve(name):
+            request = factory.get(prefix + name)
+            return serve(request, name, document_root=settings.STATIC_ROOT)
+
+        def middleware_serve(name, accept_encoding):
+            request = factory.get(prefix + name, HTTP_ACCEPT_ENCODING=accept_encoding)
+            return middleware(request)
+
+        for page, names in PAGES.items():
+            names = [
+                staticfiles_storage.stored_name(name) for name in names
+                if staticfiles_storage.exists(name)
+            ]
+            self.stdout.write(self.style.MIGRATE_HEADING(f"\n{page}: {len(names)} assets"))
+            for label, handler in (
+                ('django.views.static.serve', django_serve),
+                ('middleware, identity', lambda name: middleware_serve(name, 'identity')),
+                ('middleware, gzip', lambda name: middleware_serve(name, 'gzip')),
+                ('middleware, br', lambda name: middleware_serve(name, 'br, gzip')),
+            ):
+                transferred = 0
+                start = time.perf_counter()
+                for _ in range(options['repeat']):
+                    for name in names:
+                        response = handler(name)
+                        transferred += sum(len(chunk) for chunk in response.streaming_content)
+                        response.close()
+                elapsed = time.perf_counter() - start
+                requests = options['repeat'] * len(names)
+                self.stdout.write(
+                    f"  {label:>26}: {requests / elapsed:9,.0f} req/s "
+                    f"{transferred / options['repeat'] / 1024:9,.1f} KiB per page load"
+                )
@@ -0,0 +1,87 @@
+import random
+import statistics
+import time
+
+from django.contrib.auth import get_user_model
+from django.core.management.base import BaseCommand
+from django.db import transaction
+from rest_framework.test import APIRequestFactory, force_authenticate
+
+from apps.JobApplication.models import JobApplication
+from apps.JobApplication.suggestions import rebuild_title_suggestions, refresh_title_suggestions
+from apps.JobApplication.views import JobApplicationViewSet
+
+LEVELS = ["Junior", "Senior", "Lead", "Principal", "Staff", "Associate", ""]
+ROLES = [
+    "Security Analyst", "SOC Analyst", "Security Engineer", "Penetration Tester", "Threat Hunter",
+    "Incident Responder", "GRC Analyst", "Cloud Security Engineer", "Red Teamer", "Malware Analyst",
+]
+COMPANIES = ["Acme", "Globex", "Initech", "Umbrella", "Hooli", "Stark", "Wayne", "Cyberdyne"]
+
+
+def make_title(rng):
+    level = rng.choice(LEVELS)
+    return f"{level + ' ' if level else ''}{rng.choice(ROLES)} - {rng.choice(COMPANIES)} {rng.randrange(100)}"
+
+
+def percentiles(timings):
+    timings = sorted(timings)
+    return statistics.median(timings), timings[int(len(timings) * 0.99) - 1]
+
+
+class Command(BaseCommand):
+    help = "Benchmark job title autocomplete: the suggest endpoint against list?search=, for one large history"
+
+    def add_arguments(self, parser):
+        parser.add_argument('--applications', type=int, default=20000)
+        parser.add_argument('--requests', type=int, default=500)
+        parser.add_argument('--seed', type=int, default=0)
+
+    def time_requests(self, view, user, params):
+        factory = APIRequestFactory()
+        timings = []
+        for query in params:
+            request = factory.get('/api/job-applications/', query)
+            force_authenticate(request, user)
+            start = time.perf_counter()
+            view(request).render()
+            timings.append((time.perf_counter() - start) * 1000)
+        return percentiles(timings)
+
+    def handle(self, *args, **options):
+        rng = random.Random(options['seed'])
+        count = options['applications']
+        with transaction.atomic():
+            user = get_user_model().objects.create_user(
+                username='bench-title-suggestions', email='bench-title-suggestions@example.com', email_verified=True
+            )
+            titles = [make_title(rng) for _ in range(count)]
+            JobApplication.objects.bulk_create(
+                (JobApplication(user=user, job_post=title, job_description="Triage alerts. " * 20) for title in titles),
+                batch_size=1000,
+            )
+            start = time.perf_counter()
+            rebuild_title_suggestions([user.pk])
+            self.stdout.write(
+                f"{count} applications, {len({title.lower() for title in titles})} distinct titles, "
+                f"index built in {time.perf_counter() - start:.2f} s"
+            )
+
+            # What a user types: the first 1-8 characters of one of their titles.
+            queries = [rng.choice(titles)[:rng.randint(1, 8)] for _ in range(options['requests'])]
+            for label, view, key in (
+                ('list?search=', JobApplicationViewSet.as_view({'get': 'list'}), 'search'),
+                ('suggest?q=', JobApplicationViewSet.as_view({'get': 'suggest'}), 'q'),
+            ):
+                median, p99 = self.time_requests(view, user, [{key: query} for query in queries])
+                self.stdout.write(f"  {label:>14}: {median:8.2f} ms median, {p99:8.2f} ms p99")
+
+            timings = []
+            for _ in range(min(options['requests'], 100)):
+                title = rng.choice(titles)
+                start = time.perf_counter()
+                refresh_title_suggestions(user.pk, {title})
+                timings.append((time.perf_counter() - start) * 1000)
+            median, p99 = percentiles(timings)
+            self.stdout.write(f"  {'refresh title':>14}: {median:8.2f} ms median, {p99:8.2f} ms p99 (background)")
+            transaction.set_rollback(True)
@@ -0,0 +1,358 @@
+import mimetypes
+import os
+import re
+import zlib
+from functools import lru_cache, wraps
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction
+from django.conf import settings
+from django.contrib.staticfiles.storage import staticfiles_storage
+from django.core.exceptions import SuspiciousFileOperation
+from django.core.files.storage import storages
+from django.http import FileResponse, HttpResponseNotModified
+from django.utils._os import safe_join
+from django.utils.cache import patch_vary_headers
+from django.utils.deprecation import MiddlewareMixin
+from django.utils.http import http_date
+from django.views.static import was_modified_since
+
+from .storage import precompressed_variants
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+try:
+    import zstandard
+except ImportError:
+    zstandard = None
+
+re_compressible_type = re.compile(
+    r'^(text/|application/(json|javascript|xml|[\w.+-]+\+(json|xml))|image/svg\+xml)'
+)
+
+
+def compression_exempt(view):
+    """
+    Mark a view (function or class) whose responses must never be compressed,
+    e.g. because they carry tokens or other secrets (BREACH).
+    """
+    if isinstance(view, type):
+        view.compression_exempt = True
+        return view
+
+    @wraps(view)
+    def wrapper(*args, **kwargs):
+        return view(*args, **kwargs)
+    wrapper.compression_exempt = True
+    return wrapper
+
+
+def get_view_attribute(view_func, method, name):
+    """
+    The attribute `name` set by a decorator for `method` requests to
+    `view_func`: on the view function, on the handler or viewset action
+    for `method`, on the view class, or on the ModelAdmin. None if unset.
+    """
+    value = getattr(view_func, name, None)
+    view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+    if value is None and view_class is not None:
+        actions = getattr(view_func, 'actions', None)
+        handler_name = actions.get(method.lower()) if actions else method.lower()
+        handler = getattr(view_class, handler_name, None) if handler_name else None
+        value = getattr(handler, name, None)
+        if value is None:
+            value = getattr(view_class, name, None)
+    if value is None:
+        # ModelAdmin.get_urls() sets model_admin; custom admin views wrap a bound method.
+        model_admin = getattr(view_func, 'model_admin', None) or getattr(
+            getattr(view_func, '__wrapped__', None), '__self__', None
+        )
+        value = getattr(model_admin, name, None)
+    return value
+
+
+class GzipCompressor:
+    def __init__(self, level):
+        self._obj = zlib.compressobj(level, zlib.DEFLATED, 16 + zlib.MAX_WBITS)
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zlib.Z_SYNC_FLUSH)
+
+    def finish(self):
+        return self._obj.flush(zlib.Z_FINISH)
+
+
+class BrotliCompressor:
+    def __init__(self, level):
+        self._obj = brotli.Compressor(quality=level)
+
+    def compress(self, data):
+        return self._obj.process(data)
+
+    def flush(self):
+        return self._obj.flush()
+
+    def finish(self):
+        return self._obj.finish()
+
+
+class ZstdCompressor:
+    def __init__(self, level):
+        self._obj = zstandard.ZstdCompressor(level=level).compressobj()
+
+    def compress(self, data):
+        return self._obj.compress(data)
+
+    def flush(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_BLOCK)
+
+    def finish(self):
+        return self._obj.flush(zstandard.COMPRESSOBJ_FLUSH_FINISH)
+
+
+COMPRESSORS = {'gzip': GzipCompressor}
+if brotli is not None:
+    COMPRESSORS['br'] = BrotliCompressor
+if zstandard is not None:
+    COMPRESSORS['zstd'] = ZstdCompressor
+
+
+def parse_accept_encoding(header):
+    """Return {coding: qvalue} for an Accept-Encoding header."""
+    codings = {}
+    for part in header.split(','):
+        coding, _, params = part.strip().partition(';')
+        coding = coding.strip().lower()
+        if not coding:
+            continue
+        qvalue = 1.0
+        params = params.strip()
+        if params.startswith('q='):
+            try:
+                qvalue = float(params[2:])
+            except ValueError:
+                qvalue = 0.0
+        codings[coding] = qvalue
+    return codings
+
+
+def select_encoding(header, preference):
+    """Pick the first coding in `preference` that the client accepts."""
+    accepted = parse_accept_encoding(header)
+    for coding in preference:
+        if accepted.get(coding, accepted.get('*', 0)) > 0:
+            return coding
+    return None
+
+
+class CompressionMiddleware(MiddlewareMixin):
+    """
+    Compress responses with brotli, zstd or gzip, depending on what the
+    client accepts and what is installed.
+
+    Streaming responses are compressed chunk by chunk and flushed after each
+    chunk, so nothing is buffered. Views marked with @compression_exempt are
+    never compressed, because a compressed body that mixes a secret with
+    attacker-controlled input is open to BREACH.
+    """
+
+    def process_view(self, request, view_func, view_args, view_kwargs):
+        view_class = getattr(view_func, 'cls', None) or getattr(view_func, 'view_class', None)
+        if getattr(view_func, 'compression_exempt', False) or getattr(view_class, 'compression_exempt', False):
+            request.compression_exempt = True
+
+    def process_response(self, request, response):
+        if getattr(request, 'compression_exempt', False):
+            return response
+
+        # It's not worth attempting to compress really short responses.
+        if not response.streaming and len(response.content) < settings.COMPRESSION_MIN_SIZE:
+            return response
+
+        # Avoid compressing if we've already got a content-encoding.
+        if response.has_header('Content-Encoding'):
+            return response
+
+        content_type = response.get('Content-Type', '')
+        if not re_compressible_type.match(content_type):
+            return response
+
+        patch_vary_headers(response, ('Accept-Encoding',))
+
+        encoding = select_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [encoding for encoding in settings.COMPRESSION_ENCODINGS if encoding in COMPRESSORS],
+        )
+        if encoding is None:
+            return response
+
+        compressor = COMPRESSORS[encoding](settings.COMPRESSION_LEVELS[encoding])
+        if response.streaming:
+            if response.is_async:
+                response.streaming_content = self.compress_async_stream(
+                    compressor, response.streaming_content
+                )
+            else:
+                response.streaming_content = self.compress_stream(
+                    compressor, response.streaming_content
+                )
+            # Delete the `Content-Length` header for streaming content, because
+            # we won't know the compressed size until we stream it.
+            del response.headers['Content-Length']
+        else:
+            # Return the compressed content only if it's actually shorter.
+            compressed_content = compressor.compress(response.content) + compressor.finish()
+            if len(compressed_content) >= len(response.content):
+                return response
+            response.content = compressed_content
+            response.headers['Content-Length'] = str(len(response.content))
+
+        # If there is a strong ETag, make it weak to fulfill the requirements
+        # of RFC 9110 Section 8.8.1 while also allowing conditional request
+        # matches on ETags.
+        etag = response.get('ETag')
+        if etag and etag.startswith('"'):
+            response.headers['ETag'] = 'W/' + etag
+        response.headers['Content-Encoding'] = encoding
+
+        return response
+
+    @staticmethod
+    def compress_stream(compressor, iterator):
+        for chunk in iterator:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+    @staticmethod
+    async def compress_async_stream(compressor, iterator):
+        async for chunk in iterator:
+            data = compressor.compress(chunk) + compressor.flush()
+            if data:
+                yield data
+        yield compressor.finish()
+
+
+class StaticFilesMiddleware:
+    """
+    Serve collected static files from STATIC_ROOT.
+
+    Picks the precompressed .br/.gz copy written by
+    CompressedManifestStaticFilesStorage when the client accepts it. Files
+    with a content hash in their name get a one-year immutable
+    Cache-Control. Responses are FileResponses, so WSGI servers that
+    provide wsgi.file_wrapper (gunicorn, uWSGI) send them with sendfile().
+    Must come before CompressionMiddleware.
+    """
+    immutable_cache_control = 'public, max-age=31536000, immutable'
+    cache_control = 'public, max-age=60'
+    cache_lookups = True
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+        url, self.root = self.get_location()
+        self.prefix = url if url.startswith('/') else '/' + url
+        self.immutable_names = self.get_immutable_names()
+        if not settings.DEBUG and self.cache_lookups:
+            # Files only change on deploy, so cache lookups for the process lifetime.
+            self.find_file = lru_cache(maxsize=4096)(self.find_file)
+
+    def get_location(self):
+        """(URL prefix, directory) of the files served."""
+        return settings.STATIC_URL, settings.STATIC_ROOT
+
+    def get_immutable_names(self):
+        return set(getattr(staticfiles_storage, 'hashed_files', {}).values())
+
+    def is_immutable(self, name):
+        return name in self.immutable_names
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        response = self.serve_request(request)
+        if response is None:
+            response = self.get_response(request)
+        return response
+
+    async def __acall__(self, request):
+        response = self.serve_request(request)
+        if response is None:
+            response = await self.get_response(request)
+        return response
+
+    def serve_request(self, request):
+        if request.method in ('GET', 'HEAD') and request.path_info.startswith(self.prefix):
+            return self.serve(request, request.path_info[len(self.prefix):])
+        return None
+
+    def find_file(self, name):
+        """Return (path, content_type, {encoding: path}) for a static file, or None."""
+        try:
+            path = safe_join(self.root, name)
+        except (SuspiciousFileOperation, ValueError):
+            return None
+        if not os.path.isfile(path):
+            return None
+        content_type, _ = mimetypes.guess_type(path)
+        return path, content_type or 'application/octet-stream', precompressed_variants(path)
+
+    def serve(self, request, name):
+        found = self.find_file(name)
+        if found is None:
+            return None
+        path, content_type, variants = found
+
+        encoding = select_encoding(
+            request.META.get('HTTP_ACCEPT_ENCODING', ''),
+            [encoding for encoding in settings.COMPRESSION_ENCODINGS if encoding in variants],
+        ) if variants else None
+        if encoding is not None:
+            path = variants[encoding]
+
+        stat = os.stat(path)
+        if not was_modified_since(request.META.get('HTTP_IF_MODIFIED_SINCE'), stat.st_mtime):
+            response = HttpResponseNotModified()
+        else:
+            response = FileResponse(open(path, 'rb'), content_type=content_type)
+            if encoding is not None:
+                response.headers['Content-Encoding'] = encoding
+        response.headers['Last-Modified'] = http_date(stat.st_mtime)
+        response.headers['Cache-Control'] = (
+            self.immutable_cache_control if self.is_immutable(name) else self.cache_control
+        )
+        if variants:
+            patch_vary_headers(response, ('Accept-Encoding',))
+        return response
+
+
+class ContentAddressedFilesMiddleware(StaticFilesMiddleware):
+    """
+    Serve the files of a ContentAddressedStorage (the 'avatars' entry of
+    STORAGES), all with an immutable Cache-Control, since a name always
+    means the same bytes. Files may appear at any time (thumbnails are
+    written in the background), so lookups aren't cached.
+    """
+    storage_alias = 'avatars'
+    cache_lookups = False
+
+    def get_location(self):
+        storage = storages[self.storage_alias]
+        return storage.base_url, storage.location
+
+    def get_immutable_names(self):
+        return set()
+
+    def is_immutable(self, name):
+        return True
@@ -0,0 +1,27 @@
+from django.conf import settings
+from django.db import models
+
+
+class ProfileRecord(models.Model):
+    """
+    One request profiled by apps.core.profiling.ProfilingMiddleware. The
+    flame graph and SQL list are files under MEDIA_ROOT/profiles; only the
+    newest PROFILING_MAX_RECORDS are kept.
+    """
+    created_at = models.DateTimeField(auto_now_add=True, db_index=True)
+    user = models.ForeignKey(settings.AUTH_USER_MODEL, null=True, on_delete=models.SET_NULL, related_name='+')
+    method = models.CharField(max_length=10)
+    path = models.CharField(max_length=2048)
+    status_code = models.PositiveSmallIntegerField()
+    duration_ms = models.FloatField()
+    sample_count = models.PositiveIntegerField()
+    query_count = models.PositiveIntegerField()
+    query_time_ms = models.FloatField()
+    flamegraph = models.FileField(upload_to='profiles/')
+    queries = models.FileField(upload_to='profiles/')
+
+    class Meta:
+        ordering = ['-created_at']
+
+    def __str__(self):
+        return f"{self.method} {self.path} ({self.duration_ms:.0f} ms)"
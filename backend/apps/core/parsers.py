@@ -0,0 +1,28 @@
+import codecs
+
+from django.conf import settings
+from rest_framework import parsers
+from rest_framework.exceptions import ParseError
+
+from .renderers import JSONRenderer, orjson
+
+
+class JSONParser(parsers.JSONParser):
+    """
+    Drop-in replacement for DRF's JSONParser that decodes UTF-8 bodies with
+    orjson when it is installed.
+    """
+    renderer_class = JSONRenderer
+
+    def parse(self, stream, media_type=None, parser_context=None):
+        parser_context = parser_context or {}
+        encoding = parser_context.get('encoding', settings.DEFAULT_CHARSET)
+
+        if orjson is None or codecs.lookup(encoding).name != 'utf-8':
+            return super().parse(stream, media_type, parser_context)
+
+        try:
+            # orjson rejects NaN and Infinity, which matches STRICT_JSON.
+            return orjson.loads(stream.read())
+        except orjson.JSONDecodeError as exc:
+            raise ParseError('JSON parse error - %s' % str(exc))
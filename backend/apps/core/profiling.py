@@ -0,0 +1,260 @@
+"""
+On-demand profiling of single requests.
+
+Staff issue a short-lived signed token from the admin (ProfileRecord >
+Issue profiling token) and send it with the request to profile, in an
+X-Profile-Token header or a _profile query parameter. The request's thread
+is then sampled with sys._current_frames() from a background thread and
+its SQL recorded. The resulting flame graph (SVG) and SQL list are stored
+as a ProfileRecord, viewable in the admin. Requests without a token only
+pay for a header lookup.
+"""
+import json
+import sys
+import threading
+import time
+import zlib
+from collections import Counter
+from contextlib import ExitStack
+from functools import lru_cache
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core import signing
+from django.core.files.base import ContentFile
+from django.db import connections
+from django.utils.html import escape
+
+from .models import ProfileRecord
+
+PROFILING_TOKEN_SALT = 'apps.core.profiling'
+
+# Credentials that can come in the query string: the profiling token itself,
+# and the JWT event streams take in place of an Authorization header.
+SECRET_QUERY_PARAMETERS = ('_profile', 'access_token')
+
+
+def make_profiling_token(user):
+    return signing.dumps(user.pk, salt=PROFILING_TOKEN_SALT)
+
+
+def get_profiling_user(token):
+    """The active staff user `token` was issued to, or None if it is invalid or expired."""
+    try:
+        user_id = signing.loads(token, salt=PROFILING_TOKEN_SALT, max_age=settings.PROFILING_TOKEN_MAX_AGE)
+    except signing.BadSignature:
+        return None
+    return get_user_model().objects.filter(pk=user_id, is_active=True, is_staff=True).first()
+
+
+@lru_cache(maxsize=4096)
+def short_path(filename):
+    for prefix in sorted(sys.path, key=len, reverse=True):
+        if prefix and filename.startswith(prefix + '/'):
+            return filename[len(prefix) + 1:]
+    return filename
+
+
+class SamplingProfiler:
+    """Count one thread's Python stacks, sampled every `interval` seconds from a background thread."""
+
+    def __init__(self, thread_id, interval):
+        self.thread_id = thread_id
+        self.interval = interval
+        self.stacks = Counter()
+        self._stopped = threading.Event()
+        self._thread = threading.Thread(target=self.run, name='profiler', daemon=True)
+
+    def start(self):
+        self._thread.start()
+
+    def stop(self):
+        self._stopped.set()
+        self._thread.join()
+
+    def run(self):
+        while not self._stopped.wait(self.interval):
+            frame = sys._current_frames().get(self.thread_id)
+            stack = []
+            while frame is not None:
+                code = frame.f_code
+                stack.append(f'{code.co_name} ({short_path(code.co_filename)}:{code.co_firstlineno})')
+                frame = frame.f_back
+            if stack:
+                self.stacks[tuple(reversed(stack))] += 1
+
+
+class QueryRecorder:
+    """execute_wrapper that records each query's SQL and duration."""
+
+    def __init__(self, alias, queries):
+        self.alias = alias
+        self.queries = queries
+
+    def __call__(self, execute, sql, params, many, context):
+        start = time.perf_counter()
+        try:
+            return execute(sql, params, many, context)
+        finally:
+            if len(self.queries) < settings.PROFILING_MAX_QUERIES:
+                self.queries.append({
+                    'alias': self.alias,
+                    'sql': sql,
+                    'duration_ms': (time.perf_counter() - start) * 1000,
+                })
+
+
+def frame_color(name):
+    # Stable warm colours, as in the classic flame graph.
+    value = zlib.crc32(name.encode())
+    return f'rgb({205 + value % 50},{(value >> 8) % 180},{(value >> 16) % 55})'
+
+
+def render_flamegraph(stacks, title, width=1200, row_height=16, min_width=0.5):
+    """An SVG flame graph of a Counter of stacks (tuples of frame names, root first)."""
+    root = {'count': 0, 'children': {}}
+    for stack, count in stacks.items():
+        node = root
+        node['count'] += count
+        for name in stack:
+            node = node['children'].setdefault(name, {'count': 0, 'children': {}})
+            node['count'] += count
+
+    total = root['count'] or 1
+    scale = width / total
+    rects = []
+    depth = 0
+
+    def layout(children, x, level):
+        nonlocal depth
+        for name, node in sorted(children.items()):
+            node_width = node['count'] * scale
+            if node_width < min_width:
+                x += node_width
+                continue
+            depth = max(depth, level + 1)
+            rects.append((name, x, level, node_width, node['count']))
+            layout(node['children'], x, level + 1)
+            x += node_width
+
+    layout(root['children'], 0, 0)
+    height = (depth + 2) * row_height
+    parts = [
+        f'<svg xmlns="http://www.w3.org/2000/svg" width="{width}" height="{height}" '
+        f'font-family="monospace" font-size="11">',
+        f'<text x="4" y="{row_height - 4}">{escape(title)} ({total} samples)</text>',
+    ]
+    for name, x, level, node_width, count in rects:
+        y = height - (level + 1) * row_height
+        label = escape(name)
+        parts.append(
+            f'<g><title>{label} ({count} samples, {count * 100 / total:.1f}%)</title>'
+            f'<rect x="{x:.1f}" y="{y}" width="{node_width:.1f}" height="{row_height - 1}" fill="{frame_color(name)}"/>'
+        )
+        chars = int(node_width / 7)
+        if chars > 3:
+            text = label if len(name) <= chars else escape(name[:chars - 2]) + '..'
+            parts.append(f'<text x="{x + 3:.1f}" y="{y + row_height - 5}">{text}</text>')
+        parts.append('</g>')
+    parts.append('</svg>')
+    return '\n'.join(parts)
+
+
+def profiled_path(request):
+    """The request's path and query string, without SECRET_QUERY_PARAMETERS."""
+    query = request.GET.copy()
+    for parameter in SECRET_QUERY_PARAMETERS:
+        query.pop(parameter, None)
+    return f'{request.path}?{query.urlencode()}' if query else request.path
+
+
+def save_profile(request, response, user, stacks, queries, duration):
+    """Store a ProfileRecord and evict the oldest beyond PROFILING_MAX_RECORDS."""
+    path = profiled_path(request)
+    title = f'{request.method} {path}'
+    record = ProfileRecord(
+        user=user,
+        method=request.method,
+        path=path[:2048],
+        status_code=response.status_code,
+        duration_ms=duration * 1000,
+        sample_count=sum(stacks.values()),
+        query_count=len(queries),
+        query_time_ms=sum(query['duration_ms'] for query in queries),
+    )
+    record.flamegraph.save('flamegraph.svg', ContentFile(render_flamegraph(stacks, title).encode()), save=False)
+    record.queries.save('queries.json', ContentFile(json.dumps(queries, indent=1).encode()), save=False)
+    record.save()
+
+    # django_cleanup deletes the files of evicted records.
+    expired = ProfileRecord.objects.order_by('-created_at', '-pk').values_list('pk', flat=True)[
+        settings.PROFILING_MAX_RECORDS:
+    ]
+    ProfileRecord.objects.filter(pk__in=list(expired)).delete()
+    return record
+
+
+class ProfilingMiddleware:
+    """
+    Profile requests that carry a valid profiling token and add an
+    X-Profile-Id header to their response. Under ASGI only the event loop
+    thread is sampled, so sync views and their SQL are not captured.
+    Should come first, after SecurityMiddleware.
+    """
+    sync_capable = True
+    async_capable = True
+    query_parameter = '_profile'
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def get_token(self, request):
+        token = request.META.get('HTTP_X_PROFILE_TOKEN')
+        if token is None and self.query_parameter in request.META.get('QUERY_STRING', ''):
+            token = request.GET.get(self.query_parameter)
+        return token
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        token = self.get_token(request)
+        user = get_profiling_user(token) if token else None
+        if user is None:
+            return self.get_response(request)
+
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        queries = []
+        with ExitStack() as stack:
+            for connection in connections.all():
+                stack.enter_context(connection.execute_wrapper(QueryRecorder(connection.alias, queries)))
+            start = time.perf_counter()
+            profiler.start()
+            try:
+                response = self.get_response(request)
+            finally:
+                profiler.stop()
+            duration = time.perf_counter() - start
+        record = save_profile(request, response, user, profiler.stacks, queries, duration)
+        response['X-Profile-Id'] = str(record.pk)
+        return response
+
+    async def __acall__(self, request):
+        token = self.get_token(request)
+        user = await sync_to_async(get_profiling_user)(token) if token else None
+        if user is None:
+            return await self.get_response(request)
+
+        profiler = SamplingProfiler(threading.get_ident(), settings.PROFILING_SAMPLE_INTERVAL)
+        start = time.perf_counter()
+        profiler.start()
+        try:
+            response = await self.get_response(request)
+        finally:
+            profiler.stop()
+        duration = time.perf_counter() - start
+        record = await sync_to_async(save_profile)(request, response, user, profiler.stacks, [], duration)
+        response['X-Profile-Id'] = str(record.pk)
+        return response
@@ -0,0 +1,56 @@
+from rest_framework import renderers
+
+try:
+    import orjson
+except ImportError:
+    orjson = None
+
+# Dates, times and dataclasses go through DRF's encoder so the output stays
+# identical to the stdlib renderer (e.g. '+00:00' becomes 'Z').
+ORJSON_OPTIONS = (
+    orjson.OPT_PASSTHROUGH_DATETIME | orjson.OPT_PASSTHROUGH_DATACLASS
+    if orjson is not None else 0
+)
+
+
+class JSONRenderer(renderers.JSONRenderer):
+    """
+    Drop-in replacement for DRF's JSONRenderer that encodes with orjson
+    when it is installed and falls back to the stdlib encoder otherwise.
+
+    Output is byte-for-byte identical for everything our serializers emit.
+    Raw floats are the exception: orjson writes NaN/Infinity as null rather
+    than rejecting them, and spells exponents as 1e16 rather than 1e+16.
+    """
+    def __init__(self):
+        self._default = self.encoder_class().default
+
+    def can_use_orjson(self, indent):
+        # orjson always emits compact, non-ASCII-escaped output.
+        return (
+            orjson is not None
+            and indent is None
+            and self.compact
+            and not self.ensure_ascii
+        )
+
+    def render(self, data, accepted_media_type=None, renderer_context=None):
+        if data is None:
+            return b''
+
+        indent = self.get_indent(accepted_media_type, renderer_context or {})
+        if not self.can_use_orjson(indent):
+            return super().render(data, accepted_media_type, renderer_context)
+
+        try:
+            ret = orjson.dumps(data, default=self._default, option=ORJSON_OPTIONS)
+        except orjson.JSONEncodeError:
+            # Non-string keys, integers wider than 64 bits and anything else
+            # orjson rejects are left to the stdlib encoder.
+            return super().render(data, accepted_media_type, renderer_context)
+
+        # Match DRF: always escape U+2028/U+2029 so the output is valid JavaScript.
+        if b'\xe2\x80\xa8' in ret or b'\xe2\x80\xa9' in ret:
+            ret = ret.replace(b'\xe2\x80\xa8', b'\\u2028').replace(b'\xe2\x80\xa9', b'\\u2029')
+        return ret
+
@@ -0,0 +1,148 @@
+import random
+from contextvars import ContextVar
+
+from asgiref.sync import iscoroutinefunction, markcoroutinefunction, sync_to_async
+from django.conf import settings
+from django.contrib.auth import SESSION_KEY
+from django.contrib.auth.models import AbstractBaseUser
+from django.core.cache import cache
+from django.db import DEFAULT_DB_ALIAS, connections
+
+_routing_state = ContextVar('replica_routing_state', default=None)
+
+
+def get_request_user_id(request):
+    """
+    Best-effort id of the user making `request`, without touching the user
+    table: an already-authenticated user, a JWT's user id claim, or the
+    session's user id.
+    """
+    user = request.__dict__.get('user')
+    if isinstance(user, AbstractBaseUser):
+        return user.pk
+
+    header = request.META.get('HTTP_AUTHORIZATION', '')
+    if header.startswith('Bearer '):
+        from rest_framework_simplejwt.exceptions import TokenError
+        from rest_framework_simplejwt.settings import api_settings
+        from rest_framework_simplejwt.tokens import AccessToken
+
+        try:
+            return AccessToken(header[len('Bearer '):]).get(api_settings.USER_ID_CLAIM)
+        except TokenError:
+            return None
+
+    session = getattr(request, 'session', None)
+    if session is not None:
+        return session.get(SESSION_KEY)
+    return None
+
+
+def pin_cache_key(user_id):
+    return f'db-primary-pin:{user_id}'
+
+
+class RoutingState:
+    def __init__(self, request):
+        self.request = request
+        self.wrote = False
+        self._pinned = None
+
+    @property
+    def pinned(self):
+        """Whether this request's reads must go to the primary."""
+        if self.wrote:
+            return True
+        if self._pinned is None:
+            user_id = get_request_user_id(self.request)
+            if user_id is None:
+                # Try again on the next read, e.g. once DRF has authenticated.
+                return False
+            self._pinned = bool(cache.get(pin_cache_key(user_id)))
+        return self._pinned
+
+
+class ReplicaRouter:
+    """
+    Send reads for DATABASE_REPLICA_APPS to a random DATABASE_REPLICAS alias
+    and all writes to the primary.
+
+    A request that writes reads from the primary for the rest of the
+    request. Its user's later requests also read from the primary for
+    DATABASE_READ_YOUR_WRITES_WINDOW seconds, so they see their own writes
+    despite replication lag. Reads inside a transaction, and reads outside a
+    request (commands, background jobs), always use the primary.
+    """
+
+    def is_routed(self, model):
+        return bool(settings.DATABASE_REPLICAS) and model._meta.app_label in settings.DATABASE_REPLICA_APPS
+
+    def db_for_read(self, model, **hints):
+        if not self.is_routed(model):
+            return None
+        state = _routing_state.get()
+        if state is None or state.pinned or connections[DEFAULT_DB_ALIAS].in_atomic_block:
+            return DEFAULT_DB_ALIAS
+        return random.choice(settings.DATABASE_REPLICAS)
+
+    def db_for_write(self, model, **hints):
+        if not self.is_routed(model):
+            return None
+        state = _routing_state.get()
+        if state is not None:
+            state.wrote = True
+        return DEFAULT_DB_ALIAS
+
+    def allow_relation(self, obj1, obj2, **hints):
+        databases = {DEFAULT_DB_ALIAS, *settings.DATABASE_REPLICAS}
+        if obj1._state.db in databases and obj2._state.db in databases:
+            return True
+        return None
+
+    def allow_migrate(self, db, app_label, model_name=None, **hints):
+        if db in settings.DATABASE_REPLICAS:
+            return False
+        return None
+
+
+class ReplicaRoutingMiddleware:
+    """
+    Track writes made while handling a request for ReplicaRouter, and pin
+    the user to the primary afterwards.
+    """
+
+    sync_capable = True
+    async_capable = True
+
+    def __init__(self, get_response):
+        self.get_response = get_response
+        if iscoroutinefunction(get_response):
+            markcoroutinefunction(self)
+
+    def __call__(self, request):
+        if iscoroutinefunction(self):
+            return self.__acall__(request)
+        state = RoutingState(request)
+        token = _routing_state.set(state)
+        try:
+            response = self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        self.pin(request, state)
+        return response
+
+    async def __acall__(self, request):
+        state = RoutingState(request)
+        token = _routing_state.set(state)
+        try:
+            response = await self.get_response(request)
+        finally:
+            _routing_state.reset(token)
+        await sync_to_async(self.pin)(request, state)
+        return response
+
+    def pin(self, request, state):
+        if state.wrote and settings.DATABASE_REPLICAS:
+            user_id = get_request_user_id(request)
+            if user_id is not None:
+                cache.set(pin_cache_key(user_id), True, settings.DATABASE_READ_YOUR_WRITES_WINDOW)
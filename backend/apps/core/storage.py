@@ -0,0 +1,121 @@
+import gzip
+import hashlib
+import os
+
+from django.contrib.staticfiles.storage import ManifestStaticFilesStorage
+from django.core.files.base import ContentFile
+from django.core.files.storage import FileSystemStorage
+
+try:
+    import brotli
+except ImportError:
+    brotli = None
+
+# Variants written next to each file at collectstatic time, keyed by the
+# Content-Encoding they are served with.
+PRECOMPRESSED_SUFFIXES = {'br': '.br', 'gzip': '.gz'}
+
+
+class CompressedManifestStaticFilesStorage(ManifestStaticFilesStorage):
+    """
+    ManifestStaticFilesStorage that also writes .gz (and, when brotli is
+    installed, .br) copies of every compressible file during collectstatic,
+    for StaticFilesMiddleware to serve.
+    """
+    # Fall back to unhashed names rather than erroring on a missing manifest
+    # entry, e.g. when collectstatic has not been run in development.
+    manifest_strict = False
+    compressible_extensions = (
+        '.css', '.js', '.map', '.json', '.svg', '.html', '.txt', '.xml', '.ico', '.ttf', '.eot', '.otf',
+    )
+    # Don't keep a compressed copy unless it saves at least this fraction.
+    min_saving = 0.05
+
+    def post_process(self, paths, dry_run=False, **options):
+        processed_names = set()
+        for name, hashed_name, processed in super().post_process(paths, dry_run, **options):
+            if not isinstance(processed, Exception):
+                processed_names.update(n for n in (name, hashed_name) if n)
+            yield name, hashed_name, processed
+
+        if dry_run:
+            return
+        for name in sorted(processed_names):
+            if name.endswith(self.compressible_extensions) and self.exists(name):
+                for compressed_name in self.compress(name):
+                    yield name, compressed_name, True
+
+    def compress(self, name):
+        with self.open(name) as original:
+            content = original.read()
+
+        variants = {'gzip': gzip.compress(content, compresslevel=9, mtime=0)}
+        if brotli is not None:
+            variants['br'] = brotli.compress(content, quality=11)
+
+        for encoding, compressed in variants.items():
+            compressed_name = name + PRECOMPRESSED_SUFFIXES[encoding]
+            if self.exists(compressed_name):
+                self.delete(compressed_name)
+            if len(compressed) <= len(content) * (1 - self.min_saving):
+                self._save(compressed_name, ContentFile(compressed))
+                yield compressed_name
+
+
+def precompressed_variants(path):
+    """Return {encoding: path} for the precompressed copies of `path` that exist."""
+    return {
+        encoding: path + suffix
+        for encoding, suffix in PRECOMPRESSED_SUFFIXES.items()
+        if os.path.isfile(path + suffix)
+    }
+
+
+class ContentAddressedStorage(FileSystemStorage):
+    """
+    FileSystemStorage that names each file after the SHA-256 of its
+    content, as <hash[:2]>/<hash><extension>. Content that is already
+    stored isn't written again, so identical files are kept once. A name
+    always means the same bytes, so files can be cached forever; see
+    ContentAddressedFilesMiddleware.
+
+    Files can be shared, so only delete them once nothing refers to them.
+    """
+
+    def __init__(self, **kwargs):
+        # Two saves of a name always write the same bytes.
+        kwargs.setdefault('allow_overwrite', True)
+        super().__init__(**kwargs)
+
+    def content_name(self, name, content):
+        """The name `content`, uploaded as `name`, is stored under."""
+        digest = hashlib.sha256()
+        for chunk in content.chunks():
+            digest.update(chunk)
+        digest = digest.hexdigest()
+        return f'{digest[:2]}/{digest}{os.path.splitext(name)[1].lower()}'
+
+    def save(self, name, content, max_length=None):
+        name = self.content_name(name, content)
+        if self.exists(name):
+            return name
+        return super().save(name, content, max_length)
+
+    def variant_name(self, name, variant):
+        """
+        The name for a file derived from the stored file `name` (e.g. a
+        thumbnail): <name without extension>-<variant>.
+        """
+        return f'{os.path.splitext(name)[0]}-{variant}'
+
+    def save_variant(self, name, variant, content):
+        return super().save(self.variant_name(name, variant), content)
+
+    def delete_with_variants(self, name):
+        directory, filename = os.path.split(name)
+        prefix = os.path.splitext(filename)[0] + '-'
+        if self.exists(directory):
+            for variant in self.listdir(directory)[1]:
+                if variant.startswith(prefix):
+                    self.delete(os.path.join(directory, variant))
+        self.delete(name)
@@ -0,0 +1,44 @@
+"""
+In-process background tasks.
+
+run_in_background() runs a function on a small thread pool once the
+current transaction commits, so the task sees what the request wrote. The
+pool lives in each web process: queued tasks are lost if the process
+exits, and callers keep their own state (e.g. a status column) to detect
+and re-run those. With BACKGROUND_TASKS_EAGER, tasks run inline instead,
+which is what tests want.
+"""
+import logging
+from concurrent.futures import ThreadPoolExecutor
+from functools import lru_cache
+
+from django.conf import settings
+from django.db import close_old_connections, connections, transaction
+
+logger = logging.getLogger(__name__)
+
+
+@lru_cache(maxsize=None)
+def get_executor():
+    return ThreadPoolExecutor(max_workers=settings.BACKGROUND_TASK_WORKERS, thread_name_prefix='background-task')
+
+
+def run_task(func, *args, **kwargs):
+    close_old_connections()
+    try:
+        func(*args, **kwargs)
+    except Exception:
+        logger.exception('Background task %s failed', getattr(func, '__qualname__', func))
+    finally:
+        # Pool threads are reused; don't leave a connection open per thread.
+        connections.close_all()
+
+
+def run_in_background(func, *args, **kwargs):
+    """Call func(*args, **kwargs) on the background pool after the current transaction commits."""
+    def submit():
+        if settings.BACKGROUND_TASKS_EAGER:
+            func(*args, **kwargs)
+        else:
+            get_executor().submit(run_task, func, *args, **kwargs)
+    transaction.on_commit(submit)
@@ -0,0 +1,994 @@
+import datetime
+import decimal
+import gzip
+import io
+import json
+import logging
+import os
+import shutil
+import threading
+import tempfile
+import uuid
+import zlib
+from collections import Counter
+from sys import exc_info as sys_exc_info
+from unittest import mock, skipIf
+
+from django.conf import settings
+from django.contrib.admin import ModelAdmin
+from django.contrib.auth import get_user_model
+from django.contrib.auth.models import Permission
+from django.contrib.sessions.models import Session
+from django.core import mail
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from django.core.signals import request_finished, request_started
+from django.db import close_old_connections, connection, transaction
+from django.http import HttpResponse, StreamingHttpResponse
+from django.test import RequestFactory, SimpleTestCase, TestCase, TransactionTestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import URLResolver, get_resolver, resolve, reverse
+from django.utils import timezone
+from django.utils.translation import gettext_lazy
+from rest_framework import parsers, renderers
+from rest_framework.exceptions import ErrorDetail, ParseError
+from rest_framework.test import APIClient
+from rest_framework.utils.serializer_helpers import ReturnDict, ReturnList
+from rest_framework_simplejwt.tokens import AccessToken
+
+from apps.JobApplication.models import JobApplication
+from apps.users.views import UserProfileView
+
+from . import batch
+from .admin import EstimatedCountPaginator, estimate_count
+from .budgets import (
+    BudgetReport,
+    QueryBudget,
+    QueryBudgetExceeded,
+    QueryBudgetMiddleware,
+    budget_report,
+    get_query_budget,
+)
+from .events import Event, LocalBroker
+from .handlers import PathScopedWSGIHandler
+from .idempotency import IdempotencyMiddleware
+from .log import BoundedQueueHandler, JSONFormatter, RequestContextFilter
+from .models import ProfileRecord
+from .middleware import CompressionMiddleware, StaticFilesMiddleware, compression_exempt, select_encoding
+from .parsers import JSONParser
+from .profiling import make_profiling_token, render_flamegraph
+from .renderers import JSONRenderer, orjson
+from .routers import ReplicaRouter, ReplicaRoutingMiddleware
+from .storage import CompressedManifestStaticFilesStorage
+from .tasks import run_in_background
+
+
+@skipIf(orjson is None, "orjson is not installed")
+class JSONRendererCompatibilityTests(SimpleTestCase):
+    payloads = [
+        None,
+        {},
+        [],
+        {"status": True, "message": "", "data": {}},
+        {"unicode": "café ünïcødé 😀", "control": "\x00\x1f\x7f", "html": "</script>&"},
+        {"separators": "line paragraph "},
+        {"date_applied": datetime.date(2025, 4, 6)},
+        {"created_at": datetime.datetime(2025, 4, 6, 18, 17, 5, 123456, tzinfo=datetime.timezone.utc)},
+        {"created_at": datetime.datetime(2025, 4, 6, 18, 17, tzinfo=datetime.timezone(datetime.timedelta(hours=3)))},
+        {"naive": datetime.datetime(2025, 4, 6, 18, 17), "time": datetime.time(9, 30, 1, 5)},
+        {"duration": datetime.timedelta(days=1, seconds=5), "amount": decimal.Decimal("1.10")},
+        {"id": uuid.UUID("12345678-1234-5678-1234-567812345678"), "raw": b"bytes"},
+        {"lazy": gettext_lazy("This field is required."), "error": [ErrorDetail("Invalid", code="invalid")]},
+        {1: "int key", None: "none key"},
+        {"big": 2 ** 70, "negative": -(2 ** 63)},
+        {"floats": [0.1, 2.5, -3.25, 123456789.123]},
+        {"nested": [{"a": [1, [2, [3, {"b": None}]]]}], "tuple": (1, 2), "set": {3}},
+    ]
+
+    def assertCompatible(self, data, accepted_media_type=None, renderer_context=None):
+        expected = renderers.JSONRenderer().render(data, accepted_media_type, renderer_context)
+        actual = JSONRenderer().render(data, accepted_media_type, renderer_context)
+        self.assertEqual(actual, expected)
+
+    def test_payloads_match_drf_renderer(self):
+        for data in self.payloads:
+            with self.subTest(data=data):
+                self.assertCompatible(data)
+
+    def test_return_list_and_dict(self):
+        row = ReturnDict(
+            [("id", 1), ("job_post", "Analyst"), ("date_applied", "2025-04-06")],
+            serializer=None,
+        )
+        self.assertCompatible(ReturnList([row, row], serializer=None))
+        self.assertCompatible({"status": True, "message": "ok", "data": row})
+
+    def test_serialized_job_applications(self):
+        from apps.JobApplication.models import JobApplication
+        from apps.JobApplication.serializers import JobApplicationSerializer
+
+        now = timezone.now()
+        applications = [
+            JobApplication(
+                id=i,
+                job_post="Analyst ✓",
+                applied=True,
+                date_applied=datetime.date(2025, 4, i + 1),
+                created_at=now,
+                updated_at=now,
+            )
+            for i in range(3)
+        ]
+        data = JobApplicationSerializer(applications, many=True).data
+        self.assertCompatible({"status": True, "message": "ok", "data": data})
+
+    def test_indent_falls_back_to_stdlib(self):
+        self.assertCompatible({"a": [1, 2]}, "application/json; indent=4")
+        self.assertCompatible({"a": [1, 2]}, None, {"indent": 2})
+
+
+@skipIf(orjson is None, "orjson is not installed")
+class JSONParserCompatibilityTests(SimpleTestCase):
+    def parse(self, parser, body, encoding="utf-8"):
+        return parser.parse(io.BytesIO(body), parser_context={"encoding": encoding})
+
+    def test_matches_drf_parser(self):
+        body = '{"job_post": "Analyst ✓", "applied": true, "ids": [1, 2.5, null]}'.encode()
+        self.assertEqual(
+            self.parse(JSONParser(), body),
+            self.parse(parsers.JSONParser(), body),
+        )
+
+    def test_non_utf8_encoding_falls_back_to_stdlib(self):
+        body = '{"job_post": "Analyst é"}'.encode("latin-1")
+        self.assertEqual(self.parse(JSONParser(), body, "latin-1"), {"job_post": "Analyst é"})
+
+    def test_invalid_json_raises_parse_error(self):
+        for body in (b"", b"{", b'{"a": NaN}'):
+            with self.subTest(body=body), self.assertRaises(ParseError):
+                self.parse(JSONParser(), body)
+
+
+class CompressionMiddlewareTests(SimpleTestCase):
+    factory = RequestFactory()
+    body = b'{"job_description": "' + b'Monitor SIEM alerts. ' * 200 + b'"}'
+
+    def get_response(self, request, response=None, view=None):
+        middleware = CompressionMiddleware(lambda request: response)
+        if view is not None:
+            middleware.process_view(request, view, (), {})
+        return middleware(request)
+
+    def json_response(self, body=None):
+        return HttpResponse(body or self.body, content_type='application/json')
+
+    def test_gzip(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip, deflate')
+        response = self.get_response(request, self.json_response())
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Vary'], 'Accept-Encoding')
+        self.assertEqual(gzip.decompress(response.content), self.body)
+
+    def test_server_preference_and_qvalues(self):
+        self.assertEqual(select_encoding('gzip;q=0.5, identity', ['br', 'gzip']), 'gzip')
+        self.assertEqual(select_encoding('gzip;q=0', ['gzip']), None)
+        self.assertEqual(select_encoding('*', ['gzip']), 'gzip')
+        self.assertEqual(select_encoding('', ['gzip']), None)
+        self.assertEqual(select_encoding('gzip, br', ['br', 'gzip']), 'br')
+
+    def test_small_and_incompressible_responses_are_untouched(self):
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.get_response(request, self.json_response(b'{}'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+        response = self.get_response(request, HttpResponse(self.body, content_type='image/png'))
+        self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_compression_exempt_view(self):
+        @compression_exempt
+        def view(request):
+            pass
+
+        @compression_exempt
+        class View:
+            pass
+
+        class_view = lambda request: None  # noqa: E731
+        class_view.cls = View
+        for exempt in (view, class_view):
+            request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+            response = self.get_response(request, self.json_response(), view=exempt)
+            self.assertFalse(response.has_header('Content-Encoding'))
+
+    def test_streaming_response_is_compressed_incrementally(self):
+        chunks = [b'data: %d\n\n' % i * 50 for i in range(5)]
+        consumed = []
+
+        def stream():
+            for chunk in chunks:
+                consumed.append(chunk)
+                yield chunk
+
+        request = self.factory.get('/', HTTP_ACCEPT_ENCODING='gzip')
+        response = self.get_response(
+            request, StreamingHttpResponse(stream(), content_type='text/event-stream')
+        )
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        decompressor = zlib.decompressobj(16 + zlib.MAX_WBITS)
+        output = b''
+        for i, data in enumerate(response.streaming_content):
+            output += decompressor.decompress(data)
+            # Each chunk is flushed as soon as it has been produced.
+            if i < len(chunks):
+                self.assertEqual(output, b''.join(consumed))
+        self.assertEqual(output, b''.join(chunks))
+
+
+class StaticFilesMiddlewareTests(SimpleTestCase):
+    factory = RequestFactory()
+    content = b'body { color: #333; }\n' * 100
+
+    def setUp(self):
+        self.root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, self.root)
+        os.makedirs(os.path.join(self.root, 'admin/css'))
+        self.storage = CompressedManifestStaticFilesStorage(location=self.root)
+        self.storage.save('admin/css/base.css', ContentFile(self.content))
+        list(self.storage.post_process({'admin/css/base.css': (self.storage, 'admin/css/base.css')}))
+        self.hashed_name = self.storage.stored_name('admin/css/base.css')
+
+    def get(self, name, **extra):
+        with override_settings(STATIC_ROOT=self.root, STATIC_URL='/static/'):
+            middleware = StaticFilesMiddleware(lambda request: HttpResponse(status=404))
+            middleware.immutable_names = set(self.storage.hashed_files.values())
+            return middleware(self.factory.get('/static/' + name, **extra))
+
+    def test_collectstatic_writes_compressed_variants(self):
+        self.assertTrue(self.storage.exists(self.hashed_name + '.gz'))
+        with self.storage.open(self.hashed_name + '.gz') as f:
+            self.assertEqual(gzip.decompress(f.read()), self.content)
+
+    def test_serves_precompressed_variant_with_immutable_caching(self):
+        response = self.get(self.hashed_name, HTTP_ACCEPT_ENCODING='gzip')
+        self.assertEqual(response['Content-Encoding'], 'gzip')
+        self.assertEqual(response['Content-Type'], 'text/css')
+        self.assertIn('immutable', response['Cache-Control'])
+        self.assertEqual(gzip.decompress(b''.join(response.streaming_content)), self.content)
+        response.close()
+
+    def test_unhashed_name_is_not_immutable(self):
+        response = self.get('admin/css/base.css')
+        self.assertFalse(response.has_header('Content-Encoding'))
+        self.assertNotIn('immutable', response['Cache-Control'])
+        self.assertEqual(b''.join(response.streaming_content), self.content)
+        response.close()
+
+    def test_missing_files_fall_through(self):
+        self.assertEqual(self.get('admin/css/missing.css').status_code, 404)
+        self.assertEqual(self.get('../outside.css').status_code, 404)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class PathScopedHandlerTests(TestCase):
+    factory = RequestFactory()
+
+    def setUp(self):
+        self.handler = PathScopedWSGIHandler()
+
+    def call(self, request):
+        """Run `request` through the handler's WSGI interface; (status, headers, body)."""
+        # As the test client does: closing the connection would end the test's transaction.
+        for signal in (request_started, request_finished):
+            signal.disconnect(close_old_connections)
+            self.addCleanup(signal.connect, close_old_connections)
+        started = []
+        body = b''.join(self.handler(request.environ, lambda status, headers: started.append((status, headers))))
+        status, headers = started[0]
+        return status, dict(headers), body
+
+    def test_authenticated_api_round_trip(self):
+        user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        request = self.factory.get('/api/users/profile/', HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        status, headers, body = self.call(request)
+        self.assertEqual(status, '200 OK')
+        self.assertEqual(json.loads(body)['data']['username'], 'analyst')
+        self.assertIn('X-Request-ID', headers)
+        self.assertNotIn('Set-Cookie', headers)
+
+    def test_api_requests_skip_stateful_middleware(self):
+        request = self.factory.get('/api/users/profile/')
+        response = self.handler.get_response(request)
+        self.assertEqual(response.status_code, 401)
+        self.assertFalse(hasattr(request, 'session'))
+        self.assertFalse(hasattr(request, '_messages'))
+        self.assertNotIn('Cookie', response.get('Vary', ''))
+
+    def test_other_requests_run_full_chain(self):
+        request = self.factory.get('/admin/')
+        response = self.handler.get_response(request)
+        self.assertEqual(response.status_code, 302)
+        self.assertTrue(hasattr(request, 'session'))
+        self.assertTrue(hasattr(request, '_messages'))
+        self.assertTrue(request.user.is_anonymous)
+
+    def test_stateless_chain(self):
+        paths = self.handler.stateless_handler.get_middleware_paths()
+        self.assertIn('django.middleware.security.SecurityMiddleware', paths)
+        for path in settings.STATELESS_EXCLUDED_MIDDLEWARE:
+            self.assertNotIn(path, paths)
+
+
+@override_settings(DATABASE_REPLICAS=['replica1'])
+class ReplicaRouterTests(TransactionTestCase):
+    factory = RequestFactory()
+    router = ReplicaRouter()
+
+    def setUp(self):
+        cache.clear()
+        self.user = get_user_model()(pk=42)
+
+    def bearer_request(self):
+        token = AccessToken.for_user(self.user)
+        return self.factory.get('/api/users/profile/', HTTP_AUTHORIZATION=f'Bearer {token}')
+
+    def handle(self, request, view):
+        """Run `view` inside ReplicaRoutingMiddleware and return what it returns."""
+        result = {}
+
+        def get_response(request):
+            result['value'] = view()
+            return HttpResponse()
+
+        ReplicaRoutingMiddleware(get_response)(request)
+        return result['value']
+
+    def test_reads_outside_requests_use_primary(self):
+        self.assertEqual(self.router.db_for_read(JobApplication), 'default')
+
+    def test_reads_in_requests_use_replica(self):
+        self.assertEqual(self.handle(self.bearer_request(), lambda: self.router.db_for_read(JobApplication)), 'replica1')
+
+    def test_unrouted_apps_are_left_alone(self):
+        self.assertIsNone(self.handle(self.bearer_request(), lambda: self.router.db_for_read(Session)))
+        self.assertIsNone(self.router.db_for_write(Session))
+
+    @override_settings(DATABASE_REPLICAS=[])
+    def test_no_replicas_configured(self):
+        self.assertIsNone(self.handle(self.bearer_request(), lambda: self.router.db_for_read(JobApplication)))
+
+    def test_reads_in_transactions_use_primary(self):
+        def view():
+            with transaction.atomic():
+                return self.router.db_for_read(JobApplication)
+
+        self.assertEqual(self.handle(self.bearer_request(), view), 'default')
+
+    def test_read_your_writes(self):
+        def write_then_read():
+            self.assertEqual(self.router.db_for_write(JobApplication), 'default')
+            return self.router.db_for_read(JobApplication)
+
+        self.assertEqual(self.handle(self.bearer_request(), write_then_read), 'default')
+        # The user's next requests stay on the primary until the pin expires.
+        self.assertEqual(self.handle(self.bearer_request(), lambda: self.router.db_for_read(JobApplication)), 'default')
+        anonymous = self.factory.get('/api/users/profile/')
+        self.assertEqual(self.handle(anonymous, lambda: self.router.db_for_read(JobApplication)), 'replica1')
+        cache.clear()
+        self.assertEqual(self.handle(self.bearer_request(), lambda: self.router.db_for_read(JobApplication)), 'replica1')
+
+    def test_migrations_only_run_on_primary(self):
+        self.assertFalse(self.router.allow_migrate('replica1', 'JobApplication'))
+        self.assertIsNone(self.router.allow_migrate('default', 'JobApplication'))
+
+
+@override_settings(EVENT_STREAM_BUFFER_SIZE=2)
+class LocalBrokerTests(SimpleTestCase):
+    async def test_fan_out_and_overflow(self):
+        broker = LocalBroker()
+        with broker.subscribe('a') as first, broker.subscribe('a') as second, broker.subscribe('b') as other:
+            broker.publish('a', Event(1, 'create', '{}'))
+            self.assertEqual(await first.get(1), Event(1, 'create', '{}'))
+            self.assertEqual(await second.get(1), Event(1, 'create', '{}'))
+            self.assertIsNone(await other.get(0.01))
+
+            for event_id in range(2, 6):
+                broker.publish('a', Event(event_id, 'update', '{}'))
+            self.assertEqual([(await first.get(1)).id, (await first.get(1)).id], [2, 3])
+            # Buffer full: the subscriber is dropped once drained and must resume.
+            self.assertIsNone(await first.get(1))
+            self.assertTrue(first.overflowed)
+        self.assertEqual(broker._subscriptions, {})
+
+    def test_event_encoding(self):
+        self.assertEqual(Event(7, 'delete', '{"id":3}').encode(), b'id: 7\nevent: delete\ndata: {"id":3}\n\n')
+        self.assertEqual(Event(None, 'reset', '{}').encode(), b'event: reset\ndata: {}\n\n')
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    ADMIN_EXACT_COUNT_LIMIT=3,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class LargeTableAdminTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='x', email_verified=True
+        )
+        JobApplication.objects.bulk_create(
+            JobApplication(user=cls.admin, job_post=f"Analyst {i}", applied=i % 2 == 0) for i in range(5)
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client.force_login(self.admin)
+
+    def test_paginator_counts_exactly_without_an_estimate(self):
+        queryset = JobApplication.objects.all()
+        self.assertIsNone(estimate_count(queryset))
+        self.assertEqual(EstimatedCountPaginator(queryset, 2).count, 5)
+        self.assertEqual(EstimatedCountPaginator(queryset.filter(applied=False), 2).count, 2)
+
+    def test_changelist_caches_facets_and_skips_full_count(self):
+        url = '/admin/JobApplication/jobapplication/?_facets=1'
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertIsNone(response.context['cl'].full_result_count)
+        with CaptureQueriesContext(connection) as first:
+            self.client.get(url)
+        cache.clear()
+        with CaptureQueriesContext(connection) as uncached:
+            self.client.get(url)
+        # The facet aggregates (one per list_filter) come from the cache.
+        self.assertEqual(len(uncached) - len(first), 4)
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    PROFILING_MAX_RECORDS=2,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class ProfilingTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.staff = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='x', email_verified=True
+        )
+        cls.analyst = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+
+    def setUp(self):
+        media_root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, media_root)
+        self.enterContext(override_settings(MEDIA_ROOT=media_root))
+
+    def test_requests_without_a_valid_token_are_not_profiled(self):
+        for headers in ({}, {'X-Profile-Token': 'forged'}, {'X-Profile-Token': make_profiling_token(self.analyst)}):
+            response = self.client.get('/api/users/profile/', headers=headers)
+            self.assertEqual(response.status_code, 401)
+            self.assertFalse(response.has_header('X-Profile-Id'))
+        self.assertFalse(ProfileRecord.objects.exists())
+
+    def test_profile_is_stored_and_viewable_in_admin(self):
+        token = make_profiling_token(self.staff)
+        response = self.client.get('/api/users/profile/', headers={'X-Profile-Token': token})
+        record = ProfileRecord.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual((record.method, record.path, record.status_code), ('GET', '/api/users/profile/', 401))
+        self.assertTrue(record.flamegraph.read().startswith(b'<svg'))
+
+        self.client.force_login(self.staff)
+        response = self.client.get(f'/admin/core/profilerecord/{record.pk}/change/')
+        self.assertContains(response, f'/admin/core/profilerecord/{record.pk}/flamegraph/')
+        response = self.client.get(f'/admin/core/profilerecord/{record.pk}/flamegraph/')
+        self.assertEqual(response['Content-Type'], 'image/svg+xml')
+        response.close()
+        self.assertContains(self.client.get('/admin/core/profilerecord/token/'), 'X-Profile-Token')
+
+    def test_tokens_need_change_permission(self):
+        staff = get_user_model().objects.create_user(
+            username='staff', email='staff@example.com', is_staff=True, email_verified=True
+        )
+        staff.user_permissions.add(Permission.objects.get(codename='view_profilerecord'))
+        self.client.force_login(staff)
+        self.assertNotContains(self.client.get('/admin/core/profilerecord/'), 'Issue profiling token')
+        self.assertEqual(self.client.get('/admin/core/profilerecord/token/').status_code, 403)
+
+        staff.user_permissions.add(Permission.objects.get(codename='change_profilerecord'))
+        response = self.client.get('/admin/core/profilerecord/token/', HTTP_ACCEPT_ENCODING='gzip')
+        self.assertContains(response, 'X-Profile-Token')
+        self.assertNotIn('Content-Encoding', response)
+
+    def test_store_is_bounded(self):
+        for _ in range(3):
+            self.client.get(f'/api/users/profile/?_profile={make_profiling_token(self.staff)}')
+        self.assertEqual(ProfileRecord.objects.count(), 2)
+
+    def test_credentials_in_the_query_string_are_not_stored(self):
+        token = make_profiling_token(self.staff)
+        response = self.client.get(f'/api/users/profile/?page=2&_profile={token}&access_token=jwt')
+        record = ProfileRecord.objects.get(pk=response['X-Profile-Id'])
+        self.assertEqual(record.path, '/api/users/profile/?page=2')
+        flamegraph = record.flamegraph.read()
+        self.assertIn(b'GET /api/users/profile/?page=2 ', flamegraph)
+        self.assertNotIn(token.encode(), flamegraph)
+        self.assertNotIn(b'jwt', flamegraph)
+
+    def test_flamegraph_escapes_frame_names(self):
+        svg = render_flamegraph(Counter({('main (app.py:1)', '<lambda> (app.py:2)'): 3}), 'GET /?a=<b>')
+        self.assertIn('&lt;lambda&gt;', svg)
+        self.assertNotIn('<lambda>', svg)
+        self.assertIn('3 samples', svg)
+
+
+def iter_url_patterns(patterns, prefix=''):
+    for pattern in patterns:
+        if isinstance(pattern, URLResolver):
+            yield from iter_url_patterns(pattern.url_patterns, prefix + str(pattern.pattern))
+        else:
+            yield prefix + str(pattern.pattern), pattern.callback
+
+
+@override_settings(
+    SECURE_SSL_REDIRECT=False,
+    STORAGES={**settings.STORAGES, 'staticfiles': {'BACKEND': 'django.contrib.staticfiles.storage.StaticFilesStorage'}},
+)
+class QueryBudgetTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.admin = get_user_model().objects.create_superuser(
+            username='admin', email='admin@example.com', password='x', email_verified=True
+        )
+        cls.application = JobApplication.objects.create(user=cls.admin, job_post="Analyst")
+
+    def test_every_endpoint_has_a_budget(self):
+        for route, callback in iter_url_patterns(get_resolver().url_patterns):
+            owner = getattr(callback, 'model_admin', None) or getattr(getattr(callback, '__wrapped__', None), '__self__', None)
+            if route.startswith('admin/') and not (
+                isinstance(owner, ModelAdmin) and type(owner).__module__.startswith('apps.')
+            ):
+                # The admin site's own pages and third-party ModelAdmins.
+                continue
+            view_class = getattr(callback, 'cls', None) or getattr(callback, 'view_class', None)
+            if getattr(callback, 'actions', None):
+                methods = list(callback.actions)
+            elif view_class is not None and owner is None:
+                methods = [method for method in view_class.http_method_names
+                           if method != 'options' and hasattr(view_class, method)]
+            else:
+                methods = ['get']
+            for method in methods:
+                with self.subTest(route=route, method=method):
+                    self.assertIsInstance(get_query_budget(callback, method), QueryBudget)
+
+    def test_action_budget_is_looked_up_by_method(self):
+        view_func = resolve(f'/api/job-applications/job-applications/{self.application.pk}/').func
+        self.assertEqual(get_query_budget(view_func, 'GET'), view_func.cls.retrieve.query_budget)
+        self.assertEqual(get_query_budget(view_func, 'DELETE'), view_func.cls.destroy.query_budget)
+
+    def over_budget(self, mode):
+        def view(request):
+            list(get_user_model().objects.all())
+            list(JobApplication.objects.all())
+            return HttpResponse()
+        view.query_budget = QueryBudget(1, None)
+
+        request = RequestFactory().get('/api/users/profile/')
+        request.resolver_match = resolve('/api/users/profile/')
+        middleware = QueryBudgetMiddleware(lambda request: middleware.process_view(request, view, (), {}) or view(request))
+        with override_settings(QUERY_BUDGET_MODE=mode):
+            return middleware(request)
+
+    def test_over_budget_raises_or_warns(self):
+        with self.assertRaisesMessage(QueryBudgetExceeded, 'GET user-profile ran 2 queries'):
+            self.over_budget('raise')
+        with self.assertLogs('apps.core.budgets', 'WARNING'):
+            self.assertEqual(self.over_budget('warn').status_code, 200)
+        with self.assertNoLogs('apps.core.budgets'):
+            self.over_budget('off')
+
+    def test_report_keeps_the_request_closest_to_its_budget(self):
+        report = BudgetReport()
+        report.record('POST batch', QueryBudget(20, None), 15, 40.0)
+        report.record('POST batch', QueryBudget(6, 10), 5, 1.0)
+        report.record('POST batch', QueryBudget(6, 10), 2, 9.0)
+        entry = report.endpoints['POST batch']
+        self.assertEqual(entry['requests'], 3)
+        self.assertEqual((entry['queries'], entry['budget']), (5, QueryBudget(6, 10)))
+        self.assertEqual((entry['time_ms'], entry['time_budget']), (40.0, QueryBudget(20, None)))
+        self.assertIn('"time_budget": {', report.as_json())
+
+    def test_report_records_admin_pages(self):
+        self.client.force_login(self.admin)
+        for url in (
+            '/admin/JobApplication/jobapplication/',
+            '/admin/JobApplication/jobapplication/add/',
+            f'/admin/JobApplication/jobapplication/{self.application.pk}/change/',
+            '/admin/JobApplication/archivedjobapplication/',
+            '/admin/users/user/',
+            f'/admin/users/user/{self.admin.pk}/change/',
+            '/admin/core/profilerecord/',
+        ):
+            self.assertEqual(self.client.get(url).status_code, 200)
+        entry = budget_report.endpoints['GET admin:users_user_change']
+        self.assertEqual(entry['budget'], QueryBudget(12, 500))
+        self.assertGreater(entry['queries'], 0)
+
+
+class BackgroundTaskTests(TestCase):
+    def test_runs_on_the_pool_after_commit(self):
+        done = threading.Event()
+        threads = []
+
+        def task(value):
+            threads.append((threading.current_thread().name, value))
+            done.set()
+
+        with self.captureOnCommitCallbacks(execute=True) as callbacks:
+            run_in_background(task, 1)
+            self.assertEqual(threads, [])
+        self.assertEqual(len(callbacks), 1)
+        self.assertTrue(done.wait(5))
+        self.assertTrue(threads[0][0].startswith('background-task'))
+        self.assertEqual(threads[0][1], 1)
+
+    @override_settings(BACKGROUND_TASKS_EAGER=True)
+    def test_eager(self):
+        calls = []
+        with self.captureOnCommitCallbacks(execute=True):
+            run_in_background(calls.append, 1)
+        self.assertEqual(calls, [1])
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, IDEMPOTENCY_WAIT=0)
+class IdempotencyTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+
+    def setUp(self):
+        cache.clear()
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        self.url = reverse('job-application-list')
+
+    def create(self, key, job_post='Analyst'):
+        return self.client.post(self.url, {'job_post': job_post}, format='json', HTTP_IDEMPOTENCY_KEY=key)
+
+    def test_retry_replays_the_first_response(self):
+        first = self.create('key-1')
+        self.assertEqual(first.status_code, 201)
+        with self.assertNumQueries(0):
+            retry = self.create('key-1')
+        self.assertEqual(retry.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(retry['Idempotent-Replayed'], 'true')
+        self.assertEqual(JobApplication.objects.count(), 1)
+
+        self.assertEqual(self.create('key-2').status_code, 201)
+        self.assertEqual(self.create('').status_code, 201)
+        self.assertEqual(JobApplication.objects.count(), 3)
+
+    def test_keys_are_scoped_per_user(self):
+        self.create('key-1')
+        other = get_user_model().objects.create_user(
+            username='other', email='other@example.com', password='x', email_verified=True
+        )
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(other)}')
+        response = self.create('key-1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        self.assertEqual(JobApplication.objects.filter(user=other).count(), 1)
+
+    def test_key_reused_for_a_different_request(self):
+        self.create('key-1')
+        self.assertEqual(self.create('key-1', job_post='Engineer').status_code, 422)
+        self.assertEqual(JobApplication.objects.count(), 1)
+
+    def test_concurrent_duplicate_is_rejected(self):
+        request = RequestFactory().post(self.url, b'{}', content_type='application/json', HTTP_IDEMPOTENCY_KEY='k')
+        view_func = resolve(self.url).func
+        first = IdempotencyMiddleware(lambda request: HttpResponse())
+        self.assertIsNone(first.process_view(request, view_func, (), {}))
+
+        duplicate = RequestFactory().post(self.url, b'{}', content_type='application/json', HTTP_IDEMPOTENCY_KEY='k')
+        self.assertEqual(first.process_view(duplicate, view_func, (), {}).status_code, 409)
+
+        first.process_response(request, HttpResponse(b'done', status=201))
+        replay = first.process_view(duplicate, view_func, (), {})
+        self.assertEqual((replay.status_code, replay.content), (201, b'done'))
+
+    def test_duplicate_is_replayed_when_the_first_finishes_before_its_lock(self):
+        request = RequestFactory().post(self.url, b'{}', content_type='application/json', HTTP_IDEMPOTENCY_KEY='k')
+        view_func = resolve(self.url).func
+        first = IdempotencyMiddleware(lambda request: HttpResponse())
+        self.assertIsNone(first.process_view(request, view_func, (), {}))
+
+        add = cache.add
+
+        def finish_first_then_add(*args, **kwargs):
+            # The duplicate has just missed the stored response.
+            first.process_response(request, HttpResponse(b'done', status=201))
+            return add(*args, **kwargs)
+
+        duplicate = RequestFactory().post(self.url, b'{}', content_type='application/json', HTTP_IDEMPOTENCY_KEY='k')
+        with mock.patch.object(cache, 'add', side_effect=finish_first_then_add):
+            replay = first.process_view(duplicate, view_func, (), {})
+        self.assertEqual((replay.status_code, replay.content), (201, b'done'))
+        self.assertFalse(hasattr(duplicate, '_idempotency'))
+        # The duplicate's lock was released, so a later retry does not wait.
+        self.assertEqual(first.process_view(duplicate, view_func, (), {}).status_code, 201)
+
+    def test_unmarked_views_and_failures_are_not_stored(self):
+        application = JobApplication.objects.create(user=self.user, job_post="Analyst")
+        url = reverse('job-application-mark-as-secured', args=[application.pk])
+        self.client.post(url, HTTP_IDEMPOTENCY_KEY='key-1')
+        self.assertNotIn('Idempotent-Replayed', self.client.post(url, HTTP_IDEMPOTENCY_KEY='key-1'))
+
+        self.client.credentials()
+        self.assertEqual(self.create('key-2').status_code, 401)
+        self.assertNotIn('Idempotent-Replayed', self.create('key-2'))
+
+    def test_registration_is_not_repeated(self):
+        self.client.credentials()
+        data = {'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 's3cret-pass'}
+        first = self.client.post(reverse('user-register'), data, HTTP_IDEMPOTENCY_KEY='signup')
+        sent = len(mail.outbox)
+        retry = self.client.post(reverse('user-register'), data, HTTP_IDEMPOTENCY_KEY='signup')
+        self.assertEqual(first.status_code, 201)
+        self.assertEqual(retry.content, first.content)
+        self.assertEqual(len(mail.outbox), sent)
+
+    def test_anonymous_keys_are_scoped_per_client_and_request(self):
+        self.client.credentials()
+        url = reverse('user-register')
+        data = {'username': 'first', 'email': 'first@example.com', 'password': 's3cret-pass'}
+        self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='signup', REMOTE_ADDR='192.0.2.1')
+
+        other = {'username': 'second', 'email': 'second@example.com', 'password': 's3cret-pass'}
+        response = self.client.post(url, other, HTTP_IDEMPOTENCY_KEY='signup', REMOTE_ADDR='192.0.2.1')
+        self.assertNotIn('Idempotent-Replayed', response)
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='signup', REMOTE_ADDR='192.0.2.2')
+        self.assertNotIn('Idempotent-Replayed', response)
+        response = self.client.post(url, data, HTTP_IDEMPOTENCY_KEY='signup', REMOTE_ADDR='192.0.2.1')
+        self.assertEqual(response['Idempotent-Replayed'], 'true')
+        self.assertEqual(get_user_model().objects.filter(username='second').count(), 1)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class BatchTests(TestCase):
+    @classmethod
+    def setUpTestData(cls):
+        cls.user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        cls.applied = JobApplication.objects.create(user=cls.user, job_post="Analyst", applied=True)
+        cls.secured = JobApplication.objects.create(user=cls.user, job_post="Engineer", secured_job=True)
+
+    def setUp(self):
+        self.client = APIClient()
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+
+    def batch(self, *requests):
+        return self.client.post(reverse('api-batch'), {'requests': list(requests)}, format='json')
+
+    def test_dashboard_reads(self):
+        list_url = reverse('job-application-list')
+        response = self.batch(
+            {'method': 'GET', 'path': reverse('user-profile')},
+            {'method': 'GET', 'path': f'{list_url}?applied=true'},
+            {'method': 'GET', 'path': f'{list_url}?secured_job=true'},
+            {'method': 'GET', 'path': reverse('job-application-detail', args=[self.secured.pk])},
+            {'method': 'GET', 'path': '/api/missing/'},
+        )
+        self.assertEqual(response.status_code, 200)
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results], [200, 200, 200, 200, 404])
+        self.assertEqual(results[0]['body']['data']['username'], 'analyst')
+        self.assertEqual([item['job_post'] for item in results[1]['body']['data']], ['Analyst'])
+        self.assertEqual([item['job_post'] for item in results[2]['body']['data']], ['Engineer'])
+        self.assertEqual(results[3]['body']['data']['id'], self.secured.pk)
+
+    def test_authenticates_once(self):
+        with CaptureQueriesContext(connection) as queries:
+            self.batch(
+                {'method': 'GET', 'path': reverse('user-profile')},
+                {'method': 'GET', 'path': reverse('job-application-list')},
+            )
+        user_queries = [query for query in queries if 'FROM "users_user"' in query['sql']]
+        self.assertEqual(len(user_queries), 1)
+
+    def test_writes_run_in_order(self):
+        list_url = reverse('job-application-list')
+        response = self.batch(
+            {'method': 'POST', 'path': list_url, 'body': {'job_post': 'Manager'}},
+            {'method': 'GET', 'path': f'{list_url}?search=Manager'},
+            {'method': 'DELETE', 'path': reverse('job-application-detail', args=[self.applied.pk])},
+            {'method': 'GET', 'path': reverse('job-application-detail', args=[self.applied.pk])},
+        )
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results], [201, 200, 200, 404])
+        self.assertEqual(len(results[1]['body']['data']), 1)
+
+    def test_invalid_batches(self):
+        self.assertEqual(self.batch().status_code, 400)
+        self.assertEqual(self.batch({'method': 'GET', 'path': '/admin/'}).status_code, 400)
+        self.assertEqual(self.batch({'method': 'POST', 'path': reverse('api-batch')}).status_code, 400)
+        with override_settings(BATCH_MAX_REQUESTS=1):
+            self.assertEqual(self.batch(*[{'method': 'GET', 'path': reverse('user-profile')}] * 2).status_code, 400)
+        response = self.batch({'method': 'GET', 'path': reverse('job-application-events')})
+        self.assertEqual(response.json()['data'][0]['status'], 400)
+
+        self.client.credentials()
+        self.assertEqual(self.batch({'method': 'GET', 'path': reverse('user-profile')}).status_code, 401)
+
+    def test_endpoints_returning_credentials_are_rejected(self):
+        response = self.batch(
+            {'method': 'POST', 'path': reverse('token-obtain-pair'), 'body': {'username': 'analyst', 'password': 'x'}},
+            {'method': 'POST', 'path': reverse('user-register'), 'body': {}},
+        )
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results], [400, 400])
+        self.assertNotIn('access', json.dumps(results))
+
+    def test_idempotency_keys_per_sub_request(self):
+        key = uuid.uuid4().hex
+        create = {'method': 'POST', 'path': reverse('job-application-list'), 'body': {'job_post': 'Manager'}}
+        first = self.batch({**create, 'idempotency_key': key}).json()['data'][0]
+        # The batch's own key is not passed on to its sub-requests.
+        second = self.client.post(
+            reverse('api-batch'), {'requests': [{**create, 'idempotency_key': key}, create]},
+            format='json', HTTP_IDEMPOTENCY_KEY=key
+        ).json()['data']
+        self.assertEqual([result['status'] for result in second], [201, 201])
+        self.assertEqual(second[0]['body'], first['body'])
+        self.assertEqual(JobApplication.objects.filter(job_post='Manager').count(), 2)
+
+        changed = self.batch({**create, 'body': {'job_post': 'Director'}, 'idempotency_key': key})
+        self.assertEqual(changed.json()['data'][0]['status'], 422)
+
+
+# Eager background tasks: a title suggestion refresh left running would
+# race the flush after each test.
+@override_settings(SECURE_SSL_REDIRECT=False, BATCH_READ_WORKERS=4, BACKGROUND_TASKS_EAGER=True)
+class ConcurrentBatchTests(TransactionTestCase):
+    def test_reads_run_on_the_pool(self):
+        user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        JobApplication.objects.create(user=user, job_post="Analyst")
+        threads = []
+
+        def run_subrequest(request, sub_request):
+            threads.append(threading.current_thread().name)
+            return original(request, sub_request)
+        original = batch.run_subrequest
+
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        with mock.patch.object(batch, 'run_subrequest', run_subrequest):
+            response = client.post(reverse('api-batch'), {'requests': [
+                {'method': 'GET', 'path': reverse('user-profile')},
+                {'method': 'GET', 'path': reverse('job-application-list')},
+                {'method': 'POST', 'path': reverse('job-application-list'), 'body': {'job_post': 'Engineer'}},
+            ]}, format='json')
+        results = response.json()['data']
+        self.assertEqual([result['status'] for result in results], [200, 200, 201])
+        self.assertEqual(len(results[1]['body']['data']), 1)
+        self.assertTrue(all(name.startswith('batch') for name in threads[:2]))
+        self.assertFalse(threads[2].startswith('batch'))
+
+    def test_pool_queries_count_against_the_budget(self):
+        user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        reads = [{'method': 'GET', 'path': reverse('job-application-list')}] * 2
+        # Authentication alone fits; the two reads on the pool don't.
+        with mock.patch.object(batch, 'batch_budget', return_value=QueryBudget(1, None)):
+            with self.assertRaises(QueryBudgetExceeded), self.assertLogs('django.request', 'ERROR'):
+                client.post(reverse('api-batch'), {'requests': reads}, format='json')
+
+
+class ListHandler(logging.Handler):
+    def __init__(self, unblocked=None):
+        super().__init__()
+        self.records = []
+        self.entered = threading.Event()
+        self.unblocked = unblocked
+
+    def emit(self, record):
+        self.entered.set()
+        if self.unblocked is not None:
+            self.unblocked.wait(5)
+        self.records.append(record)
+
+
+@override_settings(SECURE_SSL_REDIRECT=False)
+class LoggingTests(TestCase):
+    def capture(self, name, handler):
+        logger = logging.getLogger(name)
+        logger.addHandler(handler)
+        self.addCleanup(logger.removeHandler, handler)
+        if logger.level == logging.NOTSET or logger.level > logging.INFO:
+            self.addCleanup(logger.setLevel, logger.level)
+            logger.setLevel(logging.INFO)
+
+    def test_request_context(self):
+        user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        handler = ListHandler()
+        handler.addFilter(RequestContextFilter())
+        self.capture('apps.core.requests', handler)
+        client = APIClient()
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+
+        response = client.get(reverse('user-profile'))
+        record = handler.records[-1]
+        self.assertEqual(record.request_id, response['X-Request-ID'])
+        self.assertEqual((record.user_id, record.view, record.status), (user.pk, 'user-profile', 200))
+        self.assertGreater(record.latency_ms, 0)
+
+        self.assertEqual(client.get(reverse('user-profile'), HTTP_X_REQUEST_ID='abc-123')['X-Request-ID'], 'abc-123')
+        self.assertNotEqual(client.get(reverse('user-profile'), HTTP_X_REQUEST_ID='bad id\n')['X-Request-ID'], 'bad id\n')
+
+    @override_settings(ADMINS=[('Admin', 'admin@example.com')])
+    def test_request_errors_are_mailed_from_the_request_thread(self):
+        user = get_user_model().objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        client = APIClient(raise_request_exception=False)
+        client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        with mock.patch.object(UserProfileView, 'get_object', side_effect=ValueError('boom')):
+            # Captured on the parent, so django.request keeps its handlers.
+            with self.assertLogs('django', 'ERROR'):
+                self.assertEqual(client.get(reverse('user-profile')).status_code, 500)
+        # Sent before the response returned, with the request in the report.
+        self.assertEqual(len(mail.outbox), 1)
+        self.assertIn(reverse('user-profile'), mail.outbox[0].subject)
+        self.assertIn("ValueError", mail.outbox[0].body)
+
+    def test_json_formatter(self):
+        try:
+            raise ValueError('boom')
+        except ValueError:
+            record = logging.getLogger('apps.core.tests').makeRecord(
+                'apps.core.tests', logging.ERROR, __file__, 1, 'Failed %s', ('job',), sys_exc_info(),
+                extra={'request_id': 'abc', 'when': datetime.date(2025, 1, 1)},
+            )
+        entry = json.loads(JSONFormatter().format(record))
+        self.assertEqual(entry['message'], 'Failed job')
+        self.assertEqual((entry['level'], entry['request_id'], entry['when']), ('ERROR', 'abc', '2025-01-01'))
+        self.assertIn('ValueError: boom', entry['exception'])
+
+    def test_queue_drops_and_reports_overflow(self):
+        unblocked = threading.Event()
+        sink = ListHandler(unblocked)
+        self.capture('apps.core.tests.sink', sink)
+        handler = BoundedQueueHandler(maxsize=2, sink='apps.core.tests.sink')
+        self.addCleanup(handler.stop)
+        logger = logging.getLogger('apps.core.tests.queued')
+        logger.addHandler(handler)
+        logger.propagate = False
+        self.addCleanup(setattr, logger, 'propagate', True)
+        self.addCleanup(logger.removeHandler, handler)
+
+        logger.warning('first %d', 1)
+        self.assertTrue(sink.entered.wait(5))
+        # The listener is stuck writing the first record; two fit in the queue.
+        for number in range(5):
+            logger.warning('queued %d', number)
+        self.assertEqual(handler.dropped, 3)
+
+        unblocked.set()
+        handler.queue.join()
+        logger.warning('last')
+        handler.stop()
+        self.assertEqual(
+            [record.getMessage() for record in sink.records],
+            ['first 1', 'queued 0', 'queued 1', 'last', 'Dropped 3 log records: the logging queue was full'],
+        )
@@ -1,8 +1,11 @@
 from django.contrib import admin
 from django.contrib.auth.admin import UserAdmin
+from apps.core.admin import LargeTableAdminMixin
+from apps.core.budgets import query_budget
 from .models import User
 
-class CustomUserAdmin(UserAdmin):
+@query_budget(12, time_ms=500)
+class CustomUserAdmin(LargeTableAdminMixin, UserAdmin):
     # Fields to display in the user list
     list_display = ('username', 'email', 'first_name', 'last_name', 'email_verified', 'is_staff')
     list_filter = ('email_verified', 'is_staff', 'is_superuser', 'is_active')
@@ -0,0 +1,151 @@
+"""
+Avatar thumbnails.
+
+Uploads are saved as they are, in the content-addressed 'avatars'
+storage; identical images are stored once and shared between users.
+render_avatar_thumbnails() runs in the background after an upload. It
+writes a square WebP thumbnail per AVATAR_THUMBNAIL_SIZES next to the
+original and records them in User.avatar_thumbnails. Until then the API
+only has the original to offer. Renders still waiting when the process
+stops are lost; `manage.py render_avatar_thumbnails` renders whatever is
+missing, after a restart or a change to AVATAR_THUMBNAIL_SIZES.
+
+The image is decoded once, at the smallest scale the largest thumbnail
+needs: JPEGs are decoded at 1/2 to 1/8 scale by libjpeg (Image.draft())
+and other formats are shrunk by whole factors before resampling
+(reducing_gap). Memory stays well below that of the full-size bitmap.
+
+A replaced avatar is deleted once no user has it. An upload of the same
+image could find the file, skip writing it and refer to it just as it is
+deleted. So both hold a cache lock on the stored name: the upload from
+before the file is saved until the new reference commits, and the
+deletion around its check and delete.
+"""
+import io
+import logging
+import os
+import time
+import uuid
+
+from django.conf import settings
+from django.core.cache import cache
+from django.core.files.base import ContentFile
+from PIL import Image, ImageOps
+
+from .models import User
+
+logger = logging.getLogger(__name__)
+
+# The file extension for each image format Pillow may detect in an upload.
+AVATAR_EXTENSIONS = {'JPEG': '.jpg', 'PNG': '.png', 'GIF': '.gif', 'WEBP': '.webp'}
+
+
+def get_avatar_storage():
+    return User._meta.get_field('avatar').storage
+
+
+def avatar_name(name, image_format):
+    """`name` with the extension of `image_format`, or None for other formats."""
+    extension = AVATAR_EXTENSIONS.get(image_format)
+    return os.path.splitext(name)[0] + extension if extension else None
+
+
+def lock_avatar(name):
+    """
+    Take the lock on the stored avatar `name`, waiting up to
+    AVATAR_LOCK_WAIT seconds. Returns the token for unlock_avatar(), or
+    None if it is still held.
+    """
+    key = f'avatar-lock:{name}'
+    token = uuid.uuid4().hex
+    deadline = time.monotonic() + settings.AVATAR_LOCK_WAIT
+    while not cache.add(key, token, settings.AVATAR_LOCK_TIMEOUT):
+        if time.monotonic() >= deadline:
+            return None
+        time.sleep(0.05)
+    return token
+
+
+def unlock_avatar(name, token):
+    key = f'avatar-lock:{name}'
+    # Only release our own lock, not one taken after ours expired.
+    if cache.get(key) == token:
+        cache.delete(key)
+
+
+def thumbnail_variant(size):
+    return f'{size}.webp'
+
+
+def render_thumbnails(file, sizes):
+    """{size: WebP bytes} of square thumbnails of the image in `file`."""
+    largest = max(sizes)
+    with Image.open(file) as image:
+        image.draft('RGB', (largest, largest))
+        image = ImageOps.exif_transpose(image)
+        has_alpha = image.mode in ('RGBA', 'LA', 'PA') or 'transparency' in image.info
+        image = image.convert('RGBA' if has_alpha else 'RGB')
+
+    width, height = image.size
+    side = min(width, height)
+    box = ((width - side) / 2, (height - side) / 2, (width + side) / 2, (height + side) / 2)
+    image = image.resize((largest, largest), Image.Resampling.LANCZOS, box=box, reducing_gap=3.0)
+
+    thumbnails = {}
+    for size in sorted(sizes, reverse=True):
+        thumbnail = image if size == largest else image.resize((size, size), Image.Resampling.LANCZOS)
+        buffer = io.BytesIO()
+        thumbnail.save(buffer, 'WEBP', quality=85)
+        thumbnails[size] = buffer.getvalue()
+    return thumbnails
+
+
+def render_avatar_thumbnails(user_id, name):
+    """Render the thumbnails of the avatar `name`, unless they exist, and record them on the user."""
+    storage = get_avatar_storage()
+    names = {size: storage.variant_name(name, thumbnail_variant(size)) for size in settings.AVATAR_THUMBNAIL_SIZES}
+    missing = [size for size, thumbnail_name in names.items() if not storage.exists(thumbnail_name)]
+    if missing:
+        with storage.open(name) as file:
+            thumbnails = render_thumbnails(file, missing)
+        for size, content in thumbnails.items():
+            storage.save_variant(name, thumbnail_variant(size), ContentFile(content))
+    # Unless the user has uploaded another avatar since.
+    User.objects.filter(pk=user_id, avatar=name).update(
+        avatar_thumbnails={str(size): thumbnail_name for size, thumbnail_name in names.items()}
+    )
+
+
+def render_missing_avatar_thumbnails():
+    """
+    Render the thumbnails of every avatar whose user does not have all of
+    AVATAR_THUMBNAIL_SIZES recorded. Returns the number of users updated.
+    """
+    sizes = {str(size) for size in settings.AVATAR_THUMBNAIL_SIZES}
+    users = User.objects.exclude(avatar='').order_by('pk').values_list('pk', 'avatar', 'avatar_thumbnails')
+    rendered = 0
+    for user_id, name, thumbnails in users.iterator():
+        if set(thumbnails) == sizes:
+            continue
+        try:
+            render_avatar_thumbnails(user_id, name)
+        except OSError:
+            # Missing or unreadable file: leave this one to its next upload.
+            logger.exception('Could not render the thumbnails of avatar %s', name)
+            continue
+        rendered += 1
+    return rendered
+
+
+def delete_unused_avatar(name):
+    """Delete the avatar `name` and its thumbnails if no user has it any more."""
+    token = lock_avatar(name)
+    if token is None:
+        # Being uploaded again; that upload's user refers to it.
+        logger.info('Kept avatar %s: it is locked by an upload', name)
+        return
+    try:
+        if not User.objects.filter(avatar=name).exists():
+            get_avatar_storage().delete_with_variants(name)
+    finally:
+        unlock_avatar(name, token)
@@ -0,0 +1,11 @@
+from django.core.management.base import BaseCommand
+
+from apps.users.avatars import render_missing_avatar_thumbnails
+
+
+class Command(BaseCommand):
+    help = "Render the avatar thumbnails missing after a restart or a change to AVATAR_THUMBNAIL_SIZES"
+
+    def handle(self, *args, **options):
+        rendered = render_missing_avatar_thumbnails()
+        self.stdout.write(self.style.SUCCESS(f"Rendered avatar thumbnails for {rendered} users"))
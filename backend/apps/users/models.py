@@ -7,7 +7,17 @@ from django.template.loader import render_to_string
 from django.utils.http import urlsafe_base64_encode
 from django.utils.encoding import force_bytes
 from django.contrib.auth.tokens import default_token_generator
+from django.core.files.storage import storages
+from django_cleanup import cleanup
 
+
+def avatar_storage():
+    return storages['avatars']
+
+
+# Avatar files are shared by every user who uploads the same image, so
+# django-cleanup must not delete them; see apps.users.avatars.
+@cleanup.ignore
 class User(AbstractUser):
     groups = models.ManyToManyField(
         'auth.Group',
@@ -25,6 +35,13 @@ class User(AbstractUser):
     )
 
     email_verified = models.BooleanField(default=False)
+    avatar = models.ImageField(
+        storage=avatar_storage,
+        blank=True,
+        validators=[FileExtensionValidator(['jpg', 'jpeg', 'png', 'gif', 'webp'])],
+    )
+    # {size: name} of the avatar's thumbnails, filled in once they are rendered.
+    avatar_thumbnails = models.JSONField(default=dict, blank=True)
     
     def save(self, *args, **kwargs):
         created = not self.pk
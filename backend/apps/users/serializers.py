@@ -8,6 +8,16 @@ from rest_framework_simplejwt.serializers import TokenObtainPairSerializer
 from django.core.validators import validate_email
 from django.core.exceptions import ValidationError as DjangoValidationError
 from django.conf import settings
+from django.db import transaction
+from apps.core.tasks import run_in_background
+from .avatars import (
+    avatar_name,
+    delete_unused_avatar,
+    get_avatar_storage,
+    lock_avatar,
+    render_avatar_thumbnails,
+    unlock_avatar,
+)
 
 
 User = get_user_model()
@@ -55,18 +65,77 @@ class UserSerializer(serializers.ModelSerializer):
         return user
 
 class UserProfileSerializer(serializers.ModelSerializer):
+    avatar = serializers.ImageField(
+        required=False,
+        validators=User._meta.get_field('avatar').validators,
+        allow_null=True,
+        help_text="JPEG, PNG, GIF or WebP image; thumbnails are rendered after upload. null removes the avatar"
+    )
+    avatar_thumbnails = serializers.SerializerMethodField(
+        help_text="Thumbnail URLs by size in pixels, empty until they are rendered"
+    )
+
     class Meta:
         model = User
         fields = [
             'id', 'username', 'email', 
             'first_name', 'last_name', 
-            'email_verified', 'date_joined'
+            'email_verified', 'date_joined',
+            'avatar', 'avatar_thumbnails'
         ]
         read_only_fields = [
             'id', 'username', 'email', 
             'email_verified', 'date_joined'
         ]
 
+    def get_avatar_thumbnails(self, obj):
+        storage = obj.avatar.storage
+        request = self.context.get('request')
+        return {
+            size: request.build_absolute_uri(storage.url(name)) if request else storage.url(name)
+            for size, name in obj.avatar_thumbnails.items()
+        }
+
+    def validate_avatar(self, value):
+        if value is None:
+            return value
+        if value.size > settings.AVATAR_MAX_SIZE:
+            raise serializers.ValidationError(
+                f"The image is larger than {settings.AVATAR_MAX_SIZE // (1 << 20)} MB."
+            )
+        # Stored and served under the extension of what it is, not of what it is called.
+        name = avatar_name(value.name, value.image.format)
+        if name is None:
+            raise serializers.ValidationError("Upload a JPEG, PNG, GIF or WebP image.")
+        value.name = name
+        return value
+
+    def update(self, instance, validated_data):
+        previous_avatar = instance.avatar.name
+        if 'avatar' not in validated_data:
+            return super().update(instance, validated_data)
+        avatar = validated_data['avatar']
+        name = get_avatar_storage().content_name(avatar.name, avatar) if avatar else None
+        token = lock_avatar(name) if name else None
+        if name and token is None:
+            raise serializers.ValidationError({'avatar': ["This image is being updated; try again."]})
+        instance.avatar_thumbnails = {}
+        try:
+            instance = super().update(instance, validated_data)
+        except BaseException:
+            if token:
+                unlock_avatar(name, token)
+            raise
+        if token:
+            # Held until the reference to the file is committed, so
+            # delete_unused_avatar() can't remove the file under it.
+            transaction.on_commit(lambda: unlock_avatar(name, token))
+        if instance.avatar:
+            run_in_background(render_avatar_thumbnails, instance.pk, instance.avatar.name)
+        if previous_avatar and previous_avatar != instance.avatar.name:
+            run_in_background(delete_unused_avatar, previous_avatar)
+        return instance
+
 class CustomTokenObtainPairSerializer(TokenObtainPairSerializer):
     def validate(self, attrs):
         data = super().validate(attrs)
@@ -1,3 +1,237 @@
-from django.test import TestCase
+import io
+import shutil
+import tempfile
+from unittest import mock
 
-# Create your tests here.
+from django.conf import settings
+from django.contrib.auth import get_user_model
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.core.management import call_command
+from django.contrib.auth.tokens import default_token_generator
+from django.db import connection
+from django.test import TestCase, override_settings
+from django.test.utils import CaptureQueriesContext
+from django.urls import reverse
+from django.utils.encoding import force_bytes
+from django.utils.http import urlsafe_base64_encode
+from rest_framework.test import APIClient
+from rest_framework_simplejwt.tokens import AccessToken
+from PIL import Image
+
+from apps.core.storage import ContentAddressedStorage
+
+from .avatars import delete_unused_avatar, get_avatar_storage, lock_avatar, render_thumbnails, unlock_avatar
+
+User = get_user_model()
+
+
+# The test runner fails any request over its view's query budget, so these
+# also hold each endpoint to its @query_budget.
+@override_settings(SECURE_SSL_REDIRECT=False)
+class UserEndpointTests(TestCase):
+    def setUp(self):
+        self.user = User.objects.create_user(
+            username='analyst', email='analyst@example.com', password='s3cret-pass', email_verified=True
+        )
+        self.client = APIClient()
+
+    def test_register(self):
+        response = self.client.post(reverse('user-register'), {
+            'username': 'newcomer', 'email': 'newcomer@example.com', 'password': 's3cret-pass',
+        })
+        self.assertEqual(response.status_code, 201)
+        self.assertEqual(response.data['data']['user']['username'], 'newcomer')
+
+    def test_token_does_not_reload_the_user(self):
+        with CaptureQueriesContext(connection) as queries:
+            response = self.client.post(reverse('token-obtain-pair'), {
+                'username': 'analyst', 'password': 's3cret-pass',
+            })
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['user']['email'], 'analyst@example.com')
+        self.assertIn('access', response.data['data']['tokens'])
+        user_selects = [query for query in queries if query['sql'].startswith('SELECT') and 'users_user' in query['sql']]
+        self.assertEqual(len(user_selects), 1)
+
+    def test_token_with_wrong_password(self):
+        response = self.client.post(reverse('token-obtain-pair'), {'username': 'analyst', 'password': 'wrong'})
+        self.assertEqual(response.status_code, 401)
+
+    def test_profile(self):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(self.user)}')
+        response = self.client.get(reverse('user-profile'))
+        self.assertEqual(response.data['data']['username'], 'analyst')
+        response = self.client.patch(reverse('user-profile'), {'first_name': 'Ada'})
+        self.assertEqual(response.data['data']['first_name'], 'Ada')
+
+    def test_password_reset(self):
+        response = self.client.post(reverse('password-reset'), {'email': 'nobody@example.com'})
+        self.assertEqual(response.status_code, 400)
+
+        response = self.client.post(reverse('password-reset-confirm'), {
+            'uid': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': default_token_generator.make_token(self.user),
+            'new_password': 'n3w-s3cret-pass',
+        })
+        self.assertEqual(response.status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.check_password('n3w-s3cret-pass'))
+
+    def test_verify_email(self):
+        self.user.email_verified = False
+        self.user.save()
+        response = self.client.get(reverse('verify-email'), {
+            'uidb64': urlsafe_base64_encode(force_bytes(self.user.pk)),
+            'token': default_token_generator.make_token(self.user),
+        })
+        self.assertEqual(response.status_code, 302)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.email_verified)
+
+
+def make_image(size=(400, 300), color='teal', image_format='JPEG'):
+    buffer = io.BytesIO()
+    Image.new('RGB', size, color).save(buffer, image_format)
+    return buffer.getvalue()
+
+
+@override_settings(SECURE_SSL_REDIRECT=False, BACKGROUND_TASKS_EAGER=True, AVATAR_THUMBNAIL_SIZES=[48, 96])
+class AvatarTests(TestCase):
+    def setUp(self):
+        root = tempfile.mkdtemp()
+        self.addCleanup(shutil.rmtree, root)
+        options = {'location': root, 'base_url': '/media/avatars/'}
+        storages_override = override_settings(STORAGES={**settings.STORAGES, 'avatars': {
+            'BACKEND': 'apps.core.storage.ContentAddressedStorage', 'OPTIONS': options,
+        }})
+        storages_override.enable()
+        self.addCleanup(storages_override.disable)
+        # The field's storage is created when the model is loaded.
+        field_patch = mock.patch.object(User._meta.get_field('avatar'), 'storage', ContentAddressedStorage(**options))
+        field_patch.start()
+        self.addCleanup(field_patch.stop)
+
+        self.user = User.objects.create_user(
+            username='analyst', email='analyst@example.com', password='x', email_verified=True
+        )
+        self.client = APIClient()
+
+    def upload(self, user, content, name='me.jpg'):
+        self.client.credentials(HTTP_AUTHORIZATION=f'Bearer {AccessToken.for_user(user)}')
+        with self.captureOnCommitCallbacks(execute=True):
+            return self.client.patch(
+                reverse('user-profile'), {'avatar': SimpleUploadedFile(name, content)}, format='multipart'
+            )
+
+    def test_upload_renders_thumbnails(self):
+        response = self.upload(self.user, make_image())
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response.data['data']['avatar_thumbnails'], {})
+
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.avatar_thumbnails), {'48', '96'})
+        for size, name in self.user.avatar_thumbnails.items():
+            with get_avatar_storage().open(name) as file, Image.open(file) as image:
+                self.assertEqual((image.format, image.size), ('WEBP', (int(size), int(size))))
+
+        response = self.client.get(reverse('user-profile'))
+        url = response.data['data']['avatar_thumbnails']['48']
+        self.assertTrue(url.startswith('http://testserver/media/avatars/'))
+        response = self.client.get(url)
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual(response['Cache-Control'], 'public, max-age=31536000, immutable')
+        response.close()
+
+    def test_identical_images_are_stored_once(self):
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='x', email_verified=True
+        )
+        self.upload(self.user, make_image(), name='a.jpg')
+        with mock.patch('apps.users.avatars.render_thumbnails') as render:
+            self.upload(other, make_image(), name='b.JPG')
+        render.assert_not_called()
+        self.user.refresh_from_db()
+        other.refresh_from_db()
+        self.assertEqual(other.avatar.name, self.user.avatar.name)
+        self.assertEqual(other.avatar_thumbnails, self.user.avatar_thumbnails)
+
+        # Replaced avatars are deleted once no one uses them.
+        name = self.user.avatar.name
+        self.upload(self.user, make_image(color='navy'))
+        self.assertTrue(get_avatar_storage().exists(name))
+        self.upload(other, make_image(color='navy'))
+        self.assertFalse(get_avatar_storage().exists(name))
+        self.assertFalse(get_avatar_storage().exists(get_avatar_storage().variant_name(name, '48.webp')))
+
+    def test_avatar_can_be_removed(self):
+        self.upload(self.user, make_image())
+        self.user.refresh_from_db()
+        name = self.user.avatar.name
+        with self.captureOnCommitCallbacks(execute=True):
+            response = self.client.patch(reverse('user-profile'), {'avatar': None}, format='json')
+        self.assertEqual(response.status_code, 200)
+        self.assertEqual((response.data['data']['avatar'], response.data['data']['avatar_thumbnails']), (None, {}))
+        self.user.refresh_from_db()
+        self.assertFalse(self.user.avatar)
+        self.assertFalse(get_avatar_storage().exists(name))
+
+        # Multipart forms send an empty value.
+        self.assertEqual(self.client.patch(reverse('user-profile'), {'avatar': ''}, format='multipart').status_code, 200)
+
+    def test_lost_thumbnail_renders_are_caught_up(self):
+        with mock.patch('apps.users.serializers.run_in_background'):
+            self.upload(self.user, make_image())
+        other = User.objects.create_user(
+            username='other', email='other@example.com', password='x', email_verified=True
+        )
+        User.objects.filter(pk=other.pk).update(avatar='missing.jpg')
+
+        stdout = io.StringIO()
+        with self.assertLogs('apps.users.avatars', 'ERROR'):
+            call_command('render_avatar_thumbnails', stdout=stdout)
+        self.assertIn("for 1 users", stdout.getvalue())
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.avatar_thumbnails), {'48', '96'})
+        with override_settings(AVATAR_THUMBNAIL_SIZES=[48]), self.assertLogs('apps.users.avatars', 'ERROR'):
+            call_command('render_avatar_thumbnails', stdout=stdout)
+        self.user.refresh_from_db()
+        self.assertEqual(set(self.user.avatar_thumbnails), {'48'})
+
+    def test_invalid_uploads(self):
+        self.assertEqual(self.upload(self.user, b'not an image').status_code, 400)
+        self.assertEqual(self.upload(self.user, make_image(), name='me.html').status_code, 400)
+        self.assertEqual(self.upload(self.user, make_image(image_format='BMP'), name='me.png').status_code, 400)
+        self.assertFalse(User.objects.get(pk=self.user.pk).avatar)
+
+    def test_extension_follows_the_image_format(self):
+        self.assertEqual(self.upload(self.user, make_image(image_format='PNG'), name='me.jpg').status_code, 200)
+        self.user.refresh_from_db()
+        self.assertTrue(self.user.avatar.name.endswith('.png'))
+        with override_settings(AVATAR_MAX_SIZE=100):
+            self.assertEqual(self.upload(self.user, make_image()).status_code, 400)
+
+    @override_settings(AVATAR_LOCK_WAIT=0)
+    def test_uploads_and_deletions_of_an_avatar_take_turns(self):
+        self.upload(self.user, make_image())
+        self.user.refresh_from_db()
+        name = self.user.avatar.name
+        # The upload let go of the lock once its reference was committed.
+        token = lock_avatar(name)
+        self.assertIsNotNone(token)
+
+        # While an upload of the same image holds it, nothing is deleted...
+        User.objects.filter(pk=self.user.pk).update(avatar='')
+        delete_unused_avatar(name)
+        self.assertTrue(get_avatar_storage().exists(name))
+        # ...and a second upload of it has to wait.
+        self.assertEqual(self.upload(self.user, make_image()).status_code, 400)
+
+        unlock_avatar(name, token)
+        delete_unused_avatar(name)
+        self.assertFalse(get_avatar_storage().exists(name))
+
+    def test_render_thumbnails_crops_to_square(self):
+        thumbnails = render_thumbnails(io.BytesIO(make_image((3000, 1000), image_format='PNG')), [32, 64])
+        for size, content in thumbnails.items():
+            with Image.open(io.BytesIO(content)) as image:
+                self.assertEqual(image.size, (size, size))
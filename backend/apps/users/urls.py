@@ -1,5 +1,12 @@
 from django.urls import path
-from .views import *
+from .views import (
+    CustomTokenObtainPairView,
+    EmailVerificationView,
+    PasswordResetConfirmView,
+    PasswordResetView,
+    UserCreateView,
+    UserProfileView,
+)
 
 urlpatterns = [
     path('register/', UserCreateView.as_view(), name='user-register'),
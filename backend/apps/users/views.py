@@ -9,6 +9,10 @@ from django.utils.encoding import force_str
 from django.shortcuts import redirect
 from django.conf import settings
 from django.contrib.auth.tokens import default_token_generator
+from apps.core.budgets import query_budget
+from apps.core.idempotency import idempotent
+from apps.core.middleware import compression_exempt
+from rest_framework_simplejwt.exceptions import InvalidToken, TokenError
 
 User = get_user_model()
 
@@ -20,6 +24,9 @@ def standard_response(status=True, message="", data=None, status_code=status.HTT
         "data": data or {}
     }, status=status_code)
 
+@idempotent
+@query_budget(5, time_ms=100)
+@compression_exempt
 class UserCreateView(generics.CreateAPIView):
     """
     Register a new user and send verification email
@@ -51,6 +58,8 @@ class UserCreateView(generics.CreateAPIView):
             status_code=status.HTTP_201_CREATED
         )
 
+@query_budget(3, time_ms=100)
+@compression_exempt
 class CustomTokenObtainPairView(TokenObtainPairView):
     """
     Authenticate user and return JWT tokens
@@ -59,27 +68,31 @@ class CustomTokenObtainPairView(TokenObtainPairView):
     serializer_class = CustomTokenObtainPairSerializer
 
     def post(self, request, *args, **kwargs):
-        response = super().post(request, *args, **kwargs)
-        
-        if response.status_code == status.HTTP_200_OK:
-            user = User.objects.get(username=request.data['username'])
-            response.data = {
-                "status": True,
-                "message": "Login successful",
-                "data": {
-                    "user": {
-                        "id": user.id,
-                        "username": user.username,
-                        "email": user.email,
-                        "email_verified": user.email_verified,
-                        "first_name": user.first_name,
-                        "last_name": user.last_name
-                    },
-                    "tokens": response.data
-                }
+        serializer = self.get_serializer(data=request.data)
+        try:
+            serializer.is_valid(raise_exception=True)
+        except TokenError as e:
+            raise InvalidToken(e.args[0])
+
+        # The serializer has already loaded the authenticated user.
+        user = serializer.user
+        return Response({
+            "status": True,
+            "message": "Login successful",
+            "data": {
+                "user": {
+                    "id": user.id,
+                    "username": user.username,
+                    "email": user.email,
+                    "email_verified": user.email_verified,
+                    "first_name": user.first_name,
+                    "last_name": user.last_name
+                },
+                "tokens": serializer.validated_data
             }
-        return response
+        }, status=status.HTTP_200_OK)
 
+@query_budget(3, time_ms=100)
 class UserProfileView(generics.RetrieveUpdateAPIView):
     """
     Get or update authenticated user's profile
@@ -112,6 +125,7 @@ class UserProfileView(generics.RetrieveUpdateAPIView):
             data=serializer.data
         )
 
+@query_budget(3, time_ms=100)
 class PasswordResetView(generics.GenericAPIView):
     """
     Initiate password reset process
@@ -130,6 +144,8 @@ class PasswordResetView(generics.GenericAPIView):
             status_code=status.HTTP_200_OK
         )
 
+@query_budget(3, time_ms=100)
+@compression_exempt
 class PasswordResetConfirmView(generics.GenericAPIView):
     """
     Complete password reset process
@@ -162,6 +178,7 @@ class PasswordResetConfirmView(generics.GenericAPIView):
             status_code=status.HTTP_200_OK
         )
 
+@query_budget(3, time_ms=100)
 class EmailVerificationView(generics.GenericAPIView):
     """
     Verify user's email via token
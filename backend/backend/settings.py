@@ -1,10 +1,15 @@
 from datetime import timedelta
+import copy
 import os
 from pathlib import Path
 
+from dotenv import load_dotenv
+
 # Build paths inside the project like this: BASE_DIR / 'subdir'.
 BASE_DIR = Path(__file__).resolve().parent.parent
 
+load_dotenv(BASE_DIR / '.env')
+
 
 # Quick-start development settings - unsuitable for production
 # See https://docs.djangoproject.com/en/5.1/howto/deployment/checklist/
@@ -46,6 +51,7 @@ INSTALLED_APPS = [
     
     
     # Custom Application(Project)
+    'apps.core',
     'apps.users',
     'apps.JobApplication',
 ]
@@ -53,7 +59,14 @@ INSTALLED_APPS = [
 SITE_ID = 1
 
 MIDDLEWARE = [
+    'apps.core.log.RequestContextMiddleware',
     'django.middleware.security.SecurityMiddleware',
+    'apps.core.profiling.ProfilingMiddleware',
+    'apps.core.budgets.QueryBudgetMiddleware',
+    'apps.core.middleware.StaticFilesMiddleware',
+    'apps.core.middleware.ContentAddressedFilesMiddleware',
+    'apps.core.middleware.CompressionMiddleware',
+    'apps.core.routers.ReplicaRoutingMiddleware',
     'django.contrib.sessions.middleware.SessionMiddleware',
     'allauth.account.middleware.AccountMiddleware',
     'django.middleware.common.CommonMiddleware',
@@ -61,10 +74,34 @@ MIDDLEWARE = [
     'django.contrib.auth.middleware.AuthenticationMiddleware',
     'django.contrib.messages.middleware.MessageMiddleware',
     'django.middleware.clickjacking.XFrameOptionsMiddleware',
+    'apps.core.idempotency.IdempotencyMiddleware',
+]
+
+# The JWT-authenticated API never uses sessions, CSRF cookies or messages,
+# so requests under these prefixes skip that middleware entirely
+# (see apps.core.handlers, used by backend/wsgi.py and backend/asgi.py).
+STATELESS_PATH_PREFIXES = ['/api/']
+STATELESS_EXCLUDED_MIDDLEWARE = [
+    'django.contrib.sessions.middleware.SessionMiddleware',
+    'allauth.account.middleware.AccountMiddleware',
+    'django.middleware.csrf.CsrfViewMiddleware',
+    'django.contrib.auth.middleware.AuthenticationMiddleware',
+    'django.contrib.messages.middleware.MessageMiddleware',
 ]
 
 ROOT_URLCONF = 'backend.urls'
 
+# Response compression (apps.core.middleware.CompressionMiddleware)
+# Encodings in order of preference; br and zstd are used only when the
+# brotli / zstandard packages are installed.
+COMPRESSION_ENCODINGS = ['br', 'zstd', 'gzip']
+COMPRESSION_LEVELS = {
+    'br': 4,
+    'zstd': 3,
+    'gzip': 6,
+}
+COMPRESSION_MIN_SIZE = 1024
+
 TEMPLATES = [
     {
         'BACKEND': 'django.template.backends.django.DjangoTemplates',
@@ -93,12 +130,74 @@ CORS_ALLOW_ALL_ORIGINS = True
 # Database
 # https://docs.djangoproject.com/en/5.1/ref/settings/#databases
 
-DATABASES = {
-    'default': {
-        'ENGINE': 'django.db.backends.sqlite3',
-        'NAME': BASE_DIR / 'db.sqlite3',
+# SQLite is used unless DB_ENGINE=postgresql (set in the environment or .env).
+# Postgres connections persist for DB_CONN_MAX_AGE seconds and are health
+# checked before reuse. Setting DB_POOL_SIZE switches to psycopg's pool with
+# that many connections per worker process instead.
+DB_ENGINE = os.environ.get('DB_ENGINE', 'sqlite3')
+
+if DB_ENGINE == 'postgresql':
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.postgresql',
+            'NAME': os.environ.get('DB_NAME', 'sil'),
+            'USER': os.environ.get('DB_USER', 'postgres'),
+            'PASSWORD': os.environ.get('DB_PASSWORD', ''),
+            'HOST': os.environ.get('DB_HOST', 'localhost'),
+            'PORT': os.environ.get('DB_PORT', '5432'),
+            'CONN_MAX_AGE': int(os.environ.get('DB_CONN_MAX_AGE', 60)),
+            'CONN_HEALTH_CHECKS': True,
+            'OPTIONS': {},
+        }
+    }
+    DB_POOL_SIZE = int(os.environ.get('DB_POOL_SIZE', 0))
+    if DB_POOL_SIZE:
+        # Pooled connections are returned to the pool at the end of each
+        # request, so Django must not also keep them open.
+        DATABASES['default']['CONN_MAX_AGE'] = 0
+        DATABASES['default']['OPTIONS']['pool'] = {
+            'min_size': int(os.environ.get('DB_POOL_MIN_SIZE', 1)),
+            'max_size': DB_POOL_SIZE,
+            'timeout': int(os.environ.get('DB_POOL_TIMEOUT', 10)),
+        }
+else:
+    DATABASES = {
+        'default': {
+            'ENGINE': 'django.db.backends.sqlite3',
+            'NAME': BASE_DIR / 'db.sqlite3',
+        }
+    }
+
+# Cache shared by all workers when REDIS_URL is set (needs the redis
+# package); otherwise each process has its own local-memory cache.
+if os.environ.get('REDIS_URL'):
+    CACHES = {
+        'default': {
+            'BACKEND': 'django.core.cache.backends.redis.RedisCache',
+            'LOCATION': os.environ['REDIS_URL'],
+        }
     }
-}
+
+# Read replicas: DB_REPLICAS is a comma-separated list of replica hosts for
+# Postgres, or of database files for SQLite (useful locally with a copy of
+# db.sqlite3). Reads for DATABASE_REPLICA_APPS are spread over the replicas
+# by apps.core.routers.ReplicaRouter; a user who writes reads from the
+# primary for DATABASE_READ_YOUR_WRITES_WINDOW seconds afterwards (the pin
+# is kept in the default cache, so set REDIS_URL with several workers).
+DATABASE_REPLICAS = []
+for number, replica in enumerate(filter(None, os.environ.get('DB_REPLICAS', '').split(',')), 1):
+    alias = f'replica{number}'
+    DATABASES[alias] = copy.deepcopy(DATABASES['default'])
+    if DB_ENGINE == 'postgresql':
+        DATABASES[alias]['HOST'] = replica.strip()
+    else:
+        DATABASES[alias]['NAME'] = BASE_DIR / replica.strip()
+    DATABASES[alias]['TEST'] = {'MIRROR': 'default'}
+    DATABASE_REPLICAS.append(alias)
+
+DATABASE_ROUTERS = ['apps.core.routers.ReplicaRouter']
+DATABASE_REPLICA_APPS = ['users', 'JobApplication']
+DATABASE_READ_YOUR_WRITES_WINDOW = int(os.environ.get('DB_READ_YOUR_WRITES_WINDOW', 5))
 
 
 # Password validation
@@ -143,17 +242,193 @@ STATICFILES_DIRS = [
     os.path.join(BASE_DIR, 'static'),
 ]
 
+# collectstatic writes content-hashed names plus .gz/.br copies, which
+# apps.core.middleware.StaticFilesMiddleware serves with immutable caching.
+STORAGES = {
+    'default': {
+        'BACKEND': 'django.core.files.storage.FileSystemStorage',
+    },
+    'staticfiles': {
+        'BACKEND': 'apps.core.storage.CompressedManifestStaticFilesStorage',
+    },
+}
+
 # Default primary key field type
 # https://docs.djangoproject.com/en/5.1/ref/settings/#default-auto-field
 
 DEFAULT_AUTO_FIELD = 'django.db.models.BigAutoField'
 
 
+# On-demand profiling (apps.core.profiling): staff issue a token in the admin
+# and send it with a request to store a flame graph and SQL list for it.
+PROFILING_TOKEN_MAX_AGE = 900
+PROFILING_SAMPLE_INTERVAL = 0.002
+PROFILING_MAX_RECORDS = 50
+PROFILING_MAX_QUERIES = 1000
+
+# Per-view query budgets (apps.core.budgets): 'raise' fails the request,
+# 'warn' logs it (set QUERY_BUDGET_MODE=warn on staging), 'off' skips counting.
+# The test runner always raises and prints a report of every endpoint.
+QUERY_BUDGET_MODE = os.environ.get('QUERY_BUDGET_MODE', 'warn' if DEBUG else 'off')
+TEST_RUNNER = 'apps.core.budgets.QueryBudgetTestRunner'
+
+# Admin changelists for large tables (apps.core.admin.LargeTableAdminMixin)
+# count up to ADMIN_EXACT_COUNT_LIMIT rows exactly and use the PostgreSQL
+# planner's estimate beyond; filter facet counts are cached.
+ADMIN_EXACT_COUNT_LIMIT = 10000
+ADMIN_FACET_CACHE_TIMEOUT = 300
+
+# Job applications untouched for JOB_APPLICATION_ARCHIVE_AFTER_DAYS, or
+# closed (secured or with feedback) and untouched for
+# JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS, are moved to the archive table by
+# `manage.py archive_job_applications` (see apps.JobApplication.archive).
+JOB_APPLICATION_ARCHIVE_AFTER_DAYS = int(os.environ.get('JOB_APPLICATION_ARCHIVE_AFTER_DAYS', 365))
+JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS = int(os.environ.get('JOB_APPLICATION_ARCHIVE_CLOSED_AFTER_DAYS', 90))
+
+# Daily funnel rollups for the admin analytics page (apps.JobApplication.analytics),
+# refreshed by `manage.py refresh_job_application_stats`. Applications updated
+# up to JOB_APPLICATION_STATS_OVERLAP seconds before the last refresh are
+# processed again, in case they committed after it.
+JOB_APPLICATION_STATS_OVERLAP = 60
+JOB_APPLICATION_STATS_BATCH_DAYS = 100
+JOB_APPLICATION_STATS_WEEKS = 26
+
+# Background tasks (apps.core.tasks) run on an in-process thread pool, or
+# inline when BACKGROUND_TASKS_EAGER is set.
+BACKGROUND_TASK_WORKERS = int(os.environ.get('BACKGROUND_TASK_WORKERS', 2))
+BACKGROUND_TASKS_EAGER = False
+
+# Spreadsheet imports (apps.JobApplication.imports). XLSX files need the
+# openpyxl package. Only the first JOB_APPLICATION_IMPORT_MAX_ERRORS row
+# errors of an import are kept.
+JOB_APPLICATION_IMPORT_MAX_SIZE = 50 * 1024 * 1024
+JOB_APPLICATION_IMPORT_BATCH_SIZE = 500
+JOB_APPLICATION_IMPORT_MAX_ERRORS = 1000
+JOB_APPLICATION_IMPORT_ERRORS_PAGE_SIZE = 100
+JOB_APPLICATION_IMPORT_LIST_LIMIT = 50
+
+# Idempotency-Key support (apps.core.idempotency): how long a response is
+# kept for replay, how long the lock held while the first request runs
+# lasts, and how long a concurrent duplicate waits for it before a 409.
+IDEMPOTENCY_KEY_TTL = 60 * 60 * 24
+IDEMPOTENCY_LOCK_TIMEOUT = 60
+IDEMPOTENCY_WAIT = 10
+
+# Batched API requests (apps.core.batch): the most sub-requests per batch,
+# and the threads that run a batch's independent reads concurrently.
+BATCH_MAX_REQUESTS = 20
+BATCH_READ_WORKERS = int(os.environ.get('BATCH_READ_WORKERS', 4))
+
+# Most ids accepted by one bulk transition request.
+JOB_APPLICATION_BULK_MAX_IDS = 500
+
+# Delta sync (apps.JobApplication.sync): changes logged within
+# JOB_APPLICATION_SYNC_OVERLAP seconds before a sync token was issued are sent
+# again, in case they committed after it. A change committed later than that
+# after being logged can be missed, so the overlap must exceed the longest
+# time between record_changes() and COMMIT (plus clock skew between servers);
+# every writer logs last in a short transaction, well under 10 seconds.
+# The change log, and so sync tokens, last JOB_APPLICATION_CHANGE_RETENTION_DAYS
+# (`manage.py prune_job_application_changes`).
+JOB_APPLICATION_SYNC_OVERLAP = 10
+JOB_APPLICATION_SYNC_PAGE_SIZE = 500
+JOB_APPLICATION_CHANGE_RETENTION_DAYS = 30
+
+# Job title autocomplete (apps.JobApplication.suggestions): titles are indexed
+# by their first JOB_TITLE_SUGGEST_PREFIX_LENGTH characters, and at most
+# JOB_TITLE_SUGGEST_LIMIT suggestions are returned. Run
+# `manage.py rebuild_job_title_suggestions` to index existing applications,
+# and again after changing the prefix length.
+JOB_TITLE_SUGGEST_PREFIX_LENGTH = 20
+JOB_TITLE_SUGGEST_LIMIT = 10
+
+# Server-sent events (apps.core.events), served under ASGI. LocalBroker only
+# reaches clients connected to the same process; with several workers use
+# apps.core.events.RedisBroker (needs the redis package).
+EVENT_BROKER = os.environ.get('EVENT_BROKER', 'apps.core.events.LocalBroker')
+EVENT_BROKER_URL = os.environ.get('EVENT_BROKER_URL', os.environ.get('REDIS_URL', ''))
+EVENT_STREAM_HEARTBEAT = 15
+EVENT_STREAM_RETRY = 3
+EVENT_STREAM_BUFFER_SIZE = 256
+EVENT_STREAM_REPLAY_LIMIT = 500
+
+# Logging (apps.core.log): records are queued by the request thread and
+# written as JSON lines by a listener thread, through the handlers of the
+# apps.core.log.sink logger. At most LOG_QUEUE_SIZE records wait; more are
+# dropped and counted. Each record carries the request id, user id and view.
+# The per-request access log (apps.core.requests) is off unless
+# LOG_REQUESTS is set. Request errors are mailed to ADMINS from the request
+# thread, with the request still at hand.
+LOG_LEVEL = os.environ.get('LOG_LEVEL', 'WARNING')
+LOG_REQUESTS = os.environ.get('LOG_REQUESTS', 'False') == 'True'
+LOG_QUEUE_SIZE = int(os.environ.get('LOG_QUEUE_SIZE', 10000))
+LOGGING = {
+    'version': 1,
+    'disable_existing_loggers': False,
+    'filters': {
+        'request_context': {'()': 'apps.core.log.RequestContextFilter'},
+        'require_debug_false': {'()': 'django.utils.log.RequireDebugFalse'},
+    },
+    'formatters': {
+        'json': {'()': 'apps.core.log.JSONFormatter'},
+    },
+    'handlers': {
+        'queue': {
+            'class': 'apps.core.log.BoundedQueueHandler',
+            'maxsize': LOG_QUEUE_SIZE,
+            'filters': ['request_context'],
+        },
+        'console': {
+            'class': 'logging.StreamHandler',
+            'formatter': 'json',
+        },
+        'mail_admins': {
+            'class': 'django.utils.log.AdminEmailHandler',
+            'level': 'ERROR',
+            'filters': ['require_debug_false'],
+        },
+    },
+    'loggers': {
+        'apps.core.log.sink': {
+            'handlers': ['console'],
+            'level': 'DEBUG',
+            'propagate': False,
+        },
+        'apps.core.requests': {
+            'level': 'INFO' if LOG_REQUESTS else 'WARNING',
+        },
+        # Replaces Django's own console handler; its records reach the
+        # console through the queue instead.
+        'django': {
+            'handlers': [],
+            'level': 'INFO',
+        },
+        'django.request': {
+            'handlers': ['mail_admins'],
+        },
+    },
+    'root': {
+        'handlers': ['queue'],
+        'level': LOG_LEVEL,
+    },
+}
+
+
 # REST_FRAMEWORK settings
 REST_FRAMEWORK = {
     'DEFAULT_AUTHENTICATION_CLASSES': (
         'rest_framework_simplejwt.authentication.JWTAuthentication',
     ),
+    # Uses orjson when installed, stdlib json otherwise
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.core.renderers.JSONRenderer',
+        'rest_framework.renderers.BrowsableAPIRenderer',
+    ),
+    'DEFAULT_PARSER_CLASSES': (
+        'apps.core.parsers.JSONParser',
+        'rest_framework.parsers.FormParser',
+        'rest_framework.parsers.MultiPartParser',
+    ),
 }
 
 
@@ -168,6 +443,26 @@ SIMPLE_JWT = {
 MEDIA_URL = '/media/'
 MEDIA_ROOT = os.path.join(BASE_DIR, 'media')
 
+# Avatars are stored by content hash (apps.core.storage.ContentAddressedStorage)
+# and served with immutable caching by ContentAddressedFilesMiddleware.
+# Square WebP thumbnails of AVATAR_THUMBNAIL_SIZES pixels are rendered in
+# the background after each upload; `manage.py render_avatar_thumbnails`
+# renders those lost to a restart, or missing after changing the sizes.
+STORAGES['avatars'] = {
+    'BACKEND': 'apps.core.storage.ContentAddressedStorage',
+    'OPTIONS': {
+        'location': os.path.join(MEDIA_ROOT, 'avatars'),
+        'base_url': MEDIA_URL + 'avatars/',
+    },
+}
+AVATAR_MAX_SIZE = 10 * 1024 * 1024
+AVATAR_THUMBNAIL_SIZES = [48, 96, 192]
+# Uploads and deletions of the same stored avatar take turns on a cache lock
+# (see apps.users.avatars): held for at most AVATAR_LOCK_TIMEOUT seconds,
+# waited for up to AVATAR_LOCK_WAIT.
+AVATAR_LOCK_TIMEOUT = 60
+AVATAR_LOCK_WAIT = 10
+
 AUTHENTICATION_BACKENDS = (
     'django.contrib.auth.backends.ModelBackend',
     'allauth.account.auth_backends.AuthenticationBackend',
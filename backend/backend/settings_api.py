@@ -0,0 +1,49 @@
+"""
+Settings for API-only workers.
+
+Leaves out the admin, sessions, messages, allauth and the API docs, none of
+which are used by the JWT-authenticated /api/ routes, so workers start and
+serve their first request faster. Run with
+DJANGO_SETTINGS_MODULE=backend.settings_api.
+"""
+
+from .settings import *  # noqa: F401,F403
+from .settings import INSTALLED_APPS, MIDDLEWARE, REST_FRAMEWORK, STATELESS_EXCLUDED_MIDDLEWARE, TEMPLATES
+
+API_EXCLUDED_APPS = [
+    'django.contrib.admin',
+    'django.contrib.sessions',
+    'django.contrib.messages',
+    'django.contrib.staticfiles',
+    'django.contrib.sites',
+    'allauth',
+    'allauth.account',
+    'allauth.socialaccount',
+    'drf_yasg',
+]
+
+INSTALLED_APPS = [app for app in INSTALLED_APPS if app not in API_EXCLUDED_APPS]
+
+MIDDLEWARE = [middleware for middleware in MIDDLEWARE if middleware not in STATELESS_EXCLUDED_MIDDLEWARE]
+
+TEMPLATES = [
+    {
+        **TEMPLATES[0],
+        'OPTIONS': {
+            'context_processors': [
+                'django.template.context_processors.request',
+            ],
+        },
+    },
+]
+
+AUTHENTICATION_BACKENDS = (
+    'django.contrib.auth.backends.ModelBackend',
+)
+
+REST_FRAMEWORK = {
+    **REST_FRAMEWORK,
+    'DEFAULT_RENDERER_CLASSES': (
+        'apps.core.renderers.JSONRenderer',
+    ),
+}